@@ -6,7 +6,7 @@ import os
 
 # Import your models here
 from app.database import Base
-from app.models import Conversation, LocalStats, TrainingExample, Dataset, DatasetExample
+from app.models import Conversation, LocalStats, ScenarioDailyStats, ScenarioSummaryStats, StatsUpload, TrainingExample, Dataset, DatasetExample
 from app.models.rag import Document, DocumentChunk
 
 # this is the Alembic Config object, which provides
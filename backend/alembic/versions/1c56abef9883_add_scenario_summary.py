@@ -0,0 +1,69 @@
+"""add_scenario_summary
+
+Revision ID: 1c56abef9883
+Revises: ba40425b13dd
+Create Date: 2026-10-16 14:05:37.402916
+
+Table d'agrégats par scénario sur tout l'historique (record et sa date,
+moyenne et M2 de Welford pour la variance, précision, première/dernière
+partie), remplie à partir de local_stats existant
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1c56abef9883'
+down_revision = 'ba40425b13dd'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'scenario_summary',
+        sa.Column('scenario_name', sa.String(length=255), nullable=False),
+        sa.Column('plays', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('best_score', sa.Float(), nullable=True),
+        sa.Column('best_played_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('scored_plays', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('mean_score', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('score_m2', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('accuracy_plays', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('mean_accuracy', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('first_played_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('last_played_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('scenario_name')
+    )
+    op.create_index(
+        'idx_scenario_summary_best_score', 'scenario_summary',
+        [sa.text('best_score DESC NULLS LAST')], unique=False
+    )
+
+    # Backfill depuis l'historique brut (var_pop x n = M2)
+    op.execute("""
+        INSERT INTO scenario_summary (
+            scenario_name, plays, best_score, best_played_at, scored_plays,
+            mean_score, score_m2, accuracy_plays, mean_accuracy,
+            first_played_at, last_played_at
+        )
+        SELECT
+            scenario_name,
+            count(*),
+            max(score),
+            (array_agg(played_at ORDER BY score DESC, played_at) FILTER (WHERE score IS NOT NULL))[1],
+            count(score),
+            coalesce(avg(score), 0),
+            coalesce(var_pop(score) * count(score), 0),
+            count(accuracy),
+            coalesce(avg(accuracy), 0),
+            min(played_at),
+            max(played_at)
+        FROM local_stats
+        GROUP BY scenario_name
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('idx_scenario_summary_best_score', table_name='scenario_summary')
+    op.drop_table('scenario_summary')
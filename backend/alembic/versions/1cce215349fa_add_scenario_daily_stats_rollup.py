@@ -0,0 +1,61 @@
+"""add_scenario_daily_stats_rollup
+
+Revision ID: 1cce215349fa
+Revises: 0a2f121dc56d
+Create Date: 2026-10-16 09:12:41.508312
+
+Table d'agrégats journaliers par scénario (plays, best, sommes pour
+moyenne/variance, précision), remplie à partir de local_stats existant
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1cce215349fa'
+down_revision = '0a2f121dc56d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'scenario_daily_stats',
+        sa.Column('scenario_name', sa.String(length=255), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('plays', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('best_score', sa.Float(), nullable=True),
+        sa.Column('score_sum', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('score_sq_sum', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('scored_plays', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('accuracy_sum', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('accuracy_plays', sa.Integer(), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('scenario_name', 'day')
+    )
+    op.create_index('idx_daily_stats_day', 'scenario_daily_stats', ['day'], unique=False)
+
+    # Backfill depuis l'historique brut
+    op.execute("""
+        INSERT INTO scenario_daily_stats (
+            scenario_name, day, plays, best_score, score_sum, score_sq_sum,
+            scored_plays, accuracy_sum, accuracy_plays
+        )
+        SELECT
+            scenario_name,
+            (played_at AT TIME ZONE 'UTC')::date,
+            count(*),
+            max(score),
+            coalesce(sum(score), 0),
+            coalesce(sum(score * score), 0),
+            count(score),
+            coalesce(sum(accuracy), 0),
+            count(accuracy)
+        FROM local_stats
+        WHERE played_at IS NOT NULL
+        GROUP BY scenario_name, (played_at AT TIME ZONE 'UTC')::date
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('idx_daily_stats_day', table_name='scenario_daily_stats')
+    op.drop_table('scenario_daily_stats')
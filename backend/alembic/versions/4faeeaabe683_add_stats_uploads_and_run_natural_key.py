@@ -0,0 +1,76 @@
+"""add_stats_uploads_and_run_natural_key
+
+Revision ID: 4faeeaabe683
+Revises: 1cce215349fa
+Create Date: 2026-10-16 10:41:07.214563
+
+Table stats_uploads (hash des fichiers importés) et index unique sur la clé
+naturelle d'une partie (scenario_name, played_at, score). Les doublons déjà
+présents sont supprimés et le rollup journalier est recalculé
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4faeeaabe683'
+down_revision = '1cce215349fa'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'stats_uploads',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('file_hash', sa.String(length=64), nullable=False),
+        sa.Column('filename', sa.String(length=500), nullable=True),
+        sa.Column('row_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('inserted_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('first_played_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('last_played_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('file_hash')
+    )
+
+    # Supprimer les parties en double (uploads répétés), on garde la plus ancienne
+    op.execute("""
+        DELETE FROM local_stats a
+        USING local_stats b
+        WHERE a.scenario_name = b.scenario_name
+          AND a.played_at = b.played_at
+          AND a.score = b.score
+          AND a.id > b.id
+    """)
+    op.create_index(
+        'uq_local_stats_run', 'local_stats',
+        ['scenario_name', 'played_at', 'score'], unique=True
+    )
+
+    # Le rollup contenait les doublons: recalcul complet
+    op.execute("TRUNCATE scenario_daily_stats")
+    op.execute("""
+        INSERT INTO scenario_daily_stats (
+            scenario_name, day, plays, best_score, score_sum, score_sq_sum,
+            scored_plays, accuracy_sum, accuracy_plays
+        )
+        SELECT
+            scenario_name,
+            (played_at AT TIME ZONE 'UTC')::date,
+            count(*),
+            max(score),
+            coalesce(sum(score), 0),
+            coalesce(sum(score * score), 0),
+            count(score),
+            coalesce(sum(accuracy), 0),
+            count(accuracy)
+        FROM local_stats
+        WHERE played_at IS NOT NULL
+        GROUP BY scenario_name, (played_at AT TIME ZONE 'UTC')::date
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('uq_local_stats_run', table_name='local_stats')
+    op.drop_table('stats_uploads')
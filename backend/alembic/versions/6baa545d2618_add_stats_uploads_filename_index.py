@@ -0,0 +1,26 @@
+"""add_stats_uploads_filename_index
+
+Revision ID: 6baa545d2618
+Revises: 4faeeaabe683
+Create Date: 2026-10-16 11:58:22.903417
+
+Index sur stats_uploads.filename: l'import du dossier Stats ignore les
+fichiers déjà importés par nom avant de les relire
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6baa545d2618'
+down_revision = '4faeeaabe683'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('idx_stats_uploads_filename', 'stats_uploads', ['filename'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('idx_stats_uploads_filename', table_name='stats_uploads')
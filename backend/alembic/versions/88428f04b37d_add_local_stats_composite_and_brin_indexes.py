@@ -0,0 +1,46 @@
+"""add_local_stats_composite_and_brin_indexes
+
+Revision ID: 88428f04b37d
+Revises: 1c56abef9883
+Create Date: 2026-10-16 15:02:18.664120
+
+Index composite (scenario_name, played_at DESC, id DESC) pour l'historique
+d'un scénario trié par date, BRIN sur played_at pour les scans de fenêtre.
+Les index simples devenus redondants sont supprimés: ix_local_stats_scenario_name
+et idx_scenario (doublons, couverts par le préfixe du composite) et
+idx_played_at (couvert par idx_local_stats_played_at_id)
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '88428f04b37d'
+down_revision = '1c56abef9883'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'idx_local_stats_scenario_played_at', 'local_stats',
+        ['scenario_name', sa.text('played_at DESC'), sa.text('id DESC')], unique=False
+    )
+    # Les parties sont insérées à peu près dans l'ordre chronologique: quelques
+    # dizaines de Ko de BRIN suffisent à écarter les blocs hors fenêtre
+    op.create_index(
+        'brin_local_stats_played_at', 'local_stats', ['played_at'],
+        unique=False, postgresql_using='brin'
+    )
+    # IF EXISTS: les bases créées par create_all n'ont pas tous ces index
+    op.execute("DROP INDEX IF EXISTS ix_local_stats_scenario_name")
+    op.execute("DROP INDEX IF EXISTS idx_scenario")
+    op.execute("DROP INDEX IF EXISTS idx_played_at")
+
+
+def downgrade() -> None:
+    op.create_index('idx_played_at', 'local_stats', ['played_at'], unique=False)
+    op.create_index('idx_scenario', 'local_stats', ['scenario_name'], unique=False)
+    op.create_index('ix_local_stats_scenario_name', 'local_stats', ['scenario_name'], unique=False)
+    op.drop_index('brin_local_stats_played_at', table_name='local_stats')
+    op.drop_index('idx_local_stats_scenario_played_at', table_name='local_stats')
@@ -0,0 +1,28 @@
+"""add_local_stats_keyset_index
+
+Revision ID: ba40425b13dd
+Revises: 6baa545d2618
+Create Date: 2026-10-16 13:20:54.117805
+
+Index (played_at DESC, id DESC) pour la pagination keyset de /api/stats/history
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'ba40425b13dd'
+down_revision = '6baa545d2618'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'idx_local_stats_played_at_id', 'local_stats',
+        [sa.text('played_at DESC'), sa.text('id DESC')], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('idx_local_stats_played_at_id', table_name='local_stats')
@@ -4,19 +4,25 @@ Gère les conversations avec différents providers IA (Ollama, Groq) pour l'entr
 """
 
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, AsyncIterator, Awaitable, Tuple
+from dataclasses import dataclass
+import asyncio
+import json
 import logging
+import time
 from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.config import Settings, get_settings
-from app.database import get_db
+from app.config import get_settings
+from app.database import get_db, get_session_local
 
 # Plus besoin de dépendances utilisateur
 from app.models.conversation import Conversation
-from app.services.llm_service import LLMService, create_llm_service
+from app.services.llm_service import LLMService, get_llm_service
 from app.services.llm_context_builder import create_llm_context_builder
+from app.services.health_monitor import ProviderHealthMonitor, get_health_monitor
 
 logger = logging.getLogger(__name__)
 
@@ -40,6 +46,7 @@ class ChatRequest(BaseModel):
     model: Optional[str] = None
     rag_mode: str = "hybrid"  # "off", "hybrid", "only"
     rag_max_results: int = 10  # Increased to capture more context including sharecodes
+    stream: bool = False  # True: réponse en Server-Sent Events, token par token
 
 
 class ChatResponse(BaseModel):
@@ -53,12 +60,27 @@ class ChatResponse(BaseModel):
     rag_confidence: Optional[float] = None
 
 
+@dataclass
+class PreparedPrompt:
+    """Prompt système et métadonnées RAG prêts pour la génération"""
+
+    system_prompt: Optional[str] = None
+    context_used: Optional[Dict[str, Any]] = None
+    rag_used: bool = False
+    rag_sources: Optional[List[Dict[str, Any]]] = None
+    rag_confidence: Optional[float] = None
+
+
 @router.get("/health")
-async def health_check(settings: Settings = Depends(get_settings)):
+async def health_check(
+    refresh: bool = False,
+    monitor: ProviderHealthMonitor = Depends(get_health_monitor),
+):
+    """État du provider IA (en cache, refresh=true force une sonde)"""
     try:
-        async with create_llm_service(settings) as llm:
-            health_status = await llm.health_check()
-            return health_status
+        if refresh:
+            return await monitor.check_now()
+        return monitor.get_status()
     except Exception as e:
         logger.error(f"Erreur lors du health check: {e}")
         raise HTTPException(
@@ -67,16 +89,18 @@ async def health_check(settings: Settings = Depends(get_settings)):
 
 
 @router.get("/models")
-async def get_available_models(settings: Settings = Depends(get_settings)):
+async def get_available_models(
+    llm: LLMService = Depends(get_llm_service),
+    monitor: ProviderHealthMonitor = Depends(get_health_monitor),
+):
     try:
-        async with create_llm_service(settings) as llm:
-            models = await llm.get_available_models()
-            health_status = await llm.health_check()
-            return {
-                "models": models,
-                "default_model": health_status.get("model"),
-                "provider": health_status.get("provider"),
-            }
+        models = await llm.get_available_models()
+        health_status = monitor.get_status()
+        return {
+            "models": models,
+            "default_model": health_status.get("model"),
+            "provider": health_status.get("provider"),
+        }
     except Exception as e:
         logger.error(f"Erreur lors de la récupération des modèles: {e}")
         raise HTTPException(
@@ -88,108 +112,40 @@ async def get_available_models(settings: Settings = Depends(get_settings)):
 async def send_message(
     request: ChatRequest,
     db: AsyncSession = Depends(get_db),
-    settings: Settings = Depends(get_settings),
+    llm: LLMService = Depends(get_llm_service),
+    monitor: ProviderHealthMonitor = Depends(get_health_monitor),
 ):
-    import time
-
     start_time = time.time()
 
+    if request.stream:
+        return await _stream_message(request, llm, monitor, start_time)
+
     try:
-        async with create_llm_service(settings) as llm:
-            # Vérification de la santé du provider
-            health_status = await llm.health_check()
-            if health_status["status"] != "healthy":
-                raise HTTPException(
-                    status_code=503,
-                    detail=f"Provider {health_status['provider']} non accessible",
-                )
+        # État du provider lu depuis le moniteur (pas d'appel réseau)
+        health_status = _ensure_provider_available(monitor)
 
-            # Construire le contexte utilisateur si demandé
-            system_prompt = None
-            context_used = None
-
-            if request.include_user_context:
-                context_builder = create_llm_context_builder()
-                context = await context_builder.build_context(db)
-                system_prompt = context_builder.format_context_for_llm(context)
-                context_used = {
-                    "trend": context["analysis"]["trend"],
-                    "weak_points": context["analysis"]["weak_points"],
-                    "strengths": context["analysis"]["strengths"],
-                }
-
-            # RAG integration
-            rag_context = None
-            rag_sources = None
-            rag_confidence = None
-            rag_used = False
-
-            if request.rag_mode in ["hybrid", "only"]:
-                try:
-                    from app.services.rag_service import RAGService
-
-                    rag_service = RAGService(db)
-
-                    # Retrieve relevant chunks from PDFs
-                    rag_result = await rag_service.query(
-                        query=request.message,
-                        max_results=request.rag_max_results,
-                        safety_level="general",
-                    )
-
-                    if rag_result["sources"]:
-                        rag_used = True
-                        rag_sources = rag_result["sources"]
-                        rag_confidence = rag_result["confidence"]
-                        rag_context = "\n\n".join(
-                            [
-                                f"[Source: {s['title']}]\n{s['content']}\n(Relevance: {s['relevance']:.2f})"
-                                for s in rag_result["sources"]
-                            ]
-                        )
-
-                        # Mode hybride : combiner RAG + system_prompt (user stats)
-                        if request.rag_mode == "hybrid":
-                            if system_prompt:
-                                # Combine user stats + RAG documents for personalized advice
-                                system_prompt += f"\n\n## Relevant Training Documents:\n{rag_context}"
-                            else:
-                                system_prompt = f"You are an aim training assistant.\n\n## Relevant Training Documents:\n{rag_context}"
-
-                        # Mode RAG only : remplacer system_prompt
-                        elif request.rag_mode == "only":
-                            system_prompt = f"""You are an assistant that answers ONLY based on the documents provided below.
-If the answer is not in the documents, say so clearly.
+        prepared = await _prepare_prompt(request)
 
-## Available Documents:
-{rag_context}"""
-
-                except Exception as e:
-                    logger.warning(f"RAG query failed: {e}")
-                    # Continuer sans RAG en mode hybride, échouer en mode only
-                    if request.rag_mode == "only":
-                        raise HTTPException(
-                            status_code=500, detail="RAG required but failed"
-                        )
-
-            # Génération de la réponse spécialisée
-            response = await llm.generate_response(
-                prompt=request.message, system_prompt=system_prompt
-            )
+        # Génération de la réponse spécialisée
+        response = await llm.generate_response(
+            prompt=request.message, system_prompt=prepared.system_prompt
+        )
 
-            response_time = time.time() - start_time
+        response_time = time.time() - start_time
 
-            # Sauvegarder la conversation
-            await _save_conversation(request.message, response, context_used, db)
+        # Sauvegarder la conversation
+        await _save_conversation(
+            request.message, response, prepared.context_used, db
+        )
 
-            return ChatResponse(
-                message=response,
-                model_used=request.model or health_status["model"],
-                response_time=response_time,
-                rag_used=rag_used,
-                rag_sources=rag_sources,
-                rag_confidence=rag_confidence,
-            )
+        return ChatResponse(
+            message=response,
+            model_used=request.model or health_status["model"],
+            response_time=response_time,
+            rag_used=prepared.rag_used,
+            rag_sources=prepared.rag_sources,
+            rag_confidence=prepared.rag_confidence,
+        )
 
     except HTTPException:
         raise
@@ -198,57 +154,253 @@ If the answer is not in the documents, say so clearly.
         raise HTTPException(status_code=500, detail="Erreur interne du serveur")
 
 
+async def _stream_message(
+    request: ChatRequest,
+    llm: LLMService,
+    monitor: ProviderHealthMonitor,
+    start_time: float,
+) -> StreamingResponse:
+    """
+    Variante streaming de send_message (Server-Sent Events)
+    Les vérifications et la préparation du prompt se font avant l'ouverture du flux
+    pour pouvoir encore renvoyer un code d'erreur HTTP
+    """
+    try:
+        health_status = _ensure_provider_available(monitor)
+        prepared = await _prepare_prompt(request)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erreur lors de la préparation du streaming: {e}")
+        raise HTTPException(status_code=500, detail="Erreur interne du serveur")
+
+    model_used = request.model or health_status["model"]
+
+    async def event_stream() -> AsyncIterator[str]:
+        chunks: List[str] = []
+        first_token_time = None
+        try:
+            yield _sse_event(
+                "meta",
+                {
+                    "model_used": model_used,
+                    "rag_used": prepared.rag_used,
+                    "rag_sources": prepared.rag_sources,
+                    "rag_confidence": prepared.rag_confidence,
+                },
+            )
+
+            async for token in llm.stream_response(
+                prompt=request.message,
+                system_prompt=prepared.system_prompt,
+            ):
+                if first_token_time is None:
+                    first_token_time = time.time() - start_time
+                chunks.append(token)
+                yield _sse_event("token", {"token": token})
+
+            response = "".join(chunks)
+
+            # La session de la requête n'est plus garantie une fois la réponse envoyée
+            async with get_session_local()() as session:
+                await _save_conversation(
+                    request.message, response, prepared.context_used, session
+                )
+
+            yield _sse_event(
+                "done",
+                {
+                    "response_time": time.time() - start_time,
+                    "time_to_first_token": first_token_time,
+                },
+            )
+        except Exception as e:
+            logger.error(f"Erreur pendant le streaming de la réponse: {e}")
+            yield _sse_event("error", {"detail": "Erreur lors de la génération de la réponse"})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _ensure_provider_available(monitor: ProviderHealthMonitor) -> Dict[str, Any]:
+    """Lève une 503 si le circuit du provider est ouvert, retourne son état sinon"""
+    health_status = monitor.get_status()
+    if not monitor.is_available():
+        raise HTTPException(
+            status_code=503,
+            detail=f"Provider {health_status['provider']} non accessible",
+        )
+    return health_status
+
+
+def _sse_event(event: str, data: Dict[str, Any]) -> str:
+    """Formate un événement Server-Sent Events"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+async def _run_stage(name: str, coro: Awaitable[Any], timeout: float) -> Optional[Any]:
+    """
+    Exécute une étape du pipeline avec son propre timeout
+    Une étape lente ou en erreur est ignorée (None) au lieu de faire échouer le chat
+    """
+    stage_start = time.time()
+    try:
+        result = await asyncio.wait_for(coro, timeout=timeout)
+        logger.debug(f"Étape {name} terminée en {time.time() - stage_start:.3f}s")
+        return result
+    except asyncio.TimeoutError:
+        logger.warning(f"Étape {name} abandonnée après {timeout}s")
+    except Exception as e:
+        logger.warning(f"Étape {name} en échec: {e}")
+    return None
+
+
+async def _context_stage() -> Tuple[Dict[str, Any], str]:
+    """
+    Étape contexte: stats locales + KovaaK's, formatées pour le LLM (en cache)
+    Utilise sa propre session: un timeout peut annuler une requête en cours, la
+    session de la requête doit rester saine pour la sauvegarde de la conversation
+    """
+    async with get_session_local()() as session:
+        context_builder = create_llm_context_builder()
+        result = await context_builder.get_context(session)
+    return result["context"], result["system_prompt"]
+
+
+async def _rag_stage(request: ChatRequest) -> Dict[str, Any]:
+    """
+    Étape RAG: embedding de la question + recherche pgvector
+    Utilise sa propre session, une AsyncSession ne supportant pas les requêtes concurrentes
+    """
+    from app.services.rag_service import RAGService
+
+    async with get_session_local()() as session:
+        rag_service = RAGService(session)
+
+        # Retrieve relevant chunks from PDFs (retrieval only, no second LLM call)
+        return await rag_service.retrieve(
+            query=request.message,
+            max_results=request.rag_max_results,
+            safety_level="general",
+        )
+
+
+async def _prepare_prompt(request: ChatRequest) -> PreparedPrompt:
+    """
+    Construit le prompt système (contexte utilisateur + documents RAG)
+    Les deux étapes sont indépendantes et s'exécutent en parallèle: la latence
+    est celle de l'étape la plus lente, pas leur somme
+    """
+    settings = get_settings()
+    prepared = PreparedPrompt()
+    use_rag = request.rag_mode in ["hybrid", "only"]
+
+    async def _skipped() -> None:
+        return None
+
+    context_result, rag_result = await asyncio.gather(
+        _run_stage("context", _context_stage(), settings.chat_context_timeout)
+        if request.include_user_context else _skipped(),
+        _run_stage("rag", _rag_stage(request), settings.chat_rag_timeout)
+        if use_rag else _skipped(),
+    )
+
+    # Contexte utilisateur (absent si l'étape a échoué ou dépassé son délai)
+    if context_result is not None:
+        context, prepared.system_prompt = context_result
+        prepared.context_used = {
+            "trend": context["analysis"]["trend"],
+            "weak_points": context["analysis"]["weak_points"],
+            "strengths": context["analysis"]["strengths"],
+        }
+
+    # RAG integration
+    if use_rag and rag_result is None:
+        # Continuer sans RAG en mode hybride, échouer en mode only
+        if request.rag_mode == "only":
+            raise HTTPException(
+                status_code=500, detail="RAG required but failed"
+            )
+
+    elif use_rag and rag_result["sources"]:
+        prepared.rag_used = True
+        prepared.rag_sources = rag_result["sources"]
+        prepared.rag_confidence = rag_result["confidence"]
+        rag_context = "\n\n".join(
+            [
+                f"[Source: {s['title']}]\n{s['content']}\n(Relevance: {s['relevance']:.2f})"
+                for s in rag_result["sources"]
+            ]
+        )
+
+        # Mode hybride : combiner RAG + system_prompt (user stats)
+        if request.rag_mode == "hybrid":
+            if prepared.system_prompt:
+                # Combine user stats + RAG documents for personalized advice
+                prepared.system_prompt += f"\n\n## Relevant Training Documents:\n{rag_context}"
+            else:
+                prepared.system_prompt = f"You are an aim training assistant.\n\n## Relevant Training Documents:\n{rag_context}"
+
+        # Mode RAG only : remplacer system_prompt
+        elif request.rag_mode == "only":
+            prepared.system_prompt = f"""You are an assistant that answers ONLY based on the documents provided below.
+If the answer is not in the documents, say so clearly.
+
+## Available Documents:
+{rag_context}"""
+
+    return prepared
+
+
 @router.post("/conversation")
 async def send_conversation(
     messages: List[ChatMessage],
     db: AsyncSession = Depends(get_db),
-    settings: Settings = Depends(get_settings),
+    llm: LLMService = Depends(get_llm_service),
+    monitor: ProviderHealthMonitor = Depends(get_health_monitor),
 ):
 
     try:
-        async with create_llm_service(settings) as llm:
-            health_status = await llm.health_check()
-            if health_status["status"] != "healthy":
-                raise HTTPException(
-                    status_code=503,
-                    detail=f"Provider {health_status['provider']} non accessible",
-                )
-
-            # Pour l'instant, on prend le dernier message utilisateur
-            # TODO: Implémenter la gestion complète de conversation
-            last_user_message = None
-            for msg in reversed(messages):
-                if msg.role == "user":
-                    last_user_message = msg.content
-                    break
-
-            if not last_user_message:
-                raise HTTPException(
-                    status_code=400, detail="Aucun message utilisateur trouvé"
-                )
+        health_status = _ensure_provider_available(monitor)
+
+        # Pour l'instant, on prend le dernier message utilisateur
+        # TODO: Implémenter la gestion complète de conversation
+        last_user_message = None
+        for msg in reversed(messages):
+            if msg.role == "user":
+                last_user_message = msg.content
+                break
+
+        if not last_user_message:
+            raise HTTPException(
+                status_code=400, detail="Aucun message utilisateur trouvé"
+            )
 
-            # Construire le contexte utilisateur
-            context_builder = create_llm_context_builder()
-            context = await context_builder.build_context(db)
-            system_prompt = context_builder.format_context_for_llm(context)
+        # Construire le contexte utilisateur
+        system_prompt = None
+        context_used = None
+        context_result = await _run_stage(
+            "context", _context_stage(), get_settings().chat_context_timeout
+        )
+        if context_result is not None:
+            context, system_prompt = context_result
+            context_used = {
+                "trend": context["analysis"]["trend"],
+                "weak_points": context["analysis"]["weak_points"],
+                "strengths": context["analysis"]["strengths"],
+            }
 
-            response = await llm.generate_response(
-                prompt=last_user_message, system_prompt=system_prompt
-            )
+        response = await llm.generate_response(
+            prompt=last_user_message, system_prompt=system_prompt
+        )
 
-            # Sauvegarder la conversation
-            await _save_conversation(
-                last_user_message,
-                response,
-                {
-                    "trend": context["analysis"]["trend"],
-                    "weak_points": context["analysis"]["weak_points"],
-                    "strengths": context["analysis"]["strengths"],
-                },
-                db,
-            )
+        # Sauvegarder la conversation
+        await _save_conversation(last_user_message, response, context_used, db)
 
-            return ChatResponse(message=response, model_used=health_status["model"])
+        return ChatResponse(message=response, model_used=health_status["model"])
 
     except HTTPException:
         raise
@@ -167,7 +167,7 @@ async def get_personalized_recommendations(
     try:
         # Construire le contexte utilisateur
         context_builder = create_llm_context_builder()
-        context = await context_builder.build_context(db)
+        context = (await context_builder.get_context(db))["context"]
         
         analysis = context["analysis"]
         weak_points = analysis["weak_points"]
@@ -5,6 +5,7 @@ import logging
 from app.database import get_db
 from app.services.llm_context_builder import create_llm_context_builder
 from app.services.cache_service import CacheService
+from app.services.trend_analyzer import schedule_trend_refresh
 from sqlalchemy.ext.asyncio import AsyncSession
 
 logger = logging.getLogger(__name__)
@@ -19,10 +20,10 @@ async def get_user_context(
     """Récupère le contexte complet pour le LLM"""
     try:
         context_builder = create_llm_context_builder()
-        context = await context_builder.build_context(db, days=days)
+        result = await context_builder.get_context(db, days=days)
         
         return {
-            "context": context
+            "context": result["context"]
         }
         
     except Exception as e:
@@ -40,8 +41,9 @@ async def get_formatted_context(
     """Récupère le contexte formaté pour le system prompt du LLM"""
     try:
         context_builder = create_llm_context_builder()
-        context = await context_builder.build_context(db, days=days)
-        formatted_context = context_builder.format_context_for_llm(context)
+        result = await context_builder.get_context(db, days=days)
+        context = result["context"]
+        formatted_context = result["system_prompt"]
         
         return {
             "system_prompt": formatted_context,
@@ -66,6 +68,7 @@ async def refresh_context_cache() -> Dict[str, str]:
     try:
         cache = CacheService()
         await cache.invalidate_stats_cache()
+        schedule_trend_refresh()
         
         return {
             "message": "Cache de contexte rafraîchi"
@@ -86,7 +89,7 @@ async def get_performance_analysis(
     """Récupère l'analyse de performance"""
     try:
         context_builder = create_llm_context_builder()
-        context = await context_builder.build_context(db, days=days)
+        context = (await context_builder.get_context(db, days=days))["context"]
         
         return {
             "period_days": days,
@@ -7,7 +7,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_db
 from app.services.rag_service import RAGService
-from app.services.embedding_service import EmbeddingService
+from app.services.embedding_service import get_embedding_service
 from app.services.pdf_service import PDFService
 from app.constants import SAFETY_LEVELS, DEFAULT_SAFETY_LEVEL
 
@@ -43,6 +43,11 @@ class QueryResponse(BaseModel):
     confidence: float
 
 
+class RetrieveResponse(BaseModel):
+    sources: List[dict]
+    confidence: float
+
+
 class IngestResponse(BaseModel):
     document_id: int
     chunks_created: int
@@ -70,6 +75,29 @@ async def query_rag(
         raise HTTPException(status_code=500, detail=f"RAG query failed: {str(e)}")
 
 
+@router.post("/retrieve", response_model=RetrieveResponse)
+async def retrieve_rag(
+    request: QueryRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Retrieve ranked source chunks without generating an answer
+    """
+    try:
+        rag_service = RAGService(db)
+        result = await rag_service.retrieve(
+            query=request.query,
+            max_results=request.max_results,
+            topics=request.topics,
+            safety_level=request.safety_level
+        )
+        return result
+    except Exception as e:
+        logger.error(f"RAG retrieval failed: {str(e)}")
+        logger.error(traceback.format_exc())
+        raise HTTPException(status_code=500, detail=f"RAG retrieval failed: {str(e)}")
+
+
 @router.post("/ingest/pdf", response_model=IngestResponse)
 async def ingest_pdf(
     file: UploadFile = File(...),
@@ -203,13 +231,14 @@ async def health_check():
     Check RAG system health and embedding service status
     """
     try:
-        embedding_service = EmbeddingService()
+        embedding_service = get_embedding_service()
         is_healthy = await embedding_service.health_check()
         
         return {
             "status": "healthy" if is_healthy else "unhealthy",
             "embedding_service": "available" if is_healthy else "unavailable",
-            "vector_dimension": 384  # FastEmbed bge-small
+            "vector_dimension": embedding_service.get_embedding_dimension(),
+            "embedding_model": embedding_service.get_status()
         }
     except Exception as e:
         return {
@@ -1,22 +1,41 @@
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Query, Response
 from typing import List, Optional
+import asyncio
 import logging
 import hashlib
 import json
-from datetime import datetime
+import tempfile
+import zipfile
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
 
 from app.database import get_db
 from app.services.stats_parser import create_stats_parser
+from app.services.stats_queries import fetch_best_scores, fetch_history_page, fetch_history_summary
+from app.services.stats_folder_importer import create_stats_folder_importer, extract_run_files
 from app.services.cache_service import CacheService
+from app.services.trend_analyzer import schedule_trend_refresh
 from sqlalchemy.ext.asyncio import AsyncSession
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/stats", tags=["stats"])
 
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def _hash_file(fileobj) -> str:
+    """SHA-256 d'un fichier lu par blocs (mémoire bornée)"""
+    digest = hashlib.sha256()
+    fileobj.seek(0)
+    for block in iter(lambda: fileobj.read(HASH_BLOCK_SIZE), b""):
+        digest.update(block)
+    return digest.hexdigest()
+
 @router.post("/upload")
 async def upload_csv(
     file: UploadFile = File(...),
+    stream: bool = Query(False, description="Parse et insère le fichier par morceaux (mémoire bornée)"),
     db: AsyncSession = Depends(get_db)
 ):
     """Upload et parse un fichier CSV de stats KovaaK's"""
@@ -27,19 +46,32 @@ async def upload_csv(
         )
     
     try:
-        # Lire le contenu du fichier
-        content = await file.read()
-        
-        # Parser le CSV
         parser = create_stats_parser()
-        result = await parser.parse_csv_file(content, db)
         
-        # Invalider le cache des stats
-        cache = CacheService()
-        await cache.invalidate_stats_cache()
+        if stream:
+            # Lecture directe du fichier temporaire de l'upload, morceau par morceau
+            file_hash = await asyncio.to_thread(_hash_file, file.file)
+            await file.seek(0)
+            result = await parser.parse_csv_stream(
+                file.file, db, file_hash=file_hash, filename=file.filename
+            )
+        else:
+            # Lire le contenu du fichier
+            content = await file.read()
+            
+            # Parser le CSV (ignoré si ce fichier a déjà été importé)
+            result = await parser.parse_csv_file(
+                content, db, file_hash=hashlib.sha256(content).hexdigest(), filename=file.filename
+            )
+        
+        # Invalider le cache des stats (inutile si rien n'a été inséré)
+        if result["total_entries"]:
+            cache = CacheService()
+            await cache.invalidate_stats_cache()
+            schedule_trend_refresh()
         
         return {
-            "message": f"Fichier uploadé avec succès",
+            "message": "Fichier déjà importé, ignoré" if result["already_imported"] else "Fichier uploadé avec succès",
             "filename": file.filename,
             **result
         }
@@ -56,35 +88,126 @@ async def upload_csv(
             detail="Erreur lors du traitement du fichier"
         )
 
+@router.post("/upload/folder")
+async def upload_stats_folder(
+    file: UploadFile = File(...),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Importe une archive zip du dossier Stats de KovaaK's (un CSV par partie)
+    Les fichiers déjà importés (nom ou contenu) sont ignorés
+    """
+    if not file.filename.endswith('.zip'):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Le fichier doit être une archive zip du dossier Stats"
+        )
+    
+    try:
+        with tempfile.TemporaryDirectory(prefix="kovaaks-stats-") as tmp_dir:
+            paths = await asyncio.to_thread(extract_run_files, file.file, Path(tmp_dir))
+            if not paths:
+                raise ValueError("Aucun fichier de partie KovaaK's (\"... Stats.csv\") dans l'archive")
+            
+            importer = create_stats_folder_importer()
+            result = await importer.import_files(db, paths)
+        
+        if result["total_entries"]:
+            cache = CacheService()
+            await cache.invalidate_stats_cache()
+            schedule_trend_refresh()
+        
+        return {
+            "message": "Dossier Stats importé",
+            "filename": file.filename,
+            **result
+        }
+        
+    except (ValueError, zipfile.BadZipFile) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"Erreur lors de l'import du dossier Stats: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Erreur lors de l'import du dossier Stats"
+        )
+
 @router.get("/history")
 async def get_stats_history(
     db: AsyncSession = Depends(get_db),
     days: int = Query(30, ge=1, le=365),
-    page: int = Query(1, ge=1),
-    limit: int = Query(50, ge=1, le=1000)
+    limit: int = Query(50, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="Curseur next_cursor de la page précédente"),
+    scenario: Optional[str] = Query(None, description="Filtrer sur un scénario"),
+    start_date: Optional[datetime] = Query(None, description="Début de la période (remplace days)"),
+    end_date: Optional[datetime] = Query(None, description="Fin de la période (exclue)")
 ):
-    """Récupère l'historique des stats avec pagination"""
+    """Récupère l'historique des stats avec pagination keyset (curseur)"""
     try:
-        parser = create_stats_parser()
-        summary = await parser.get_stats_summary(db, days=days)
+        window_start = start_date or datetime.now(timezone.utc) - timedelta(days=days)
+        
+        page = await fetch_history_page(
+            db,
+            start_date=window_start,
+            end_date=end_date,
+            scenario_name=scenario,
+            cursor=cursor,
+            limit=limit
+        )
         
-        # Pagination des stats récentes
-        start_idx = (page - 1) * limit
-        end_idx = start_idx + limit
-        paginated_stats = summary["recent_stats"][start_idx:end_idx]
+        # Agrégats de la période (indépendants de la page): rollup pour la fenêtre glissante
+        # par défaut, calcul exact sur les mêmes filtres que la page sinon
+        if start_date is None and end_date is None and not scenario:
+            parser = create_stats_parser()
+            summary = (await parser.get_stats_summary(db, days=days, recent_limit=0))["summary"]
+        else:
+            history_summary = await fetch_history_summary(
+                db,
+                start_date=window_start,
+                end_date=end_date,
+                scenario_name=scenario
+            )
+            summary = {
+                "period_days": None if start_date else days,
+                "total_plays": history_summary.total_plays,
+                "avg_score": history_summary.average_score,
+                "avg_accuracy": history_summary.average_accuracy
+            }
+        summary["scenario"] = scenario
         
         return {
-            "period_days": days,
+            "period_days": None if start_date else days,
+            "period": {
+                "start": window_start.isoformat(),
+                "end": end_date.isoformat() if end_date else None
+            },
             "pagination": {
-                "page": page,
                 "limit": limit,
-                "total": len(summary["recent_stats"]),
-                "has_more": end_idx < len(summary["recent_stats"])
+                "next_cursor": page.next_cursor,
+                "has_more": page.next_cursor is not None
             },
-            "stats": paginated_stats,
-            "summary": summary["summary"]
+            "stats": [
+                {
+                    "id": stat.id,
+                    "scenario_name": stat.scenario_name,
+                    "score": stat.score,
+                    "accuracy": stat.accuracy,
+                    "kills": stat.kills,
+                    "played_at": stat.played_at.isoformat() if stat.played_at else None
+                }
+                for stat in page.rows
+            ],
+            "summary": summary
         }
         
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except Exception as e:
         logger.error(f"Erreur lors de la récupération de l'historique: {e}")
         raise HTTPException(
@@ -114,16 +237,29 @@ async def get_scenario_stats(
 @router.get("/progress")
 async def get_progress(
     db: AsyncSession = Depends(get_db),
-    days: int = Query(30, ge=1, le=365)
+    days: int = Query(30, ge=1, le=365),
+    bucket: str = Query("day", regex="^(day|week)$", description="Granularité: day ou week"),
+    scenario: Optional[str] = Query(None, description="Limiter à un scénario"),
+    limit: int = Query(10, ge=1, le=50, description="Nombre de scénarios (les plus joués)"),
+    rolling_window: int = Query(7, ge=1, le=52, description="Périodes de la moyenne glissante")
 ):
-    """Récupère la progression"""
+    """Récupère la progression par scénario (séries prêtes pour les graphiques)"""
     try:
         parser = create_stats_parser()
-        summary = await parser.get_stats_summary(db, days=days)
+        summary = await parser.get_stats_summary(db, days=days, recent_limit=0)
+        progression = await parser.get_progression(
+            db,
+            days=days,
+            bucket=bucket,
+            scenario_name=scenario,
+            rolling_window=rolling_window,
+            scenario_limit=limit
+        )
         
         return {
             "period_days": days,
-            "progression": summary["progression"],
+            "bucket": bucket,
+            "progression": progression,
             "top_scenarios": summary["top_scenarios"],
             "summary": summary["summary"]
         }
@@ -140,20 +276,22 @@ async def get_best_scores(
     db: AsyncSession = Depends(get_db),
     limit: int = Query(20, ge=1, le=100)
 ):
-    """Récupère les meilleurs scores par scénario"""
+    """Récupère les meilleurs scores par scénario (records personnels)"""
     try:
-        parser = create_stats_parser()
-        summary = await parser.get_stats_summary(db, days=365)
-        
-        # Trier par meilleur score
-        best_scores = sorted(
-            summary["top_scenarios"], 
-            key=lambda x: x["best_score"], 
-            reverse=True
-        )[:limit]
+        best_scores = await fetch_best_scores(db, limit=limit)
         
         return {
-            "best_scores": best_scores
+            "best_scores": [
+                {
+                    "scenario_name": best.scenario_name,
+                    "best_score": best.best_score,
+                    "best_played_at": best.best_played_at.isoformat() if best.best_played_at else None,
+                    "avg_score": best.avg_score,
+                    "plays": best.plays,
+                    "last_played_at": best.last_played_at.isoformat() if best.last_played_at else None
+                }
+                for best in best_scores
+            ]
         }
         
     except Exception as e:
@@ -172,6 +310,7 @@ async def delete_stat(
     try:
         from sqlalchemy import select
         from app.models.stats import LocalStats
+        from app.services.stats_rollup import rebuild_daily_rollup, rebuild_scenario_summary
         
         # Vérifier que la stat existe
         result = await db.execute(
@@ -186,8 +325,17 @@ async def delete_stat(
             )
         
         await db.delete(stat)
+        # Les rollups sont recalculés depuis local_stats: la suppression doit être émise avant
+        await db.flush()
+        if stat.played_at is not None:
+            await rebuild_daily_rollup(db, stat.scenario_name, stat.played_at)
+        await rebuild_scenario_summary(db, stat.scenario_name)
         await db.commit()
         
+        cache = CacheService()
+        await cache.invalidate_stats_cache()
+        schedule_trend_refresh()
+        
         return {
             "message": "Stat supprimée avec succès",
             "stat_id": stat_id
@@ -1,6 +1,7 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import Field, AliasChoices, field_validator
 from typing import List, Optional
+import httpx
 import os
 import json
 
@@ -21,6 +22,41 @@ class Settings(BaseSettings):
     groq_api_key: Optional[str] = None
     groq_model: str = "openai/gpt-oss-120b"
     
+    # Surveillance du provider IA (health monitor + circuit breaker)
+    llm_health_check_interval: int = 30  # secondes entre deux sondes
+    llm_circuit_failure_threshold: int = 3  # échecs consécutifs avant ouverture
+    llm_circuit_reset_timeout: int = 60  # secondes avant de retenter (half-open)
+    
+    # Pool de connexions HTTP des clients IA (partagés par tout le process)
+    llm_pool_max_connections: int = 20
+    llm_pool_max_keepalive: int = 10
+    llm_pool_keepalive_expiry: float = 30.0  # secondes
+    
+    # Pipeline de chat: délai maximum par étape (contexte et RAG en parallèle)
+    chat_context_timeout: float = 8.0  # secondes
+    chat_rag_timeout: float = 5.0  # secondes
+    
+    # Modèle d'embeddings du RAG (chargé une fois par process)
+    embedding_model: str = "BAAI/bge-small-en-v1.5"
+    embedding_warmup: bool = True  # chargement + inférence de chauffe au démarrage
+    # Micro-batching des embeddings de requêtes: les appels concurrents sont regroupés
+    # en une seule inférence (jusqu'à N textes ou M millisecondes d'attente)
+    embedding_batch_max_size: int = 32
+    embedding_batch_max_wait_ms: float = 5.0
+    # Cache LRU des embeddings de requêtes (texte normalisé -> vecteur float32)
+    query_embedding_cache_size: int = 2048
+    query_embedding_cache_ttl: int = 86400  # secondes
+    query_embedding_cache_redis: bool = False  # partage entre workers via Redis
+    # Ingestion RAG: chunks embeddés par lots (lot suivant embeddé pendant l'écriture du précédent)
+    rag_ingest_batch_size: int = 64
+    rag_copy_attempts: int = 3  # tentatives par lot (COPY dans un savepoint)
+    # Index ivfflat supprimé puis reconstruit autour des chargements d'au moins N chunks
+    # (0: jamais). Verrouille rag_document_chunks (retrieval bloqué) jusqu'au commit
+    rag_index_rebuild_min_chunks: int = 0
+    
+    # Construction du contexte LLM: délai maximum par source (stats locales, API KovaaK's)
+    context_source_timeout: float = 3.0  # secondes
+    
     # Configuration utilisateur KovaaK's (pour l'API)
     # Supporte les deux variables d'env: KOVAAKS_USERNAME ou CURRENT_USER_KOVAAKS_USERNAME
     kovaaks_username: str = Field(
@@ -58,6 +94,29 @@ class Settings(BaseSettings):
     # Configuration KovaaK's Proxy
     kovaaks_proxy_url: str = "http://localhost:9000"
     
+    # Pool partagé pour le travail CPU-bound (pandas, PyMuPDF)
+    # "thread": parsing limité par le GIL (un seul cœur pour les fichiers du dossier Stats)
+    # "process" requis pour paralléliser le parsing dans l'API (watcher, imports)
+    cpu_executor_kind: str = "thread"  # "thread" ou "process" (contourne le GIL)
+    cpu_executor_workers: Optional[int] = None  # None: min(4, nombre de CPU)
+    
+    # Upload CSV en streaming: lignes parsées et insérées par morceau
+    stats_upload_chunk_size: int = 50000
+    
+    # Import du dossier Stats KovaaK's (un CSV par partie)
+    stats_import_workers: Optional[int] = None  # processus de parsing, None: nombre de CPU
+    stats_import_batch_size: int = 500  # fichiers parsés et insérés par lot
+    
+    # Surveillance du dossier Stats KovaaK's (import automatique des nouvelles parties)
+    kovaaks_stats_dir: Optional[str] = None  # None: surveillance désactivée
+    stats_watch_debounce_ms: int = 2000  # regroupe les rafales de fichiers
+    stats_watch_poll_interval: float = 5.0  # secondes (mode polling)
+    stats_watch_force_polling: bool = False  # ex: dossier monté depuis Windows/Docker
+    
+    # Partitionnement mensuel de local_stats (opt-in, conversion via scripts/partition_local_stats.py)
+    stats_partitioning: bool = False
+    stats_partition_months_ahead: int = 3  # partitions créées à l'avance au démarrage
+    
     # Configuration Redis Cache TTL
     redis_cache_ttl: int = 300  # 5 minutes par défaut
     redis_stats_ttl: int = 3600  # 1 heure pour les stats
@@ -78,6 +137,15 @@ class Settings(BaseSettings):
         """URL de base pour Ollama - modulaire localhost/IP"""
         return f"http://{self.ollama_host}:{self.ollama_port}"
     
+    @property
+    def llm_http_limits(self) -> httpx.Limits:
+        """Limites du pool de connexions pour les clients IA"""
+        return httpx.Limits(
+            max_connections=self.llm_pool_max_connections,
+            max_keepalive_connections=self.llm_pool_max_keepalive,
+            keepalive_expiry=self.llm_pool_keepalive_expiry,
+        )
+    
     @property
     def ollama_generate_url(self) -> str:
         """URL pour la génération de texte avec Ollama"""
@@ -52,3 +52,5 @@ DEFAULT_DOCUMENT_TYPE = "document"
 # Trend detection thresholds
 TREND_IMPROVING_THRESHOLD = 0.05  # 5% improvement
 TREND_DECLINING_THRESHOLD = -0.05  # 5% decline
+TREND_MIN_DAYS = 3  # Distinct played days needed to fit a scenario slope
+TREND_WINDOW_DAYS = 30  # Window precomputed after each stats import
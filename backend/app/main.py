@@ -8,6 +8,13 @@ import logging
 from app.config import settings
 from app.database import create_tables, close_connections
 from app.api import chat, kovaaks, stats, exercises, llm_context, rag
+from app.services.health_monitor import get_health_monitor
+from app.services.cpu_executor import get_cpu_executor, shutdown_cpu_executor
+from app.services.embedding_service import get_embedding_service
+from app.services.query_embedding_cache import get_query_embedding_cache
+from app.services.stats_partitioning import prepare_partitions
+from app.services.stats_watcher import get_stats_watcher
+from app.services.llm_service import get_llm_service, close_llm_service
 
 # Configuration du logging
 logging.basicConfig(
@@ -22,11 +29,30 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("Starting KovaaK's AI Trainer API...")
     logger.info("Database tables are managed by Alembic migrations")
+    if settings.stats_partitioning:
+        await prepare_partitions(settings.stats_partition_months_ahead)
+    llm_service = get_llm_service()
+    logger.info(f"LLM provider client ready: {type(llm_service.provider).__name__}")
+    health_monitor = get_health_monitor()
+    await health_monitor.start()
+    if settings.embedding_warmup:
+        # Coût du chargement du modèle ONNX payé une fois au démarrage, pas à la première requête RAG
+        if await get_embedding_service().warm_up():
+            logger.info("Embedding model ready")
+    stats_watcher = get_stats_watcher()
+    await stats_watcher.start()
     
     yield
     
     # Shutdown
     logger.info("Shutting down KovaaK's AI Trainer API...")
+    await stats_watcher.stop()
+    await health_monitor.stop()
+    await get_embedding_service().close()
+    await close_llm_service()
+    logger.info("LLM provider clients closed")
+    shutdown_cpu_executor()
+    logger.info("CPU executor stopped")
     await close_connections()
     logger.info("Database connections closed")
 
@@ -127,7 +153,11 @@ async def health_check():
         "llm_provider": settings.llm_provider,
         "database_configured": bool(settings.database_url),
         "redis_configured": bool(settings.redis_url),
-        "kovaaks_username_configured": bool(settings.kovaaks_username)
+        "kovaaks_username_configured": bool(settings.kovaaks_username),
+        "cpu_executor": get_cpu_executor().get_metrics(),
+        "embedding": get_embedding_service().get_status(),
+        "query_embedding_cache": get_query_embedding_cache().get_metrics(),
+        "stats_watcher": get_stats_watcher().get_status()
     }
 
 if __name__ == "__main__":
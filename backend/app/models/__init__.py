@@ -1,10 +1,13 @@
-from .stats import LocalStats
+from .stats import LocalStats, ScenarioDailyStats, ScenarioSummaryStats, StatsUpload
 from .conversation import Conversation
 from .training import TrainingExample, Dataset, DatasetExample
 from .rag import Document, DocumentChunk
 
 __all__ = [
     "LocalStats",
+    "ScenarioDailyStats",
+    "ScenarioSummaryStats",
+    "StatsUpload",
     "Conversation",
     "TrainingExample",
     "Dataset",
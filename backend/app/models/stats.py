@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text, Index
+from sqlalchemy import Column, Integer, String, Float, DateTime, Date, Text, Index
 from sqlalchemy.sql import func
 from app.database import Base
 
@@ -7,7 +7,7 @@ class LocalStats(Base):
     __tablename__ = "local_stats"
 
     id = Column(Integer, primary_key=True, index=True)
-    scenario_name = Column(String(255), nullable=False, index=True)
+    scenario_name = Column(String(255), nullable=False)
     score = Column(Float)
     accuracy = Column(Float)
     kills = Column(Integer)
@@ -19,10 +19,95 @@ class LocalStats(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     __table_args__ = (
-        Index('idx_scenario', 'scenario_name'),
-        Index('idx_played_at', 'played_at'),
+        # Historique d'un scénario trié par date (sert aussi les recherches par scénario)
+        Index('idx_local_stats_scenario_played_at', 'scenario_name', played_at.desc(), id.desc()),
+        # Pagination keyset de l'historique (ORDER BY played_at DESC, id DESC)
+        Index('idx_local_stats_played_at_id', played_at.desc(), id.desc()),
+        # Scans de fenêtre: parties insérées à peu près dans l'ordre chronologique
+        Index('brin_local_stats_played_at', 'played_at', postgresql_using='brin'),
+        # Clé naturelle d'une partie: dédoublonnage des uploads (ON CONFLICT DO NOTHING)
+        Index('uq_local_stats_run', 'scenario_name', 'played_at', 'score', unique=True),
     )
 
     def __repr__(self):
         return f"<LocalStats(scenario='{self.scenario_name}', score={self.score})>"
 
+
+class ScenarioDailyStats(Base):
+    """Agrégats journaliers par scénario, maintenus à chaque upload CSV"""
+    __tablename__ = "scenario_daily_stats"
+
+    scenario_name = Column(String(255), primary_key=True)
+    day = Column(Date, primary_key=True)  # jour UTC de played_at
+    plays = Column(Integer, nullable=False, default=0)
+    best_score = Column(Float)
+    score_sum = Column(Float, nullable=False, default=0)
+    score_sq_sum = Column(Float, nullable=False, default=0)  # pour la variance
+    scored_plays = Column(Integer, nullable=False, default=0)  # parties avec un score
+    accuracy_sum = Column(Float, nullable=False, default=0)
+    accuracy_plays = Column(Integer, nullable=False, default=0)  # parties avec une précision
+
+    __table_args__ = (
+        Index('idx_daily_stats_day', 'day'),
+    )
+
+    @property
+    def mean_score(self) -> float:
+        return self.score_sum / self.scored_plays if self.scored_plays else 0.0
+
+    @property
+    def mean_accuracy(self) -> float:
+        return self.accuracy_sum / self.accuracy_plays if self.accuracy_plays else 0.0
+
+    def __repr__(self):
+        return f"<ScenarioDailyStats(scenario='{self.scenario_name}', day={self.day}, plays={self.plays})>"
+
+
+class ScenarioSummaryStats(Base):
+    """Agrégats par scénario sur tout l'historique (record, moyenne et variance courantes)"""
+    __tablename__ = "scenario_summary"
+
+    scenario_name = Column(String(255), primary_key=True)
+    plays = Column(Integer, nullable=False, default=0)
+    best_score = Column(Float)
+    best_played_at = Column(DateTime(timezone=True))  # date du record
+    scored_plays = Column(Integer, nullable=False, default=0)  # parties avec un score
+    mean_score = Column(Float, nullable=False, default=0)
+    score_m2 = Column(Float, nullable=False, default=0)  # somme des carrés des écarts à la moyenne (Welford)
+    accuracy_plays = Column(Integer, nullable=False, default=0)  # parties avec une précision
+    mean_accuracy = Column(Float, nullable=False, default=0)
+    first_played_at = Column(DateTime(timezone=True))
+    last_played_at = Column(DateTime(timezone=True))
+
+    __table_args__ = (
+        # /best-scores: ORDER BY best_score DESC NULLS LAST LIMIT n
+        Index('idx_scenario_summary_best_score', best_score.desc().nullslast()),
+    )
+
+    @property
+    def score_variance(self) -> float:
+        return self.score_m2 / self.scored_plays if self.scored_plays else 0.0
+
+    def __repr__(self):
+        return f"<ScenarioSummaryStats(scenario='{self.scenario_name}', plays={self.plays}, best={self.best_score})>"
+
+
+class StatsUpload(Base):
+    """Fichier de stats importé (hash du contenu pour ignorer les ré-uploads identiques)"""
+    __tablename__ = "stats_uploads"
+
+    id = Column(Integer, primary_key=True)
+    file_hash = Column(String(64), nullable=False, unique=True)  # SHA-256 hex
+    filename = Column(String(500))
+    row_count = Column(Integer, nullable=False, default=0)  # lignes valides du fichier
+    inserted_count = Column(Integer, nullable=False, default=0)  # lignes nouvelles
+    first_played_at = Column(DateTime(timezone=True))
+    last_played_at = Column(DateTime(timezone=True))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index('idx_stats_uploads_filename', 'filename'),
+    )
+
+    def __repr__(self):
+        return f"<StatsUpload(filename='{self.filename}', rows={self.row_count})>"
@@ -1,6 +1,6 @@
 from .ollama_service import OllamaService, create_ollama_service
 from .groq_service import GroqService, create_groq_service
-from .llm_service import LLMService, create_llm_service
+from .llm_service import LLMService, create_llm_service, get_llm_service, close_llm_service
 
 __all__ = [
     "OllamaService", 
@@ -8,5 +8,7 @@ __all__ = [
     "GroqService",
     "create_groq_service",
     "LLMService",
-    "create_llm_service"
+    "create_llm_service",
+    "get_llm_service",
+    "close_llm_service"
 ]
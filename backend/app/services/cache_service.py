@@ -50,18 +50,37 @@ class CacheService:
         except Exception as e:
             logger.error(f"Erreur lors de la suppression du pattern {pattern}: {e}")
     
+    # Verrous (protection contre les reconstructions concurrentes)
+    async def acquire_lock(self, name: str, ttl: int = 10) -> bool:
+        """Pose un verrou Redis (SET NX), True si obtenu ou si Redis est indisponible"""
+        try:
+            redis = await get_redis()
+            return bool(await redis.set(f"lock:{name}", "1", nx=True, ex=ttl))
+        except Exception as e:
+            logger.error(f"Erreur lors de la pose du verrou {name}: {e}")
+            return True
+    
+    async def release_lock(self, name: str):
+        """Libère un verrou Redis"""
+        await self.delete(f"lock:{name}")
+    
     # Cache contexte LLM
-    async def get_user_context(self, user_id: int) -> Optional[dict]:
+    async def get_context_key(self, username: str, days: int) -> str:
+        """Clé du contexte LLM: version des stats + utilisateur KovaaK's + fenêtre"""
+        version = await self.get_stats_version()
+        return f"v{version}:{username or 'anonymous'}:days{days}"
+    
+    async def get_user_context(self, context_key: str) -> Optional[dict]:
         """Récupère le contexte utilisateur du cache"""
-        return await self.get(f"llm:context:{user_id}")
+        return await self.get(f"llm:context:{context_key}")
     
-    async def set_user_context(self, user_id: int, context: dict):
+    async def set_user_context(self, context_key: str, context: dict):
         """Stocke le contexte utilisateur dans le cache"""
-        await self.set(f"llm:context:{user_id}", context, self.ttl_context)
+        await self.set(f"llm:context:{context_key}", context, self.ttl_context)
     
-    async def delete_user_context(self, user_id: int):
+    async def delete_user_context(self, context_key: str):
         """Supprime le contexte utilisateur du cache"""
-        await self.delete(f"llm:context:{user_id}")
+        await self.delete(f"llm:context:{context_key}")
     
     # Cache stats KovaaK's
     async def get_kovaaks_profile(self, username: str) -> Optional[dict]:
@@ -145,11 +164,46 @@ class CacheService:
         except Exception as e:
             logger.error(f"Erreur lors du stockage du summary: {e}")
     
+    async def get_stats_progression(self, params_key: str, version: Optional[int] = None) -> Optional[dict]:
+        """Récupère une série de progression avec cache versionné"""
+        if version is None:
+            version = await self.get_stats_version()
+        return await self.get(f"stats:progress:v{version}:{params_key}")
+    
+    async def set_stats_progression(self, params_key: str, progression: dict, version: int, ttl: int = 300):
+        """Stocke une série de progression sous la version lue avant le calcul"""
+        await self.set(f"stats:progress:v{version}:{params_key}", progression, ttl)
+    
+    async def get_stats_trends(self, days: int, version: Optional[int] = None) -> Optional[dict]:
+        """Récupère l'analyse de tendance avec cache versionné"""
+        if version is None:
+            version = await self.get_stats_version()
+        return await self.get(f"stats:trends:v{version}:days{days}")
+    
+    async def set_stats_trends(self, trends: dict, days: int, version: int, ttl: int = 3600):
+        """
+        Stocke l'analyse de tendance sous la version lue AVANT le calcul: un calcul
+        dépassé par un import concurrent reste sous l'ancienne version
+        """
+        await self.set(f"stats:trends:v{version}:days{days}", trends, ttl)
+    
     async def invalidate_stats_cache(self):
         """Invalide tout le cache des stats en incrémentant la version"""
         await self.increment_stats_version()
         # Optionnel: nettoyer les anciennes clés de cache
         await self.delete_pattern("stats:summary:v*")
+        await self.delete_pattern("stats:progress:v*")
+        await self.delete_pattern("stats:trends:v*")
+        await self.delete_pattern("llm:context:*")
+    
+    # Cache des embeddings de requêtes RAG (vecteur float32 encodé en base64)
+    async def get_query_embedding(self, key: str) -> Optional[str]:
+        """Récupère l'embedding encodé d'une requête RAG"""
+        return await self.get(f"rag:query_embedding:{key}")
+    
+    async def set_query_embedding(self, key: str, encoded: str, ttl: int):
+        """Stocke l'embedding encodé d'une requête RAG"""
+        await self.set(f"rag:query_embedding:{key}", encoded, ttl)
     
     # Méthodes de nettoyage
     async def clear_user_cache(self, username: str):
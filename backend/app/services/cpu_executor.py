@@ -0,0 +1,130 @@
+"""
+CPU Executor - Exécution du travail CPU-bound hors de la boucle d'événements
+Pool partagé (threads ou processus selon la config) utilisé par le parsing
+pandas des CSV et l'extraction PyMuPDF des PDF, avec métriques de file et de durée
+"""
+from typing import Any, Callable, Dict, Optional, Tuple
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+import asyncio
+import functools
+import logging
+import os
+import time
+
+from app.config import Settings, get_settings
+
+logger = logging.getLogger(__name__)
+
+
+EXECUTOR_THREAD = "thread"
+EXECUTOR_PROCESS = "process"
+
+
+def _timed_call(func: Callable, args: Tuple, kwargs: Dict) -> Tuple[float, float, Any]:
+    """Exécuté dans le worker: retourne (début, fin, résultat) en temps horloge"""
+    started = time.time()
+    result = func(*args, **kwargs)
+    return started, time.time(), result
+
+
+class CPUExecutor:
+    """Pool process-wide pour le travail CPU-bound, avec métriques"""
+
+    def __init__(self, settings: Settings):
+        self.kind = settings.cpu_executor_kind.lower()
+        if self.kind not in (EXECUTOR_THREAD, EXECUTOR_PROCESS):
+            raise ValueError(f"cpu_executor_kind invalide: {settings.cpu_executor_kind}")
+        self.max_workers = settings.cpu_executor_workers or min(4, os.cpu_count() or 1)
+        self._executor: Optional[Executor] = None
+
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self._total_wait = 0.0
+        self._total_run = 0.0
+        self._max_run = 0.0
+
+    @property
+    def executor(self) -> Executor:
+        """Pool créé à la première utilisation"""
+        if self._executor is None:
+            if self.kind == EXECUTOR_PROCESS:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="cpu-executor"
+                )
+            logger.info(f"CPU executor démarré ({self.kind}, {self.max_workers} workers)")
+        return self._executor
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """
+        Exécute func(*args, **kwargs) dans le pool et attend le résultat
+        En mode process, func et ses arguments doivent être picklables
+        """
+        loop = asyncio.get_running_loop()
+        submitted = time.time()
+        self.in_flight += 1
+        try:
+            started, finished, result = await loop.run_in_executor(
+                self.executor,
+                functools.partial(_timed_call, func, args, kwargs)
+            )
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.in_flight -= 1
+
+        run_time = finished - started
+        self.completed += 1
+        self._total_wait += max(0.0, started - submitted)
+        self._total_run += run_time
+        self._max_run = max(self._max_run, run_time)
+        return result
+
+    @property
+    def queue_depth(self) -> int:
+        """Tâches soumises qui attendent un worker libre"""
+        return max(0, self.in_flight - self.max_workers)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Métriques du pool (exposées dans /health)"""
+        return {
+            "kind": self.kind,
+            "max_workers": self.max_workers,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "completed": self.completed,
+            "failed": self.failed,
+            "avg_wait_ms": round(self._total_wait / self.completed * 1000, 2) if self.completed else 0.0,
+            "avg_run_ms": round(self._total_run / self.completed * 1000, 2) if self.completed else 0.0,
+            "max_run_ms": round(self._max_run * 1000, 2)
+        }
+
+    def shutdown(self):
+        """Arrête le pool (les tâches en cours se terminent)"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+# Instance process-wide
+_cpu_executor: Optional[CPUExecutor] = None
+
+
+def get_cpu_executor() -> CPUExecutor:
+    """Récupère le pool CPU partagé"""
+    global _cpu_executor
+    if _cpu_executor is None:
+        _cpu_executor = CPUExecutor(get_settings())
+    return _cpu_executor
+
+
+def shutdown_cpu_executor():
+    """Arrête le pool CPU partagé (shutdown de l'application)"""
+    global _cpu_executor
+    if _cpu_executor is not None:
+        _cpu_executor.shutdown()
+        _cpu_executor = None
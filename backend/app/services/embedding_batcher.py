@@ -0,0 +1,131 @@
+"""
+Embedding Batcher - Cross-request micro-batching of query embeddings
+Concurrent embed requests are queued and gathered for up to max_batch_size
+items or max_wait_ms milliseconds, then embedded with a single model call.
+One ONNX inference over N texts is much cheaper than N single-text
+inferences on CPU-only hosts
+"""
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+EmbedBatchFn = Callable[[List[str]], Awaitable[List[List[float]]]]
+
+
+class EmbeddingBatcher:
+    """Gathers concurrent embed requests into batched model calls"""
+
+    def __init__(self, embed_batch: EmbedBatchFn, max_batch_size: int = 32, max_wait_ms: float = 5.0):
+        self._embed_batch = embed_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        # Metrics
+        self.batches = 0
+        self.items = 0
+        self.largest_batch = 0
+        self.failed_batches = 0
+        self.inference_seconds = 0.0
+
+    def _ensure_worker(self):
+        # The queue and worker belong to the running loop (recreated if the loop changed, e.g. in tests)
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            if self._loop is not loop:
+                self._queue = asyncio.Queue()
+                self._loop = loop
+            self._worker = loop.create_task(self._run())
+
+    async def embed(self, text: str) -> List[float]:
+        """Embed one text, batched with other concurrent callers"""
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, future))
+        return await future
+
+    async def _collect(self) -> List[Tuple[str, asyncio.Future]]:
+        """Wait for a first request, then gather more until the batch is full or the wait expires"""
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            # Requests already queued are taken without waiting
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            # Callers that gave up (cancelled) are not embedded
+            batch = [(text, future) for text, future in batch if not future.done()]
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+            try:
+                embeddings = await self._embed_batch([text for text, _ in batch])
+            except Exception as e:
+                self.failed_batches += 1
+                logger.error(f"Embedding batch of {len(batch)} failed: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.inference_seconds += time.perf_counter() - started
+            self.batches += 1
+            self.items += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+            for (_, future), embedding in zip(batch, embeddings):
+                if not future.done():
+                    future.set_result(embedding)
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Batching metrics (exposed in /health)"""
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "batches": self.batches,
+            "items": self.items,
+            "failed_batches": self.failed_batches,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "largest_batch": self.largest_batch,
+            # Share of batch capacity actually used (1.0: every batch was full)
+            "fill_ratio": round(self.items / (self.batches * self.max_batch_size), 3) if self.batches else 0.0,
+            "avg_inference_ms": round(self.inference_seconds * 1000 / self.batches, 2) if self.batches else 0.0,
+            "queue_depth": self.queue_depth
+        }
+
+    async def close(self):
+        """Stop the worker (pending callers are cancelled)"""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        while self._queue is not None and not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            future.cancel()
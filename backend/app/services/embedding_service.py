@@ -1,58 +1,133 @@
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 import asyncio
+import logging
+import time
 from fastembed import TextEmbedding
 import numpy as np
 
+from app.config import get_settings
+from app.constants import VECTOR_DIMENSION
+from app.services.embedding_batcher import EmbeddingBatcher
+
+logger = logging.getLogger(__name__)
+
 
 class EmbeddingService:
-    def __init__(self):
+    def __init__(self, model_name: Optional[str] = None):
+        self.model_name = model_name or get_settings().embedding_model
         self.model = None
         self._model_loaded = False
-    
+        self._load_lock: Optional[asyncio.Lock] = None
+
+        # Concurrent single-text requests share one model call per batch
+        settings = get_settings()
+        self.batcher = EmbeddingBatcher(
+            self._embed_batch,
+            max_batch_size=settings.embedding_batch_max_size,
+            max_wait_ms=settings.embedding_batch_max_wait_ms
+        )
+
+        # Readiness, reported by /health
+        self.ready = False
+        self.load_seconds: Optional[float] = None
+        self.warmup_seconds: Optional[float] = None
+        self.last_error: Optional[str] = None
+
     async def _ensure_model_loaded(self):
-        """Lazy load the embedding model"""
-        if not self._model_loaded:
-            loop = asyncio.get_event_loop()
+        """Load the ONNX model once, concurrent callers wait for the same load"""
+        if self._model_loaded:
+            return
+        if self._load_lock is None:
+            self._load_lock = asyncio.Lock()
+        async with self._load_lock:
+            if self._model_loaded:
+                return
+            started = time.perf_counter()
+            loop = asyncio.get_running_loop()
             self.model = await loop.run_in_executor(
-                None, 
-                lambda: TextEmbedding(model_name="BAAI/bge-small-en-v1.5")
+                None,
+                lambda: TextEmbedding(model_name=self.model_name)
             )
+            self.load_seconds = round(time.perf_counter() - started, 3)
             self._model_loaded = True
-    
+            self.ready = True
+            logger.info(f"Embedding model {self.model_name} loaded in {self.load_seconds}s")
+
+    async def warm_up(self) -> bool:
+        """
+        Load the model and run one inference at startup, so the first query
+        doesn't pay for the model load and ONNX session initialisation
+        """
+        try:
+            await self._ensure_model_loaded()
+            started = time.perf_counter()
+            embedding = await self.embed_text("warm-up")
+            self.warmup_seconds = round(time.perf_counter() - started, 3)
+            self.ready = len(embedding) == VECTOR_DIMENSION
+            self.last_error = None if self.ready else f"unexpected dimension {len(embedding)}"
+        except Exception as e:
+            self.ready = False
+            self.last_error = str(e)
+            logger.error(f"Embedding model warm-up failed: {e}")
+        return self.ready
+
     async def embed_text(self, text: str) -> List[float]:
-        """Generate embedding for a single text"""
+        """Generate embedding for a single text (micro-batched with concurrent callers)"""
         await self._ensure_model_loaded()
-        
-        # Run embedding in thread pool
-        loop = asyncio.get_event_loop()
-        embedding = await loop.run_in_executor(
-            None,
-            lambda: list(next(self.model.embed([text])))
-        )
-        
-        return embedding
-    
+        return await self.batcher.embed(text)
+
     async def embed_texts(self, texts: List[str]) -> List[List[float]]:
         """Generate embeddings for multiple texts (batch)"""
         await self._ensure_model_loaded()
-        
-        # Run embedding in thread pool
-        loop = asyncio.get_event_loop()
+        return await self._embed_batch(texts)
+
+    async def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """One model call over the whole batch, in the thread pool"""
+        loop = asyncio.get_running_loop()
         embeddings = await loop.run_in_executor(
             None,
-            lambda: [list(emb) for emb in self.model.embed(texts)]
+            lambda: [emb.tolist() for emb in self.model.embed(texts)]
         )
-        
+
         return embeddings
-    
+
+    async def close(self):
+        """Stop the batching worker"""
+        await self.batcher.close()
+
     async def health_check(self) -> bool:
         """Check if embedding service is working"""
         try:
             test_embedding = await self.embed_text("test")
-            return len(test_embedding) == 384  # bge-small dimension
+            return len(test_embedding) == VECTOR_DIMENSION
         except Exception:
             return False
-    
+
     def get_embedding_dimension(self) -> int:
         """Get the dimension of embeddings"""
-        return 384  # BAAI/bge-small-en-v1.5 dimension
+        return VECTOR_DIMENSION
+
+    def get_status(self) -> Dict[str, Any]:
+        """Model readiness (exposed in /health)"""
+        return {
+            "model": self.model_name,
+            "loaded": self._model_loaded,
+            "ready": self.ready,
+            "dimension": VECTOR_DIMENSION,
+            "load_seconds": self.load_seconds,
+            "warmup_seconds": self.warmup_seconds,
+            "last_error": self.last_error,
+            "batching": self.batcher.get_metrics()
+        }
+
+
+# Process-wide instance: the ONNX model is loaded once and shared by every request
+_embedding_service: Optional[EmbeddingService] = None
+
+
+def get_embedding_service() -> EmbeddingService:
+    """Shared embedding service (model loaded at most once per process)"""
+    global _embedding_service
+    if _embedding_service is None:
+        _embedding_service = EmbeddingService()
+    return _embedding_service
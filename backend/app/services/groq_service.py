@@ -1,5 +1,5 @@
-from openai import AsyncOpenAI
-from typing import Dict, Any, Optional, List
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+from typing import Dict, Any, Optional, List, AsyncIterator
 from pydantic import BaseModel
 import logging
 
@@ -21,7 +21,8 @@ class GroqService:
         self.settings = settings
         self.client = AsyncOpenAI(
             api_key=settings.groq_api_key,
-            base_url="https://api.groq.com/openai/v1"
+            base_url="https://api.groq.com/openai/v1",
+            http_client=DefaultAsyncHttpxClient(limits=settings.llm_http_limits)
         )
         self.model = settings.groq_model
         
@@ -37,12 +38,8 @@ class GroqService:
         Retourne True si la connexion fonctionne
         """
         try:
-            # Test avec un prompt simple
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": "test"}],
-                max_tokens=5
-            )
+            # Liste des modèles: vérifie la clé et la connexion sans complétion facturée
+            await self.client.models.list()
             return True
         except Exception as e:
             logger.error(f"Erreur de connexion Groq: {e}")
@@ -92,6 +89,40 @@ class GroqService:
             logger.error(f"Erreur lors de la génération Groq: {e}")
             return "Désolé, une erreur est survenue lors de la génération de la réponse."
     
+    async def stream_response(
+        self,
+        prompt: str,
+        model: Optional[str] = None,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 1024
+    ) -> AsyncIterator[str]:
+        """
+        Génère une réponse token par token (stream=True côté OpenAI)
+        Les fragments sont transmis dès leur réception
+        """
+        model = model or self.model
+
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": prompt})
+
+        stream = await self.client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True
+        )
+
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            token = chunk.choices[0].delta.content
+            if token:
+                yield token
+    
     async def generate_aim_training_advice(
         self,
         user_question: str,
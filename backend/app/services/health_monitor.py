@@ -0,0 +1,151 @@
+"""
+Health Monitor - Surveillance en tâche de fond du provider LLM
+Sonde le provider à intervalle régulier, garde son état en mémoire et ouvre
+un circuit breaker après plusieurs échecs consécutifs
+"""
+from typing import Dict, Any, Optional, Callable, Awaitable
+from datetime import datetime, timezone
+import asyncio
+import logging
+import time
+
+from app.config import Settings, get_settings
+from app.services.llm_service import get_llm_service
+
+logger = logging.getLogger(__name__)
+
+
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half_open"
+
+
+class ProviderHealthMonitor:
+    """Moniteur process-wide de l'état du provider LLM avec circuit breaker"""
+
+    def __init__(
+        self,
+        settings: Settings,
+        probe: Optional[Callable[[], Awaitable[bool]]] = None
+    ):
+        self.settings = settings
+        self.provider_name = settings.llm_provider.lower()
+        self.model = settings.groq_model if self.provider_name == "groq" else settings.ollama_model
+        self.interval = settings.llm_health_check_interval
+        self.failure_threshold = settings.llm_circuit_failure_threshold
+        self.reset_timeout = settings.llm_circuit_reset_timeout
+        self._probe = probe or self._default_probe
+
+        self.status = "unknown"
+        self.consecutive_failures = 0
+        self.last_check: Optional[datetime] = None
+        self.last_error: Optional[str] = None
+        self._circuit = CIRCUIT_CLOSED
+        self._opened_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def _default_probe(self) -> bool:
+        """Sonde par défaut: health check du provider partagé"""
+        return await get_llm_service().provider.health_check()
+
+    async def start(self):
+        """Lance la boucle de surveillance en tâche de fond"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Health monitor démarré pour {self.provider_name} (intervalle: {self.interval}s)")
+
+    async def stop(self):
+        """Arrête la boucle de surveillance"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await self.check_now()
+            await asyncio.sleep(self.interval)
+
+    async def check_now(self) -> Dict[str, Any]:
+        """Sonde immédiatement le provider et met à jour l'état"""
+        try:
+            is_healthy = await self._probe()
+            if is_healthy:
+                self.record_success()
+            else:
+                self.record_failure("health check négatif")
+        except Exception as e:
+            self.record_failure(str(e))
+        return self.get_status()
+
+    def record_success(self):
+        """Enregistre un succès: referme le circuit"""
+        if self._circuit != CIRCUIT_CLOSED:
+            logger.info(f"Provider {self.provider_name} de nouveau accessible, circuit fermé")
+        self.status = "healthy"
+        self.consecutive_failures = 0
+        self.last_check = datetime.now(timezone.utc)
+        self.last_error = None
+        self._circuit = CIRCUIT_CLOSED
+        self._opened_at = None
+
+    def record_failure(self, error: Optional[str] = None):
+        """Enregistre un échec: ouvre le circuit au-delà du seuil"""
+        self.status = "unhealthy"
+        self.consecutive_failures += 1
+        self.last_check = datetime.now(timezone.utc)
+        self.last_error = error
+
+        current = self.circuit_state
+        should_open = (
+            current == CIRCUIT_HALF_OPEN
+            or self.consecutive_failures >= self.failure_threshold
+        )
+        if should_open and current != CIRCUIT_OPEN:
+            logger.warning(
+                f"Circuit ouvert pour {self.provider_name} après {self.consecutive_failures} échec(s): {error}"
+            )
+            self._circuit = CIRCUIT_OPEN
+            self._opened_at = time.monotonic()
+
+    @property
+    def circuit_state(self) -> str:
+        """État du circuit, passe en half_open une fois le délai de reset écoulé"""
+        if (
+            self._circuit == CIRCUIT_OPEN
+            and self._opened_at is not None
+            and time.monotonic() - self._opened_at >= self.reset_timeout
+        ):
+            self._circuit = CIRCUIT_HALF_OPEN
+        return self._circuit
+
+    def is_available(self) -> bool:
+        """True si les requêtes peuvent être envoyées au provider"""
+        return self.circuit_state != CIRCUIT_OPEN
+
+    def get_status(self) -> Dict[str, Any]:
+        """Retourne l'état en cache (même format que LLMService.health_check)"""
+        return {
+            "provider": self.provider_name,
+            "status": self.status,
+            "model": self.model,
+            "circuit": self.circuit_state,
+            "consecutive_failures": self.consecutive_failures,
+            "last_check": self.last_check.isoformat() if self.last_check else None,
+            "last_error": self.last_error
+        }
+
+
+# Instance process-wide
+_health_monitor: Optional[ProviderHealthMonitor] = None
+
+
+def get_health_monitor() -> ProviderHealthMonitor:
+    """Récupère le moniteur de santé (pour l'injection de dépendance)"""
+    global _health_monitor
+    if _health_monitor is None:
+        _health_monitor = ProviderHealthMonitor(get_settings())
+    return _health_monitor
@@ -1,23 +1,126 @@
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Awaitable
+import asyncio
 import logging
 from datetime import datetime, timedelta
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
 
-from app.models.stats import LocalStats
 from app.services.cache_service import CacheService
+from app.services.stats_queries import fetch_window_summary
+from app.services.trend_analyzer import TREND_DECLINING, TREND_IMPROVING, TREND_PLATEAUED, create_trend_analyzer
 from app.services.kovaaks_service import create_kovaaks_service
 from app.config import get_settings
 
 logger = logging.getLogger(__name__)
 
+# Protection contre les reconstructions concurrentes du contexte (stampede)
+CONTEXT_LOCK_TTL = 10  # secondes
+CONTEXT_LOCK_POLL_INTERVAL = 0.1  # secondes
+
 class LLMContextBuilder:
     """Service pour construire le contexte pour le LLM"""
 
+    # Reconstructions en cours par clé de cache, partagées par toutes les instances du process
+    _inflight: Dict[str, asyncio.Task] = {}
+
     def __init__(self):
         self.settings = get_settings()
         self.cache = CacheService()
     
+    async def get_context(
+        self,
+        db: AsyncSession,
+        days: int = 30
+    ) -> Dict[str, Any]:
+        """
+        Contexte et system prompt formaté, servis depuis le cache Redis
+        La clé inclut la version des stats: un upload CSV invalide le contexte
+        
+        Returns:
+        {
+            "context": {...},  # résultat de build_context
+            "system_prompt": "..."  # résultat de format_context_for_llm
+        }
+        """
+        key = await self.cache.get_context_key(self.settings.kovaaks_username, days)
+        
+        cached = await self.cache.get_user_context(key)
+        if cached:
+            return cached
+        
+        # Une seule reconstruction par clé dans ce process: les requêtes concurrentes attendent la même tâche
+        while True:
+            task = self._inflight.get(key)
+            if task is None:
+                task = asyncio.create_task(self._build_shared(key, db, days))
+                self._inflight[key] = task
+                task.add_done_callback(lambda done: self._forget_build(key, done))
+                # Annuler la requête qui construit (délai du chat) annule la tâche: sa session ne survit pas à la requête
+                return await task
+            
+            # asyncio.wait n'annule pas la tâche partagée si cette requête abandonne
+            await asyncio.wait({task})
+            if not task.cancelled():
+                return task.result()
+            # Requête propriétaire annulée: une requête en attente relance la construction avec sa propre session
+    
+    @classmethod
+    def _forget_build(cls, key: str, task: asyncio.Task):
+        if cls._inflight.get(key) is task:
+            del cls._inflight[key]
+    
+    async def _build_shared(self, key: str, db: AsyncSession, days: int) -> Dict[str, Any]:
+        """Reconstruction partagée, coordonnée entre les workers par un verrou Redis"""
+        cached = await self.cache.get_user_context(key)
+        if cached:
+            return cached
+        
+        if not await self.cache.acquire_lock(f"llm:context:{key}", ttl=CONTEXT_LOCK_TTL):
+            cached = await self._wait_for_context(key)
+            if cached:
+                return cached
+            return await self._build_and_format(db, days)
+        
+        try:
+            result = await self._build_and_format(db, days)
+            if self._is_cacheable(result["context"]):
+                await self.cache.set_user_context(key, result)
+            return result
+        finally:
+            await self.cache.release_lock(f"llm:context:{key}")
+    
+    def _is_cacheable(self, context: Dict[str, Any]) -> bool:
+        """Un contexte partiel (source lente ou en erreur) n'est pas mis en cache"""
+        if context.get("missing_sources") or "error" in context["local_stats"]:
+            return False
+        # Sans nom d'utilisateur l'erreur KovaaK's est permanente: le contexte reste cachable
+        return not (self.settings.kovaaks_username and "error" in context["kovaaks_api_data"])
+    
+    def _context_wait_budget(self) -> float:
+        """
+        Attente maximale du contexte d'un autre worker: laisse le temps de le
+        reconstruire soi-même (sources bornées par context_source_timeout)
+        avant le délai de l'étape contexte du chat
+        """
+        budget = self.settings.chat_context_timeout - self.settings.context_source_timeout
+        return min(CONTEXT_LOCK_TTL, max(CONTEXT_LOCK_POLL_INTERVAL, budget))
+    
+    async def _wait_for_context(self, key: str) -> Optional[Dict[str, Any]]:
+        """Attend qu'un autre worker ait publié le contexte en cache"""
+        deadline = asyncio.get_running_loop().time() + self._context_wait_budget()
+        while asyncio.get_running_loop().time() < deadline:
+            await asyncio.sleep(CONTEXT_LOCK_POLL_INTERVAL)
+            cached = await self.cache.get_user_context(key)
+            if cached:
+                return cached
+        return None
+    
+    async def _build_and_format(self, db: AsyncSession, days: int) -> Dict[str, Any]:
+        context = await self.build_context(db, days=days)
+        return {
+            "context": context,
+            "system_prompt": self.format_context_for_llm(context)
+        }
+    
     async def build_context(
         self, 
         db: AsyncSession,
@@ -25,72 +128,69 @@ class LLMContextBuilder:
     ) -> Dict[str, Any]:
         """Construit le contexte complet pour le LLM"""
         logger.info("Construction du contexte pour le LLM")
+        missing_sources: List[str] = []
         
-        # Récupérer les données en parallèle
-        local_stats = await self._get_local_stats(db, days)
-        kovaaks_data = await self._get_kovaaks_data()
+        # Récupérer les données en parallèle, chaque source avec son propre délai
+        local_stats, kovaaks_data = await asyncio.gather(
+            self._with_deadline(
+                "local_stats",
+                self._get_local_stats(db, days),
+                missing_sources,
+                {"error": "Délai dépassé pour les stats locales"}
+            ),
+            self._get_kovaaks_data(missing_sources)
+        )
         
         # Construire le contexte
         context = {
             "local_stats": local_stats,
             "kovaaks_api_data": kovaaks_data,
-            "analysis": self._analyze_performance(local_stats, kovaaks_data)
+            "analysis": self._analyze_performance(local_stats, kovaaks_data),
+            "missing_sources": missing_sources
         }
         
         return context
     
+    async def _with_deadline(
+        self,
+        source: str,
+        coro: Awaitable[Any],
+        missing_sources: List[str],
+        default: Any = None
+    ) -> Any:
+        """
+        Attend une source de données avec un délai maximum
+        Une source trop lente est remplacée par `default` pour construire un contexte partiel
+        """
+        try:
+            return await asyncio.wait_for(coro, timeout=self.settings.context_source_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Source {source} ignorée: délai de {self.settings.context_source_timeout}s dépassé")
+            missing_sources.append(source)
+            return default
+    
     async def _get_local_stats(self, db: AsyncSession, days: int) -> Dict[str, Any]:
-        """Récupère les stats locales"""
+        """Récupère les stats locales (une seule requête)"""
         try:
             start_date = datetime.now() - timedelta(days=days)
             
-            # Stats récentes
-            result = await db.execute(
-                select(LocalStats)
-                .where(LocalStats.played_at >= start_date)
-                .order_by(LocalStats.played_at.desc())
-                .limit(100)
-            )
-            recent_stats = result.scalars().all()
-            
-            # Statistiques générales
-            total_result = await db.execute(select(func.count(LocalStats.id)))
-            total_entries = total_result.scalar()
-            
-            avg_score_result = await db.execute(
-                select(func.avg(LocalStats.score))
-                .where(LocalStats.played_at >= start_date)
-            )
-            average_score = avg_score_result.scalar() or 0
-            
-            # Top scénarios
-            top_scenarios_result = await db.execute(
-                select(
-                    LocalStats.scenario_name,
-                    func.max(LocalStats.score).label('best_score'),
-                    func.avg(LocalStats.score).label('avg_score'),
-                    func.count(LocalStats.id).label('plays')
-                )
-                .where(LocalStats.played_at >= start_date)
-                .group_by(LocalStats.scenario_name)
-                .order_by(func.max(LocalStats.score).desc())
-                .limit(10)
-            )
-            top_scenarios = [
-                {
-                    "scenario_name": row.scenario_name,
-                    "best_score": float(row.best_score),
-                    "avg_score": float(row.avg_score),
-                    "plays": row.plays
-                }
-                for row in top_scenarios_result
-            ]
+            summary = await fetch_window_summary(db, start_date, top_limit=10, recent_limit=20)
+            # Précalculées après chaque import (cache versionné), recalculées sinon
+            trends = await create_trend_analyzer().get_trends(db, days)
             
             return {
-                "total_entries": total_entries,
-                "recent_entries": len(recent_stats),
-                "average_score": float(average_score),
-                "top_scenarios": top_scenarios,
+                "total_entries": summary.total_entries,
+                "recent_entries": summary.window_plays,
+                "average_score": summary.average_score,
+                "top_scenarios": [
+                    {
+                        "scenario_name": scenario.scenario_name,
+                        "best_score": scenario.best_score,
+                        "avg_score": scenario.avg_score,
+                        "plays": scenario.plays
+                    }
+                    for scenario in summary.top_scenarios
+                ],
                 "recent_stats": [
                     {
                         "scenario_name": stat.scenario_name,
@@ -98,33 +198,40 @@ class LLMContextBuilder:
                         "accuracy": stat.accuracy,
                         "played_at": stat.played_at.isoformat() if stat.played_at else None
                     }
-                    for stat in recent_stats[:20]
-                ]
+                    for stat in summary.recent
+                ],
+                "trends": trends
             }
             
         except Exception as e:
             logger.error(f"Erreur lors de la récupération des stats locales: {e}")
             return {"error": str(e)}
     
-    async def _get_kovaaks_data(self) -> Dict[str, Any]:
+    async def _get_kovaaks_data(self, missing_sources: List[str]) -> Dict[str, Any]:
         """Récupère les données de l'API KovaaK's"""
         if not self.settings.kovaaks_username:
             return {"error": "Nom d'utilisateur KovaaK's non configuré"}
         
         try:
+            username = self.settings.kovaaks_username
             async with create_kovaaks_service() as kovaaks_service:
-                # Récupérer le profil
-                profile = await kovaaks_service.get_profile_by_username(self.settings.kovaaks_username)
-
-                # Récupérer les scénarios joués
-                scenarios = await kovaaks_service.get_scenarios_played_by_username(
-                    self.settings.kovaaks_username,
-                    max=50
-                )
-
-                # Récupérer les scores récents
-                recent_scores = await kovaaks_service.get_recent_high_scores_by_username(
-                    self.settings.kovaaks_username
+                # Profil, scénarios joués et scores récents sont indépendants
+                profile, scenarios, recent_scores = await asyncio.gather(
+                    self._with_deadline(
+                        "kovaaks_profile",
+                        kovaaks_service.get_profile_by_username(username),
+                        missing_sources
+                    ),
+                    self._with_deadline(
+                        "kovaaks_scenarios",
+                        kovaaks_service.get_scenarios_played_by_username(username, max=50),
+                        missing_sources
+                    ),
+                    self._with_deadline(
+                        "kovaaks_recent_scores",
+                        kovaaks_service.get_recent_high_scores_by_username(username),
+                        missing_sources
+                    )
                 )
 
                 return {
@@ -143,13 +250,36 @@ class LLMContextBuilder:
             "trend": "stable",
             "strengths": [],
             "weak_points": [],
-            "recommendations": []
+            "recommendations": [],
+            "scenario_trends": []
         }
         
         # Analyser les stats locales
         if "error" not in local_stats:
             avg_score = local_stats.get("average_score", 0)
             top_scenarios = local_stats.get("top_scenarios", [])
+            trends = local_stats.get("trends") or {}
+            
+            # Tendance globale et par scénario (régression sur la fenêtre)
+            analysis["trend"] = trends.get("trend", "stable")
+            analysis["scenario_trends"] = trends.get("scenarios", [])
+            # Scénarios triés par variation décroissante: les plus marquées aux extrémités
+            improving = [s for s in analysis["scenario_trends"] if s["trend"] == TREND_IMPROVING]
+            declining = [s for s in reversed(analysis["scenario_trends"]) if s["trend"] == TREND_DECLINING]
+            for scenario in improving[:3]:
+                analysis["strengths"].append(
+                    f"En progression sur {scenario['scenario_name']} ({scenario['relative_change']:+.0%})"
+                )
+            for scenario in declining[:3]:
+                analysis["weak_points"].append(
+                    f"En baisse sur {scenario['scenario_name']} ({scenario['relative_change']:+.0%})"
+                )
+            
+            plateaued = [s["scenario_name"] for s in analysis["scenario_trends"] if s["trend"] == TREND_PLATEAUED]
+            if plateaued:
+                analysis["recommendations"].append(
+                    f"Plateau sur {', '.join(plateaued[:3])}: varier les scénarios ou la difficulté pour relancer la progression"
+                )
             
             # Identifier les forces
             if top_scenarios:
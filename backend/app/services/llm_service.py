@@ -1,7 +1,7 @@
-from typing import Dict, Any, Optional, List, Protocol
+from typing import Dict, Any, Optional, List, Protocol, AsyncIterator
 import logging
 
-from app.config import Settings
+from app.config import Settings, get_settings
 from app.services.ollama_service import OllamaService, create_ollama_service
 from app.services.groq_service import GroqService, create_groq_service
 
@@ -28,6 +28,15 @@ class LLMProvider(Protocol):
         """Génère une réponse à partir d'un prompt"""
         ...
     
+    def stream_response(
+        self,
+        prompt: str,
+        model: Optional[str] = None,
+        system_prompt: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """Génère une réponse en streaming, fragment par fragment"""
+        ...
+    
     async def generate_aim_training_advice(
         self, 
         user_question: str,
@@ -116,6 +125,20 @@ class LLMService:
             system_prompt=system_prompt
         )
     
+    async def stream_response(
+        self,
+        prompt: str,
+        model: Optional[str] = None,
+        system_prompt: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """Génère une réponse en streaming à partir d'un prompt"""
+        async for token in self.provider.stream_response(
+            prompt=prompt,
+            model=model,
+            system_prompt=system_prompt
+        ):
+            yield token
+    
     async def generate_aim_training_advice(
         self, 
         user_question: str,
@@ -189,6 +212,7 @@ For any medical advice, recommend consulting a healthcare professional."""
         """Ferme la connexion du provider"""
         if self._provider:
             await self._provider.close()
+            self._provider = None
 
 
 def create_llm_service(settings: Settings) -> LLMService:
@@ -196,3 +220,24 @@ def create_llm_service(settings: Settings) -> LLMService:
     return LLMService(settings)
 
 
+# Instance process-wide: les clients HTTP (et leurs connexions keep-alive)
+# sont créés une seule fois au démarrage et fermés à l'arrêt de l'application
+_llm_service: Optional[LLMService] = None
+
+
+def get_llm_service() -> LLMService:
+    """Récupère le service LLM partagé (pour l'injection de dépendance)"""
+    global _llm_service
+    if _llm_service is None:
+        _llm_service = create_llm_service(get_settings())
+    return _llm_service
+
+
+async def close_llm_service():
+    """Ferme les clients du service LLM partagé"""
+    global _llm_service
+    if _llm_service is not None:
+        await _llm_service.close()
+        _llm_service = None
+
+
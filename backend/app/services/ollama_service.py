@@ -1,5 +1,6 @@
 import httpx
-from typing import Dict, Any, Optional, List
+import json
+from typing import Dict, Any, Optional, List, AsyncIterator
 from pydantic import BaseModel
 import logging
 
@@ -42,7 +43,10 @@ class OllamaService:
     
     def __init__(self, settings: Settings):
         self.settings = settings
-        self.client = httpx.AsyncClient(timeout=settings.ollama_timeout)
+        self.client = httpx.AsyncClient(
+            timeout=settings.ollama_timeout,
+            limits=settings.llm_http_limits
+        )
         self.base_url = settings.ollama_base_url
         
     async def __aenter__(self):
@@ -121,6 +125,48 @@ class OllamaService:
             logger.error(f"Erreur lors de la génération: {e}")
             return "Désolé, je ne peux pas me connecter au service d'IA pour le moment."
     
+    async def stream_response(
+        self,
+        prompt: str,
+        model: Optional[str] = None,
+        system_prompt: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """
+        Génère une réponse token par token (/api/chat avec stream: true)
+        Ollama renvoie une ligne JSON par fragment, la dernière porte done=true
+        """
+        model = model or self.settings.ollama_model
+
+        messages = []
+        if system_prompt:
+            messages.append(OllamaMessage(role="system", content=system_prompt))
+        messages.append(OllamaMessage(role="user", content=prompt))
+
+        request_data = OllamaRequest(
+            model=model,
+            messages=messages,
+            stream=True
+        )
+
+        async with self.client.stream(
+            "POST",
+            f"{self.base_url}/api/chat",
+            json=request_data.dict()
+        ) as response:
+            if response.status_code != 200:
+                body = await response.aread()
+                raise RuntimeError(f"Erreur Ollama: {response.status_code} - {body.decode(errors='ignore')}")
+
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
+                data = json.loads(line)
+                token = data.get("message", {}).get("content", "")
+                if token:
+                    yield token
+                if data.get("done"):
+                    break
+    
     async def generate_aim_training_advice(
         self,
         user_question: str,
@@ -6,6 +6,8 @@ import fitz  # PyMuPDF
 import re
 from dataclasses import dataclass
 
+from app.services.cpu_executor import get_cpu_executor
+
 
 @dataclass
 class TextChunk:
@@ -26,7 +28,11 @@ class PDFService:
         self.chunk_overlap = chunk_overlap
     
     async def process_pdf(self, pdf_content: bytes) -> List[Dict[str, Any]]:
-        """Extract text from PDF and chunk it"""
+        """Extract text from PDF and chunk it (runs on the shared CPU executor)"""
+        return await get_cpu_executor().run(self._process_pdf_sync, pdf_content)
+
+    def _process_pdf_sync(self, pdf_content: bytes) -> List[Dict[str, Any]]:
+        """Blocking PyMuPDF extraction, cleaning and chunking"""
         try:
             # Open PDF from bytes
             doc = fitz.open(stream=pdf_content, filetype="pdf")
@@ -70,7 +76,11 @@ class PDFService:
             raise Exception(f"PDF processing failed: {str(e)}")
     
     async def process_text(self, text: str) -> List[Dict[str, Any]]:
-        """Process plain text and chunk it"""
+        """Process plain text and chunk it (runs on the shared CPU executor)"""
+        return await get_cpu_executor().run(self._process_text_sync, text)
+
+    def _process_text_sync(self, text: str) -> List[Dict[str, Any]]:
+        """Blocking cleaning and chunking"""
         cleaned_text = self._clean_text(text)
         chunks = self._chunk_text(cleaned_text)
         
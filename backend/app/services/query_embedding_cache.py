@@ -0,0 +1,156 @@
+"""
+Query Embedding Cache - Bounded LRU of RAG query embeddings
+Users ask the same questions over and over: the embedding of a normalized
+query is kept in process (float32, with a TTL) and optionally shared
+between workers through Redis, so a hit skips ONNX inference entirely
+"""
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import base64
+import hashlib
+import logging
+import re
+import time
+import unicodedata
+import numpy as np
+
+from app.config import get_settings
+from app.services.cache_service import CacheService
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(text: str) -> str:
+    """Unicode (NFKC), case and whitespace normalisation of a query"""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text)).strip().casefold()
+
+
+def encode_embedding(embedding: np.ndarray) -> str:
+    return base64.b64encode(embedding.astype(np.float32).tobytes()).decode("ascii")
+
+
+def decode_embedding(encoded: str) -> np.ndarray:
+    return np.frombuffer(base64.b64decode(encoded), dtype=np.float32)
+
+
+class QueryEmbeddingCache:
+    """LRU + TTL cache mapping normalized query text to a float32 embedding"""
+
+    def __init__(
+        self,
+        model_name: str,
+        max_entries: int = 2048,
+        ttl_seconds: int = 86400,
+        redis_enabled: bool = False,
+        cache_service: Optional[CacheService] = None
+    ):
+        self.model_name = model_name
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self.redis_enabled = redis_enabled
+        self.cache_service = cache_service or (CacheService() if redis_enabled else None)
+        self._entries: "OrderedDict[str, Tuple[float, np.ndarray]]" = OrderedDict()
+
+        # Metrics
+        self.hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _key(self, normalized: str) -> str:
+        # Vectors from another model are never reused
+        digest = hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+        return f"{self.model_name}:{digest}"
+
+    def _get_local(self, key: str) -> Optional[np.ndarray]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, embedding = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return embedding
+
+    def _put_local(self, key: str, embedding: np.ndarray):
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, embedding)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get(self, text: str) -> Optional[List[float]]:
+        """Cached embedding of a query, None on miss"""
+        key = self._key(normalize_query(text))
+
+        embedding = self._get_local(key)
+        if embedding is not None:
+            self.hits += 1
+            return embedding.tolist()
+
+        if self.redis_enabled:
+            encoded = await self.cache_service.get_query_embedding(key)
+            if encoded:
+                embedding = decode_embedding(encoded)
+                self._put_local(key, embedding)
+                self.redis_hits += 1
+                return embedding.tolist()
+
+        self.misses += 1
+        return None
+
+    async def set(self, text: str, embedding: List[float]):
+        """Store the embedding of a query (as float32)"""
+        key = self._key(normalize_query(text))
+        vector = np.asarray(embedding, dtype=np.float32)
+        self._put_local(key, vector)
+        if self.redis_enabled:
+            await self.cache_service.set_query_embedding(key, encode_embedding(vector), self.ttl_seconds)
+
+    async def get_or_embed(self, text: str, embed: Callable[[str], Awaitable[List[float]]]) -> List[float]:
+        """Cached embedding, computed with `embed` on miss"""
+        embedding = await self.get(text)
+        if embedding is not None:
+            return embedding
+        embedding = await embed(text)
+        await self.set(text, embedding)
+        return embedding
+
+    def clear(self):
+        self._entries.clear()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Cache metrics (exposed in /health)"""
+        lookups = self.hits + self.redis_hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "redis_enabled": self.redis_enabled,
+            "hits": self.hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round((self.hits + self.redis_hits) / lookups, 3) if lookups else 0.0
+        }
+
+
+# Process-wide instance shared by every RAG request
+_query_embedding_cache: Optional[QueryEmbeddingCache] = None
+
+
+def get_query_embedding_cache() -> QueryEmbeddingCache:
+    """Shared query embedding cache"""
+    global _query_embedding_cache
+    if _query_embedding_cache is None:
+        settings = get_settings()
+        _query_embedding_cache = QueryEmbeddingCache(
+            model_name=settings.embedding_model,
+            max_entries=settings.query_embedding_cache_size,
+            ttl_seconds=settings.query_embedding_cache_ttl,
+            redis_enabled=settings.query_embedding_cache_redis
+        )
+    return _query_embedding_cache
@@ -0,0 +1,140 @@
+"""
+RAG Chunk Writer - Bulk insert of document chunks and their vectors
+Chunks are streamed into rag_document_chunks with asyncpg COPY (binary
+format, pgvector binary encoding) inside the caller's transaction. Each
+batch runs in a savepoint so a failed COPY is rolled back and retried
+without losing the batches already written
+"""
+from typing import Any, Dict, List, Sequence, Tuple
+import asyncio
+import json
+import logging
+import math
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from pgvector import Vector
+
+from app.models.rag import DocumentChunk
+
+logger = logging.getLogger(__name__)
+
+CHUNK_TABLE = DocumentChunk.__tablename__
+CHUNK_COLUMNS = ["document_id", "chunk_index", "content", "chunk_metadata", "embedding"]
+
+EMBEDDING_INDEX = "idx_rag_chunks_embedding"
+DROP_EMBEDDING_INDEX_SQL = text(f"DROP INDEX IF EXISTS {EMBEDDING_INDEX}")
+COUNT_CHUNKS_SQL = text(f"SELECT count(*) FROM {CHUNK_TABLE}")
+# Same definition as the migration, only the number of lists depends on the table size
+CREATE_EMBEDDING_INDEX_SQL = (
+    f"CREATE INDEX IF NOT EXISTS {EMBEDDING_INDEX} ON {CHUNK_TABLE} "
+    "USING ivfflat (embedding vector_cosine_ops) WITH (lists = {lists})"
+)
+
+RETRY_DELAY = 0.2  # seconds, multiplied by the attempt number
+
+ChunkRecord = Tuple[int, int, str, str, np.ndarray]
+
+
+def chunk_records(
+    document_id: int,
+    first_index: int,
+    batch: Sequence[Dict[str, Any]],
+    embeddings: Sequence[Sequence[float]]
+) -> List[ChunkRecord]:
+    """COPY rows in CHUNK_COLUMNS order (JSON metadata as text, float32 vectors)"""
+    return [
+        (
+            document_id,
+            first_index + offset,
+            chunk_data["content"],
+            json.dumps(chunk_data.get("metadata", {})),
+            np.asarray(embedding, dtype=np.float32)
+        )
+        for offset, (chunk_data, embedding) in enumerate(zip(batch, embeddings))
+    ]
+
+
+def ivfflat_lists(row_count: int) -> int:
+    """pgvector guideline: rows / 1000 up to 1M rows, sqrt(rows) beyond (never below the migration's 100)"""
+    if row_count <= 1_000_000:
+        return max(100, row_count // 1000)
+    return int(math.sqrt(row_count))
+
+
+def _encode_vector(value: Any) -> bytes:
+    return (value if isinstance(value, Vector) else Vector(value)).to_binary()
+
+
+async def _copy_records(db: AsyncSession, records: List[ChunkRecord]):
+    connection = await db.connection()
+    raw_connection = (await connection.get_raw_connection()).driver_connection
+    # Binary vector codec only for the COPY: the ORM binds vectors as text on this pooled connection.
+    # Only `vector` is set (register_vector would also install halfvec/sparsevec codecs)
+    await raw_connection.set_type_codec(
+        "vector",
+        encoder=_encode_vector,
+        decoder=Vector.from_binary,
+        format="binary"
+    )
+    try:
+        await raw_connection.copy_records_to_table(CHUNK_TABLE, records=records, columns=CHUNK_COLUMNS)
+    finally:
+        await raw_connection.reset_type_codec("vector")
+
+
+async def copy_chunks(db: AsyncSession, records: List[ChunkRecord], attempts: int = 3) -> int:
+    """
+    Write one batch of chunks with COPY in a savepoint of the current transaction,
+    retried up to `attempts` times (the failed savepoint is rolled back first)
+    """
+    for attempt in range(1, max(1, attempts) + 1):
+        try:
+            async with db.begin_nested():
+                await _copy_records(db, records)
+            return len(records)
+        except Exception as e:
+            if attempt >= attempts:
+                logger.error(f"Chunk COPY failed after {attempt} attempt(s): {e}")
+                raise
+            logger.warning(f"Chunk COPY failed (attempt {attempt}/{attempts}), retrying: {e}")
+            await asyncio.sleep(RETRY_DELAY * attempt)
+    return 0
+
+
+async def write_chunks(db: AsyncSession, records: List[ChunkRecord], attempts: int = 3) -> int:
+    """COPY with asyncpg, ORM objects otherwise"""
+    connection = await db.connection()
+    if connection.dialect.driver == "asyncpg":
+        return await copy_chunks(db, records, attempts)
+
+    db.add_all([
+        DocumentChunk(
+            document_id=document_id,
+            chunk_index=chunk_index,
+            content=content,
+            chunk_metadata=json.loads(metadata),
+            embedding=embedding
+        )
+        for document_id, chunk_index, content, metadata, embedding in records
+    ])
+    await db.flush()
+    return len(records)
+
+
+async def drop_embedding_index(db: AsyncSession):
+    """
+    Drop the ivfflat index before a very large offline load (rebuilt once at the end)
+    ACCESS EXCLUSIVE lock on rag_document_chunks until the transaction commits
+    """
+    await db.execute(DROP_EMBEDDING_INDEX_SQL)
+    logger.info(f"Index {EMBEDDING_INDEX} dropped for bulk load")
+
+
+async def rebuild_embedding_index(db: AsyncSession) -> int:
+    """Rebuild the ivfflat index, its lists sized to the loaded table"""
+    row_count = (await db.execute(COUNT_CHUNKS_SQL)).scalar_one()
+    lists = ivfflat_lists(row_count)
+    await db.execute(text(CREATE_EMBEDDING_INDEX_SQL.format(lists=lists)))
+    logger.info(f"Index {EMBEDDING_INDEX} rebuilt over {row_count} chunks ({lists} lists)")
+    return lists
@@ -1,22 +1,32 @@
 from typing import List, Dict, Any, Optional
+import asyncio
 import logging
 import traceback
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text, select
 
-from app.models.rag import Document, DocumentChunk
-from app.services.embedding_service import EmbeddingService
-from app.services.llm_service import create_llm_service
-from app.config import settings
+from app.config import get_settings
+from app.models.rag import Document
+from app.services.embedding_service import get_embedding_service
+from app.services.llm_service import LLMService, get_llm_service
+from app.services.query_embedding_cache import get_query_embedding_cache
+from app.services.rag_chunk_writer import (
+    chunk_records, write_chunks, drop_embedding_index, rebuild_embedding_index
+)
 
 logger = logging.getLogger(__name__)
 
 
 class RAGService:
-    def __init__(self, db: AsyncSession):
+    def __init__(self, db: AsyncSession, llm_service: Optional[LLMService] = None):
         self.db = db
-        self.embedding_service = EmbeddingService()
-        self.llm_service = create_llm_service(settings)
+        self.embedding_service = get_embedding_service()
+        self.query_cache = get_query_embedding_cache()
+        settings = get_settings()
+        self.ingest_batch_size = max(1, settings.rag_ingest_batch_size)
+        self.copy_attempts = settings.rag_copy_attempts
+        self.index_rebuild_min_chunks = settings.rag_index_rebuild_min_chunks
+        self.llm_service = llm_service or get_llm_service()
     
     async def query(
         self,
@@ -35,13 +45,9 @@ class RAGService:
             "confidence": 0.87
         }
         """
-        # 1. Generate embedding for query
-        query_embedding = await self.embedding_service.embed_text(query)
-        
-        # 2. Retrieve relevant chunks using vector similarity
-        relevant_chunks = await self._retrieve_chunks(
-            query_embedding, max_results, topics, safety_level
-        )
+        # 1-2. Embed the query and retrieve relevant chunks
+        retrieval = await self.retrieve(query, max_results, topics, safety_level)
+        relevant_chunks = retrieval["sources"]
         
         if not relevant_chunks:
             return {
@@ -60,11 +66,42 @@ class RAGService:
             safety_level=safety_level
         )
         
-        # 5. Calculate confidence based on chunk relevance
-        confidence = sum(chunk.get("relevance", 0) for chunk in relevant_chunks) / len(relevant_chunks)
-        
         return {
             "answer": answer,
+            "sources": relevant_chunks,
+            "confidence": retrieval["confidence"]
+        }
+    
+    async def retrieve(
+        self,
+        query: str,
+        max_results: int = 5,
+        topics: Optional[List[str]] = None,
+        safety_level: str = "general"
+    ) -> Dict[str, Any]:
+        """
+        Retrieval only: ranked chunks and confidence, without any LLM call
+        
+        Returns:
+        {
+            "sources": [{"title": "...", "content": "...", "relevance": 0.95}],
+            "confidence": 0.87
+        }
+        """
+        # Repeated questions skip the embedding model entirely
+        query_embedding = await self.query_cache.get_or_embed(query, self.embedding_service.embed_text)
+        
+        relevant_chunks = await self._retrieve_chunks(
+            query_embedding, max_results, topics, safety_level
+        )
+        
+        # Confidence based on chunk relevance
+        confidence = (
+            sum(chunk.get("relevance", 0) for chunk in relevant_chunks) / len(relevant_chunks)
+            if relevant_chunks else 0.0
+        )
+        
+        return {
             "sources": relevant_chunks,
             "confidence": confidence
         }
@@ -150,9 +187,21 @@ class RAGService:
         doc_type: str,
         topics: List[str],
         safety: str,
-        chunks: List[Dict[str, Any]]
+        chunks: List[Dict[str, Any]],
+        rebuild_index: bool = False
     ) -> Dict[str, Any]:
-        """Ingest a document with its chunks and embeddings"""
+        """
+        Ingest a document with its chunks and embeddings, in one transaction
+
+        rebuild_index (opt-in, or loads of at least rag_index_rebuild_min_chunks
+        chunks when that setting is non-zero) drops the ivfflat index before
+        writing the chunks and rebuilds it afterwards. DROP INDEX takes an
+        ACCESS EXCLUSIVE lock on rag_document_chunks held until the final commit,
+        i.e. for the whole embed + COPY run and the index build: every retrieval
+        (/api/rag/retrieve, chat RAG stage) blocks meanwhile. Offline bulk loads only.
+        """
+        if not rebuild_index:
+            rebuild_index = 0 < self.index_rebuild_min_chunks <= len(chunks)
         
         # Create document
         document = Document(
@@ -164,30 +213,51 @@ class RAGService:
         )
         self.db.add(document)
         await self.db.flush()  # Get the ID after INSERT
+        if rebuild_index:
+            await drop_embedding_index(self.db)
         
-        # Process chunks
-        chunk_objects = []
-        for i, chunk_data in enumerate(chunks):
-            # Generate embedding for chunk
-            embedding = await self.embedding_service.embed_text(chunk_data["content"])
-            
-            chunk = DocumentChunk(
-                document_id=document.id,
-                chunk_index=i,
-                content=chunk_data["content"],
-                chunk_metadata=chunk_data.get("metadata", {}),
-                embedding=embedding
-            )
-            chunk_objects.append(chunk)
-        
-        self.db.add_all(chunk_objects)
+        # Embed chunks in batches; the next batch is embedded while the previous one is written
+        batches = [
+            chunks[start:start + self.ingest_batch_size]
+            for start in range(0, len(chunks), self.ingest_batch_size)
+        ]
+        chunks_created = 0
+        pending = asyncio.ensure_future(self._embed_chunks(batches[0])) if batches else None
+
+        for i, batch in enumerate(batches):
+            embeddings = await pending
+            pending = asyncio.ensure_future(self._embed_chunks(batches[i + 1])) if i + 1 < len(batches) else None
+            try:
+                chunks_created += await self._write_chunks(document.id, chunks_created, batch, embeddings)
+            except BaseException:
+                if pending is not None:
+                    pending.cancel()
+                raise
+
+        if rebuild_index:
+            await rebuild_embedding_index(self.db)
         await self.db.commit()
         
         return {
             "document_id": document.id,
-            "chunks_created": len(chunk_objects)
+            "chunks_created": chunks_created
         }
     
+    async def _embed_chunks(self, batch: List[Dict[str, Any]]) -> List[List[float]]:
+        """One model call for a whole batch of chunks"""
+        return await self.embedding_service.embed_texts([chunk_data["content"] for chunk_data in batch])
+    
+    async def _write_chunks(
+        self,
+        document_id: int,
+        first_index: int,
+        batch: List[Dict[str, Any]],
+        embeddings: List[List[float]]
+    ) -> int:
+        """Insert a batch of embedded chunks (COPY, committed with the document)"""
+        records = chunk_records(document_id, first_index, batch, embeddings)
+        return await write_chunks(self.db, records, self.copy_attempts)
+    
     async def list_documents(
         self,
         doc_type: Optional[str] = None,
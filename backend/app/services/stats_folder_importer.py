@@ -0,0 +1,323 @@
+"""
+Stats Folder Importer - Import du dossier Stats de KovaaK's (un CSV par partie)
+KovaaK's écrit un fichier "<Scénario> - Challenge - <date> Stats.csv" par partie:
+les fichiers sont parsés en parallèle (pool CPU partagé dans l'API, pool de
+processus dédié pour le script CLI), les champs de résumé
+insérés par lots dans local_stats et chaque fichier enregistré dans stats_uploads
+(les fichiers déjà importés, par nom ou par hash, sont ignorés)
+"""
+from typing import Any, BinaryIO, Dict, Iterable, List, NamedTuple, Optional, Union
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from datetime import datetime, timezone
+from pathlib import Path
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import time
+import zipfile
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.models.stats import StatsUpload
+from app.services.cpu_executor import get_cpu_executor
+from app.services.stats_parser import create_stats_parser
+from app.services.stats_rollup import Run
+
+logger = logging.getLogger(__name__)
+
+
+# "1w4ts reload - Challenge - 2024.01.15-20.30.45 Stats.csv"
+RUN_FILENAME_RE = re.compile(
+    r"^(?P<scenario>.+) - (?P<mode>[^-]+?) - "
+    r"(?P<date>\d{4}\.\d{2}\.\d{2}-\d{2}\.\d{2}\.\d{2}) Stats\.csv$"
+)
+RUN_DATE_FORMAT = "%Y.%m.%d-%H.%M.%S"
+RUN_FILE_SUFFIX = " Stats.csv"
+
+WEAPON_HEADER_PREFIX = "Weapon,Shots,Hits"
+
+
+class ParsedRun(NamedTuple):
+    """Résultat du parsing d'un fichier de partie (run=None en cas d'erreur)"""
+    filename: str
+    file_hash: str
+    run: Optional[Dict[str, Any]]
+    error: Optional[str]
+
+
+def _to_float(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value) if value not in (None, "") else None
+    except ValueError:
+        return None
+
+
+def _to_int(value: Optional[str]) -> Optional[int]:
+    number = _to_float(value)
+    return int(round(number)) if number is not None else None
+
+
+def parse_run_content(filename: str, content: bytes) -> Dict[str, Any]:
+    """
+    Extrait le résumé d'un fichier de partie KovaaK's
+    Les champs de résumé sont des lignes "Clé:,valeur", la précision vient de
+    la table des armes (hits / shots)
+    """
+    match = RUN_FILENAME_RE.match(filename)
+    if not match:
+        raise ValueError("nom de fichier non reconnu")
+
+    fields: Dict[str, str] = {}
+    shots = hits = 0
+    in_weapons = False
+
+    for line in content.decode("utf-8-sig", errors="replace").splitlines():
+        if line.startswith(WEAPON_HEADER_PREFIX):
+            in_weapons = True
+            continue
+        if in_weapons:
+            if not line.strip():
+                in_weapons = False
+                continue
+            cells = line.split(",")
+            shots += _to_int(cells[1] if len(cells) > 1 else None) or 0
+            hits += _to_int(cells[2] if len(cells) > 2 else None) or 0
+            continue
+        if ":," in line:
+            key, _, value = line.partition(":,")
+            fields[key.strip()] = value.split(",")[0].strip()
+
+    score = _to_float(fields.get("Score"))
+    if score is None:
+        raise ValueError("score manquant")
+
+    sensitivity = _to_float(fields.get("Horiz Sens"))
+    sens_scale = fields.get("Sens Scale", "").lower()
+
+    return {
+        "scenario_name": fields.get("Scenario") or match.group("scenario"),
+        "score": score,
+        "accuracy": hits / shots if shots else None,
+        "kills": _to_int(fields.get("Kills")),
+        "avg_ttk": _to_float(fields.get("Avg TTK")),
+        "sensitivity": sensitivity,
+        "fov": _to_int(fields.get("FOV")),
+        "cm360": sensitivity if sens_scale == "cm/360" else None,
+        "played_at": datetime.strptime(match.group("date"), RUN_DATE_FORMAT),
+    }
+
+
+def parse_run_file(path: str) -> ParsedRun:
+    """Lit, hashe et parse un fichier de partie (exécuté dans un processus worker)"""
+    filename = os.path.basename(path)
+    with open(path, "rb") as f:
+        content = f.read()
+    file_hash = hashlib.sha256(content).hexdigest()
+
+    try:
+        return ParsedRun(filename, file_hash, parse_run_content(filename, content), None)
+    except Exception as e:
+        return ParsedRun(filename, file_hash, None, str(e))
+
+
+def parse_run_batch(paths: List[str]) -> List[ParsedRun]:
+    """Parse un lot de fichiers dans un même worker (limite le coût d'IPC par fichier)"""
+    return [parse_run_file(path) for path in paths]
+
+
+def run_key(scenario_name: str, played_at: datetime, score: Optional[float]) -> tuple:
+    """
+    Clé naturelle d'une partie (scénario + date + score)
+    Les dates naïves des fichiers sont stockées telles quelles (base en UTC),
+    les dates renvoyées par la base sont ramenées en UTC naïf pour la comparaison
+    """
+    if played_at.tzinfo is not None:
+        played_at = played_at.astimezone(timezone.utc).replace(tzinfo=None)
+    return scenario_name, played_at, score
+
+
+def find_run_files(folder: Path) -> List[Path]:
+    """Fichiers de partie d'un dossier Stats, triés par nom"""
+    return sorted(p for p in Path(folder).iterdir() if p.is_file() and p.name.endswith(RUN_FILE_SUFFIX))
+
+
+def extract_run_files(archive: Union[str, Path, BinaryIO], target_dir: Path) -> List[Path]:
+    """Extrait les fichiers de partie d'un zip à plat dans target_dir (noms de base uniquement)"""
+    extracted = []
+    with zipfile.ZipFile(archive) as archive:
+        for member in archive.infolist():
+            name = os.path.basename(member.filename)
+            if member.is_dir() or not name.endswith(RUN_FILE_SUFFIX):
+                continue
+            path = target_dir / name
+            with archive.open(member) as source, open(path, "wb") as target:
+                while block := source.read(1024 * 1024):
+                    target.write(block)
+            extracted.append(path)
+    return sorted(extracted)
+
+
+class StatsFolderImporter:
+    """Import incrémental et parallèle des fichiers de partie KovaaK's"""
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        process_pool: bool = False
+    ):
+        """
+        process_pool: pool de processus créé pour chaque import (script CLI uniquement).
+        Dans l'API, le parsing passe par le pool CPU partagé: pas de fork du serveur
+        (threads ONNX, Redis...) à chaque nouvelle partie. Il n'est parallèle
+        qu'avec CPU_EXECUTOR_KIND=process (en mode thread, le GIL le sérialise)
+        """
+        settings = get_settings()
+        self.process_pool = process_pool
+        self.workers = workers or settings.stats_import_workers or os.cpu_count() or 1
+        self.batch_size = batch_size or settings.stats_import_batch_size
+        self.parser = create_stats_parser()
+
+    async def import_files(self, db: AsyncSession, paths: Iterable[Path]) -> Dict[str, Any]:
+        """
+        Importe des fichiers de partie: les fichiers déjà connus (nom ou hash)
+        sont ignorés, chaque lot est inséré et commité séparément
+        """
+        started = time.perf_counter()
+        paths = [str(p) for p in paths]
+
+        inserted = 0
+        imported_files = 0
+        already_imported = 0
+        errors: List[Dict[str, str]] = []
+
+        loop = asyncio.get_running_loop()
+        # Pas plus de workers que de fichiers (petits lots du watcher)
+        pool_workers = self.workers if self.process_pool else get_cpu_executor().max_workers
+        workers = max(1, min(pool_workers, len(paths)))
+        # Sous-lots par worker pour garder tous les workers occupés
+        slice_size = max(1, min(self.batch_size, len(paths)) // workers)
+        pool_context = ProcessPoolExecutor(max_workers=workers) if self.process_pool else nullcontext()
+
+        try:
+            with pool_context as pool:
+                for start in range(0, len(paths), self.batch_size):
+                    batch = paths[start:start + self.batch_size]
+
+                    # Fichiers déjà importés sous le même nom: pas besoin de les relire
+                    known_filenames = await self._known_filenames(db, [os.path.basename(p) for p in batch])
+                    pending = [p for p in batch if os.path.basename(p) not in known_filenames]
+                    already_imported += len(batch) - len(pending)
+                    if not pending:
+                        continue
+
+                    parsed_slices = await asyncio.gather(*[
+                        loop.run_in_executor(pool, parse_run_batch, pending[i:i + slice_size])
+                        if pool is not None
+                        else get_cpu_executor().run(parse_run_batch, pending[i:i + slice_size])
+                        for i in range(0, len(pending), slice_size)
+                    ])
+                    parsed = [item for parsed_slice in parsed_slices for item in parsed_slice]
+
+                    # Fichiers renommés mais déjà importés (même contenu)
+                    known_hashes = await self._known_hashes(db, [item.file_hash for item in parsed])
+                    new_files = []
+                    for item in parsed:
+                        if item.file_hash in known_hashes:
+                            already_imported += 1
+                        elif item.error:
+                            errors.append({"filename": item.filename, "error": item.error})
+                        else:
+                            known_hashes.add(item.file_hash)
+                            new_files.append(item)
+
+                    if not new_files:
+                        continue
+
+                    columns = {
+                        column: [item.run[column] for item in new_files]
+                        for column in new_files[0].run
+                    }
+                    new_runs = await self.parser.ingest_columns(db, columns)
+                    await self._record_uploads(db, new_files, new_runs)
+                    await db.commit()
+                    inserted += len(new_runs)
+                    imported_files += len(new_files)
+
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"Erreur lors de l'import du dossier Stats ({imported_files} fichier(s) déjà importé(s)): {e}")
+            raise
+
+        elapsed = time.perf_counter() - started
+        logger.info(
+            f"Dossier Stats importé: {imported_files} fichier(s), {inserted} partie(s) nouvelles, "
+            f"{already_imported} déjà importé(s), {len(errors)} erreur(s) en {elapsed:.2f}s"
+        )
+
+        return {
+            "files_found": len(paths),
+            "files_imported": imported_files,
+            "files_already_imported": already_imported,
+            "files_failed": len(errors),
+            "total_entries": inserted,
+            "errors": errors[:50],
+            "duration_seconds": round(elapsed, 3),
+            "files_per_second": round(len(paths) / elapsed, 1) if elapsed > 0 else 0.0
+        }
+
+    async def import_folder(self, db: AsyncSession, folder: Path) -> Dict[str, Any]:
+        """Importe tous les fichiers de partie d'un dossier Stats"""
+        paths = await asyncio.to_thread(find_run_files, folder)
+        return await self.import_files(db, paths)
+
+    async def _known_filenames(self, db: AsyncSession, filenames: List[str]) -> set:
+        if not filenames:
+            return set()
+        result = await db.execute(
+            select(StatsUpload.filename).where(StatsUpload.filename.in_(filenames))
+        )
+        return set(result.scalars())
+
+    async def _known_hashes(self, db: AsyncSession, hashes: List[str]) -> set:
+        if not hashes:
+            return set()
+        result = await db.execute(
+            select(StatsUpload.file_hash).where(StatsUpload.file_hash.in_(hashes))
+        )
+        return set(result.scalars())
+
+    async def _record_uploads(self, db: AsyncSession, files: List[ParsedRun], new_runs: List[Run]):
+        """
+        Enregistre les fichiers importés (sans commit)
+        Une partie par fichier: inserted_count vaut 0 si ON CONFLICT l'a écartée (doublon de clé naturelle)
+        """
+        inserted_keys = {run_key(*run[:3]) for run in new_runs}
+        stmt = insert(StatsUpload.__table__).values([
+            {
+                "file_hash": item.file_hash,
+                "filename": item.filename,
+                "row_count": 1,
+                "inserted_count": int(
+                    run_key(item.run["scenario_name"], item.run["played_at"], item.run["score"]) in inserted_keys
+                ),
+                "first_played_at": item.run["played_at"],
+                "last_played_at": item.run["played_at"],
+            }
+            for item in files
+        ]).on_conflict_do_nothing(index_elements=["file_hash"])
+        await db.execute(stmt)
+
+
+def create_stats_folder_importer(
+    workers: Optional[int] = None,
+    batch_size: Optional[int] = None,
+    process_pool: bool = False
+) -> StatsFolderImporter:
+    return StatsFolderImporter(workers=workers, batch_size=batch_size, process_pool=process_pool)
@@ -1,14 +1,78 @@
 import pandas as pd
 import io
-from typing import List, Dict, Any, Optional
-from datetime import datetime
+from typing import List, Dict, Any, Optional, BinaryIO, NamedTuple, Set
+from datetime import datetime, timedelta
+import asyncio
+import hashlib
 import logging
+import time
+from sqlalchemy import select, text
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
-from app.models.stats import LocalStats
+from app.config import get_settings
+from app.models.stats import LocalStats, StatsUpload
+from app.services.cache_service import CacheService
+from app.services.cpu_executor import get_cpu_executor
+from app.services.stats_queries import fetch_progression, fetch_window_summary, fetch_scenario_summary
+from app.services.stats_rollup import Run, apply_daily_rollup, apply_scenario_summary
 
 logger = logging.getLogger(__name__)
 
+# Colonne CSV -> (colonne local_stats, type Python attendu par le driver)
+CSV_COLUMN_MAP = [
+    ('Scenario', 'scenario_name', 'str'),
+    ('Score', 'score', 'float'),
+    ('Accuracy', 'accuracy', 'float'),
+    ('Kills', 'kills', 'int'),
+    ('Avg TTK', 'avg_ttk', 'float'),
+    ('Sensitivity', 'sensitivity', 'float'),
+    ('FOV', 'fov', 'int'),
+    ('cm/360', 'cm360', 'float'),
+    ('Date', 'played_at', 'datetime'),
+]
+
+
+# Table temporaire de staging pour le COPY (vidée à chaque commit)
+IMPORT_TABLE = "local_stats_import"
+
+CREATE_IMPORT_TABLE_SQL = text(f"""
+CREATE TEMP TABLE IF NOT EXISTS {IMPORT_TABLE} (
+    scenario_name varchar(255),
+    score double precision,
+    accuracy double precision,
+    kills integer,
+    avg_ttk double precision,
+    sensitivity double precision,
+    fov integer,
+    cm360 double precision,
+    played_at timestamptz
+) ON COMMIT DELETE ROWS
+""")
+
+TRUNCATE_IMPORT_TABLE_SQL = text(f"TRUNCATE {IMPORT_TABLE}")
+
+INSERT_NEW_RUNS_SQL = text(f"""
+INSERT INTO local_stats (
+    scenario_name, score, accuracy, kills, avg_ttk, sensitivity, fov, cm360, played_at
+)
+SELECT scenario_name, score, accuracy, kills, avg_ttk, sensitivity, fov, cm360, played_at
+FROM {IMPORT_TABLE}
+ON CONFLICT (scenario_name, played_at, score) DO NOTHING
+RETURNING scenario_name, played_at, score, accuracy
+""")
+
+# INSERT multi-lignes (hors asyncpg): 9 paramètres par ligne
+INSERT_BATCH_SIZE = 1000
+
+
+class PreparedFrame(NamedTuple):
+    """CSV nettoyé et converti, prêt pour l'insertion en bloc"""
+    columns: Dict[str, List[Any]]
+    scenarios: Set[str]
+    first_date: Optional[datetime]
+    last_date: Optional[datetime]
+
+
 class StatsParser:
     """Service pour parser les fichiers CSV de stats KovaaK's"""
     
@@ -21,54 +85,289 @@ class StatsParser:
     async def parse_csv_file(
         self, 
         file_content: bytes, 
-        db: AsyncSession
+        db: AsyncSession,
+        file_hash: Optional[str] = None,
+        filename: Optional[str] = None
     ) -> Dict[str, Any]:
-        """Parse un fichier CSV et sauvegarde les stats"""
+        """
+        Parse un fichier CSV et sauvegarde les stats
+        Un fichier déjà importé (même hash) est ignoré, les parties déjà
+        présentes en base (scénario, date, score) ne sont pas réinsérées
+        """
         try:
-            # Lire le CSV
-            df = pd.read_csv(io.BytesIO(file_content))
-            
-            # Vérifier les colonnes
-            missing_columns = [col for col in self.expected_columns if col not in df.columns]
-            if missing_columns:
-                raise ValueError(f"Colonnes manquantes: {missing_columns}")
-            
-            # Nettoyer les données
-            df = self._clean_dataframe(df)
-            
-            # Créer les objets LocalStats
-            stats_objects = []
-            for _, row in df.iterrows():
-                stat = LocalStats(
-                    scenario_name=row['Scenario'],
-                    score=row['Score'],
-                    accuracy=row['Accuracy'],
-                    kills=row['Kills'],
-                    avg_ttk=row['Avg TTK'],
-                    sensitivity=row['Sensitivity'],
-                    fov=row['FOV'],
-                    cm360=row['cm/360'],
-                    played_at=row['Date']
-                )
-                stats_objects.append(stat)
+            started = time.perf_counter()
+            file_hash = file_hash or hashlib.sha256(file_content).hexdigest()
+
+            existing = await self._find_upload(db, file_hash)
+            if existing:
+                return self._skipped_summary(existing)
+
+            # Lecture, vérification, nettoyage et conversion dans le pool CPU
+            prepared = await get_cpu_executor().run(self._prepare_csv, file_content)
+            row_count = len(prepared.columns['scenario_name'])
             
-            # Sauvegarder en base
-            db.add_all(stats_objects)
+            inserted = len(await self.ingest_columns(db, prepared.columns))
+            upload_id = await self._record_upload(
+                db, file_hash, filename, row_count, inserted,
+                prepared.first_date, prepared.last_date
+            )
             await db.commit()
-            
-            return {
-                "total_entries": len(stats_objects),
-                "unique_scenarios": df['Scenario'].nunique(),
-                "date_range": {
-                    "start": df['Date'].min().isoformat(),
-                    "end": df['Date'].max().isoformat()
-                }
-            }
+
+            summary = self._import_summary(
+                inserted,
+                row_count,
+                len(prepared.scenarios),
+                prepared.first_date,
+                prepared.last_date,
+                time.perf_counter() - started
+            )
+            summary["upload_id"] = upload_id
+            return summary
             
         except Exception as e:
             await db.rollback()
             logger.error(f"Erreur lors du parsing CSV: {e}")
             raise
+
+    async def parse_csv_stream(
+        self,
+        source: BinaryIO,
+        db: AsyncSession,
+        chunksize: Optional[int] = None,
+        file_hash: Optional[str] = None,
+        filename: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Parse un CSV par morceaux sans le charger entièrement (mémoire bornée)
+        Chaque morceau est inséré et commité dans sa propre transaction: en cas
+        d'erreur, les morceaux déjà importés restent en base (et sont ignorés
+        au prochain upload grâce à la clé naturelle des parties)
+        """
+        chunksize = chunksize or get_settings().stats_upload_chunk_size
+        executor = get_cpu_executor()
+        started = time.perf_counter()
+        inserted = 0
+        row_count = 0
+        chunks = 0
+        scenarios = set()
+        first_date = last_date = None
+
+        reader = None
+        try:
+            if file_hash:
+                existing = await self._find_upload(db, file_hash)
+                if existing:
+                    return self._skipped_summary(existing)
+
+            # Le lecteur garde l'état du fichier: il reste dans un thread, le
+            # nettoyage/la conversion de chaque morceau part dans le pool CPU
+            reader = await asyncio.to_thread(pd.read_csv, source, chunksize=chunksize)
+            while True:
+                chunk = await asyncio.to_thread(next, reader, None)
+                if chunk is None:
+                    break
+                chunks += 1
+
+                prepared = await executor.run(self._prepare_frame, chunk)
+                if not prepared.scenarios:
+                    continue
+
+                row_count += len(prepared.columns['scenario_name'])
+                inserted += len(await self.ingest_columns(db, prepared.columns))
+                await db.commit()
+
+                # Résumé accumulé au fil des morceaux
+                scenarios.update(prepared.scenarios)
+                first_date = prepared.first_date if first_date is None else min(first_date, prepared.first_date)
+                last_date = prepared.last_date if last_date is None else max(last_date, prepared.last_date)
+
+            upload_id = None
+            if file_hash:
+                upload_id = await self._record_upload(
+                    db, file_hash, filename, row_count, inserted, first_date, last_date
+                )
+                await db.commit()
+
+            summary = self._import_summary(
+                inserted, row_count, len(scenarios), first_date, last_date, time.perf_counter() - started
+            )
+            summary["upload_id"] = upload_id
+            summary["chunks"] = chunks
+            return summary
+
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"Erreur lors du parsing CSV en streaming ({inserted} lignes déjà importées): {e}")
+            raise
+        finally:
+            if reader is not None:
+                reader.close()
+
+    def _prepare_csv(self, file_content: bytes) -> PreparedFrame:
+        """Lit un CSV complet et le prépare (CPU-bound, exécuté dans le pool)"""
+        return self._prepare_frame(pd.read_csv(io.BytesIO(file_content)))
+
+    def _prepare_frame(self, df: pd.DataFrame) -> PreparedFrame:
+        """Vérifie, nettoie et convertit un DataFrame (CPU-bound, exécuté dans le pool)"""
+        self._check_columns(df)
+        df = self._clean_dataframe(df)
+
+        if df.empty:
+            return PreparedFrame(self._dataframe_columns(df), set(), None, None)
+
+        return PreparedFrame(
+            columns=self._dataframe_columns(df),
+            scenarios=set(df['Scenario'].unique()),
+            first_date=df['Date'].min().to_pydatetime(),
+            last_date=df['Date'].max().to_pydatetime()
+        )
+
+    def _check_columns(self, df: pd.DataFrame):
+        """Vérifie que les colonnes attendues sont présentes"""
+        missing_columns = [col for col in self.expected_columns if col not in df.columns]
+        if missing_columns:
+            raise ValueError(f"Colonnes manquantes: {missing_columns}")
+
+    async def ingest_columns(self, db: AsyncSession, columns: Dict[str, List[Any]]) -> List[Run]:
+        """
+        Insère des colonnes local_stats préparées et met à jour les rollups (sans commit)
+        Retourne les parties réellement insérées
+        """
+        new_runs = await self._insert_new_runs(db, columns)
+
+        # Rollups journalier et par scénario dans la même transaction, uniquement sur les parties insérées
+        await apply_daily_rollup(db, new_runs)
+        await apply_scenario_summary(db, new_runs)
+        return new_runs
+
+    async def _find_upload(self, db: AsyncSession, file_hash: str) -> Optional[StatsUpload]:
+        """Upload déjà enregistré pour ce hash de fichier"""
+        result = await db.execute(
+            select(StatsUpload).where(StatsUpload.file_hash == file_hash)
+        )
+        return result.scalar_one_or_none()
+
+    async def _record_upload(
+        self,
+        db: AsyncSession,
+        file_hash: str,
+        filename: Optional[str],
+        row_count: int,
+        inserted: int,
+        first_date: Optional[datetime],
+        last_date: Optional[datetime]
+    ) -> Optional[int]:
+        """Enregistre le fichier importé (sans commit, ignoré si un upload concurrent l'a déjà fait)"""
+        stmt = insert(StatsUpload.__table__).values(
+            file_hash=file_hash,
+            filename=filename,
+            row_count=row_count,
+            inserted_count=inserted,
+            first_played_at=first_date,
+            last_played_at=last_date
+        ).on_conflict_do_nothing(index_elements=['file_hash']).returning(StatsUpload.id)
+        result = await db.execute(stmt)
+        return result.scalar_one_or_none()
+
+    def _skipped_summary(self, upload: StatsUpload) -> Dict[str, Any]:
+        """Résumé d'un fichier déjà importé (aucune écriture)"""
+        logger.info(f"Fichier déjà importé (upload {upload.id}), ignoré")
+        return {
+            "total_entries": 0,
+            "rows_in_file": upload.row_count,
+            "duplicates_skipped": upload.row_count,
+            "unique_scenarios": 0,
+            "date_range": {
+                "start": upload.first_played_at.isoformat() if upload.first_played_at else None,
+                "end": upload.last_played_at.isoformat() if upload.last_played_at else None
+            },
+            "already_imported": True,
+            "upload_id": upload.id
+        }
+
+    def _import_summary(
+        self,
+        inserted: int,
+        row_count: int,
+        unique_scenarios: int,
+        start: Optional[datetime],
+        end: Optional[datetime],
+        elapsed: float
+    ) -> Dict[str, Any]:
+        """Résumé d'import commun aux deux modes"""
+        rows_per_second = row_count / elapsed if elapsed > 0 else 0.0
+        logger.info(
+            f"CSV importé: {inserted} nouvelles lignes sur {row_count} en {elapsed:.2f}s "
+            f"({rows_per_second:.0f} lignes/s)"
+        )
+
+        return {
+            "total_entries": inserted,
+            "rows_in_file": row_count,
+            "duplicates_skipped": row_count - inserted,
+            "unique_scenarios": unique_scenarios,
+            "date_range": {
+                "start": start.isoformat() if start is not None else None,
+                "end": end.isoformat() if end is not None else None
+            },
+            "already_imported": False,
+            "duration_seconds": round(elapsed, 3),
+            "rows_per_second": round(rows_per_second, 1)
+        }
+
+    def _dataframe_columns(self, df: pd.DataFrame) -> Dict[str, List[Any]]:
+        """Convertit le DataFrame nettoyé en listes Python par colonne de local_stats (NaN -> None)"""
+        columns = {}
+        for csv_column, db_column, kind in CSV_COLUMN_MAP:
+            series = df[csv_column]
+            if kind == "datetime":
+                values = list(series.dt.to_pydatetime())
+            else:
+                if kind == "int":
+                    series = series.round().astype("Int64")
+                elif kind == "str":
+                    series = series.astype(str)
+                values = series.astype(object).where(series.notna(), None).tolist()
+            columns[db_column] = values
+        return columns
+
+    async def _insert_new_runs(self, db: AsyncSession, columns: Dict[str, List[Any]]) -> List[Run]:
+        """
+        Insère les lignes en bloc dans la transaction de la session en ignorant
+        les parties déjà présentes (clé naturelle scénario + date + score)
+        COPY binaire vers une table temporaire puis INSERT ... ON CONFLICT DO NOTHING
+        (asyncpg), sinon INSERT multi-lignes par lots
+        Retourne les parties réellement insérées (pour le rollup)
+        """
+        names = list(columns)
+        records = list(zip(*columns.values()))
+        if not records:
+            return []
+
+        connection = await db.connection()
+        if connection.dialect.driver == "asyncpg":
+            await db.execute(CREATE_IMPORT_TABLE_SQL)
+            await db.execute(TRUNCATE_IMPORT_TABLE_SQL)
+            raw_connection = await connection.get_raw_connection()
+            await raw_connection.driver_connection.copy_records_to_table(
+                IMPORT_TABLE,
+                records=records,
+                columns=names
+            )
+            result = await db.execute(INSERT_NEW_RUNS_SQL)
+            return [tuple(row) for row in result]
+
+        table = LocalStats.__table__
+        new_runs = []
+        for start in range(0, len(records), INSERT_BATCH_SIZE):
+            stmt = insert(table).values(
+                [dict(zip(names, record)) for record in records[start:start + INSERT_BATCH_SIZE]]
+            ).on_conflict_do_nothing(
+                index_elements=['scenario_name', 'played_at', 'score']
+            ).returning(table.c.scenario_name, table.c.played_at, table.c.score, table.c.accuracy)
+            result = await db.execute(stmt)
+            new_runs.extend(tuple(row) for row in result)
+        return new_runs
     
     def _clean_dataframe(self, df: pd.DataFrame) -> pd.DataFrame:
         """Nettoie le DataFrame"""
@@ -88,64 +387,32 @@ class StatsParser:
         
         return df
     
-    async def get_stats_summary(self, db: AsyncSession, days: int = 30) -> Dict[str, Any]:
-        """Récupère un résumé des stats locales"""
+    async def get_stats_summary(
+        self,
+        db: AsyncSession,
+        days: int = 30,
+        recent_limit: Optional[int] = 100
+    ) -> Dict[str, Any]:
+        """
+        Récupère un résumé des stats locales
+        Les agrégats viennent du rollup journalier, seules les parties récentes
+        (recent_limit, None: toute la fenêtre) sont lues dans local_stats
+        """
         try:
             # Calculer la date de début
-            from datetime import timedelta
             start_date = datetime.now() - timedelta(days=days)
             
-            # Récupérer les stats récentes
-            result = await db.execute(
-                select(LocalStats)
-                .where(LocalStats.played_at >= start_date)
-                .order_by(LocalStats.played_at.desc())
-            )
-            recent_stats = result.scalars().all()
-            
-            # Statistiques générales
-            total_result = await db.execute(select(func.count(LocalStats.id)))
-            total_entries = total_result.scalar()
+            # Totaux, moyennes, top scénarios et parties de la fenêtre en un aller-retour
+            summary = await fetch_window_summary(db, start_date, top_limit=10, recent_limit=recent_limit)
             
-            unique_scenarios_result = await db.execute(
-                select(func.count(func.distinct(LocalStats.scenario_name)))
-            )
-            unique_scenarios = unique_scenarios_result.scalar()
-            
-            # Moyennes
-            avg_score_result = await db.execute(
-                select(func.avg(LocalStats.score))
-                .where(LocalStats.played_at >= start_date)
-            )
-            average_score = avg_score_result.scalar() or 0
-            
-            avg_accuracy_result = await db.execute(
-                select(func.avg(LocalStats.accuracy))
-                .where(LocalStats.played_at >= start_date)
-            )
-            average_accuracy = avg_accuracy_result.scalar() or 0
-            
-            # Top scénarios par score
-            top_scenarios_result = await db.execute(
-                select(
-                    LocalStats.scenario_name,
-                    func.max(LocalStats.score).label('best_score'),
-                    func.avg(LocalStats.score).label('avg_score'),
-                    func.count(LocalStats.id).label('plays')
-                )
-                .where(LocalStats.played_at >= start_date)
-                .group_by(LocalStats.scenario_name)
-                .order_by(func.max(LocalStats.score).desc())
-                .limit(10)
-            )
             top_scenarios = [
                 {
-                    "scenario_name": row.scenario_name,
-                    "best_score": float(row.best_score),
-                    "avg_score": float(row.avg_score),
-                    "plays": row.plays
+                    "scenario_name": scenario.scenario_name,
+                    "best_score": scenario.best_score,
+                    "avg_score": scenario.avg_score,
+                    "plays": scenario.plays
                 }
-                for row in top_scenarios_result
+                for scenario in summary.top_scenarios
             ]
             
             # Format des stats récentes
@@ -158,21 +425,21 @@ class StatsParser:
                     "kills": stat.kills,
                     "played_at": stat.played_at.isoformat() if stat.played_at else None
                 }
-                for stat in recent_stats
+                for stat in summary.recent
             ]
             
             return {
-                "total_entries": total_entries,
-                "unique_scenarios": unique_scenarios,
-                "average_score": float(average_score),
-                "average_accuracy": float(average_accuracy),
+                "total_entries": summary.total_entries,
+                "unique_scenarios": summary.unique_scenarios,
+                "average_score": summary.average_score,
+                "average_accuracy": summary.average_accuracy,
                 "recent_stats": recent_stats_data,
                 "top_scenarios": top_scenarios,
                 "summary": {
                     "period_days": days,
-                    "total_plays": len(recent_stats),
-                    "avg_score": float(average_score),
-                    "avg_accuracy": float(average_accuracy)
+                    "total_plays": summary.window_plays,
+                    "avg_score": summary.average_score,
+                    "avg_accuracy": summary.average_accuracy
                 }
             }
             
@@ -180,37 +447,93 @@ class StatsParser:
             logger.error(f"Erreur lors de la récupération du résumé: {e}")
             raise
     
+    async def get_progression(
+        self,
+        db: AsyncSession,
+        days: int = 30,
+        bucket: str = "day",
+        scenario_name: Optional[str] = None,
+        rolling_window: int = 7,
+        scenario_limit: int = 10
+    ) -> List[Dict[str, Any]]:
+        """
+        Séries de progression par scénario (calculées en SQL sur le rollup),
+        mises en cache sous la version des stats: un import ou une suppression
+        rend les séries précédentes inaccessibles
+        """
+        cache = CacheService()
+        params_key = f"days{days}:{bucket}:w{rolling_window}:n{scenario_limit}:{scenario_name or '*'}"
+        # Version lue avant la requête et réutilisée pour le set (même logique que les tendances)
+        version = await cache.get_stats_version()
+        cached = await cache.get_stats_progression(params_key, version)
+        if cached is not None:
+            return cached
+
+        try:
+            start_date = datetime.now() - timedelta(days=days)
+            series = await fetch_progression(
+                db,
+                start_date,
+                bucket=bucket,
+                scenario_name=scenario_name,
+                rolling_window=rolling_window,
+                scenario_limit=scenario_limit
+            )
+
+            progression = [
+                {
+                    "scenario_name": scenario.scenario_name,
+                    "plays": scenario.plays,
+                    "slope_per_day": scenario.slope_per_day,
+                    "r2": scenario.r2,
+                    "points": [
+                        {
+                            "date": point.period.isoformat(),
+                            "plays": point.plays,
+                            "best_score": point.best_score,
+                            "avg_score": point.avg_score,
+                            "avg_accuracy": point.avg_accuracy,
+                            "rolling_avg": point.rolling_avg,
+                            "personal_best": point.personal_best
+                        }
+                        for point in scenario.points
+                    ]
+                }
+                for scenario in series
+            ]
+
+        except Exception as e:
+            logger.error(f"Erreur lors du calcul de la progression: {e}")
+            raise
+
+        await cache.set_stats_progression(params_key, progression, version, ttl=get_settings().redis_stats_ttl)
+        return progression
+    
     async def get_scenario_stats(self, scenario_name: str, db: AsyncSession) -> Optional[Dict[str, Any]]:
         """Récupère les stats d'un scénario spécifique"""
         try:
-            # Récupérer toutes les stats pour ce scénario
-            result = await db.execute(
-                select(LocalStats)
-                .where(LocalStats.scenario_name == scenario_name)
-                .order_by(LocalStats.played_at.desc())
-            )
-            stats = result.scalars().all()
+            # Agrégats lus dans scenario_summary + 20 entrées récentes
+            summary = await fetch_scenario_summary(db, scenario_name, recent_limit=20)
             
-            if not stats:
+            if summary is None:
                 return None
             
-            # Calculer les statistiques
-            scores = [stat.score for stat in stats if stat.score is not None]
-            accuracies = [stat.accuracy for stat in stats if stat.accuracy is not None]
-            
             return {
                 "scenario_name": scenario_name,
-                "total_plays": len(stats),
-                "best_score": max(scores) if scores else 0,
-                "average_score": sum(scores) / len(scores) if scores else 0,
-                "average_accuracy": sum(accuracies) / len(accuracies) if accuracies else 0,
+                "total_plays": summary.total_plays,
+                "best_score": summary.best_score,
+                "best_played_at": summary.best_played_at.isoformat() if summary.best_played_at else None,
+                "average_score": summary.average_score,
+                "score_stddev": summary.score_stddev,
+                "average_accuracy": summary.average_accuracy,
+                "last_played_at": summary.last_played_at.isoformat() if summary.last_played_at else None,
                 "scores_history": [
                     {
                         "score": stat.score,
                         "accuracy": stat.accuracy,
                         "played_at": stat.played_at.isoformat() if stat.played_at else None
                     }
-                    for stat in stats[:20]  # Limiter à 20 entrées récentes
+                    for stat in summary.recent
                 ]
             }
             
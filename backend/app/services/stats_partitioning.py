@@ -0,0 +1,162 @@
+"""
+Stats Partitioning - Partitionnement mensuel optionnel de local_stats
+Mode opt-in (STATS_PARTITIONING=true) pour les historiques de plusieurs
+années: local_stats devient une table partitionnée par RANGE (played_at), une
+partition par mois UTC + une partition DEFAULT. Les requêtes de fenêtre
+n'ouvrent que les partitions concernées (partition pruning).
+
+La conversion est ponctuelle (scripts/partition_local_stats.py), puis les
+partitions des mois à venir sont créées au démarrage de l'API.
+Contraintes PostgreSQL: la clé primaire devient (id, played_at) et played_at
+doit être renseigné (les imports rejettent déjà les lignes sans date)
+"""
+from typing import List, NamedTuple
+from datetime import date, datetime, timezone
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_session_local
+
+logger = logging.getLogger(__name__)
+
+
+PARTITION_PREFIX = "local_stats_y"
+DEFAULT_PARTITION = "local_stats_default"
+LEGACY_TABLE = "local_stats_unpartitioned"
+
+# Index de la table partitionnée (créés sur le parent, propagés aux partitions)
+# après suppression de l'ancienne table, dont ils reprennent les noms
+PARTITIONED_INDEXES = [
+    # La clé de partitionnement doit faire partie de la clé primaire
+    "ALTER TABLE local_stats ADD PRIMARY KEY (id, played_at)",
+    "CREATE UNIQUE INDEX uq_local_stats_run ON local_stats (scenario_name, played_at, score)",
+    "CREATE INDEX idx_local_stats_played_at_id ON local_stats (played_at DESC, id DESC)",
+    "CREATE INDEX idx_local_stats_scenario_played_at ON local_stats (scenario_name, played_at DESC, id DESC)",
+    "CREATE INDEX brin_local_stats_played_at ON local_stats USING brin (played_at)",
+]
+
+
+class MonthPartition(NamedTuple):
+    """Partition mensuelle [start, end) de local_stats"""
+    name: str
+    start: date
+    end: date
+
+
+def _add_months(day: date, months: int) -> date:
+    month_index = day.year * 12 + day.month - 1 + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def month_partitions(first: date, last: date) -> List[MonthPartition]:
+    """Partitions mensuelles couvrant first..last (bornes incluses)"""
+    partitions = []
+    current = date(first.year, first.month, 1)
+    while current <= last:
+        following = _add_months(current, 1)
+        partitions.append(MonthPartition(
+            f"{PARTITION_PREFIX}{current.year}m{current.month:02d}", current, following
+        ))
+        current = following
+    return partitions
+
+
+def _create_partition_sql(partition: MonthPartition) -> str:
+    # Bornes en UTC, comme le jour du rollup
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition.name} PARTITION OF local_stats "
+        f"FOR VALUES FROM ('{partition.start.isoformat()} 00:00:00+00') "
+        f"TO ('{partition.end.isoformat()} 00:00:00+00')"
+    )
+
+
+async def is_partitioned(db: AsyncSession) -> bool:
+    """local_stats est-elle une table partitionnée ?"""
+    result = await db.execute(text(
+        "SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass('local_stats')"
+    ))
+    return bool(result.scalar())
+
+
+async def ensure_partitions(db: AsyncSession, months_ahead: int = 3) -> int:
+    """
+    Crée les partitions du mois courant et des `months_ahead` mois suivants
+    (sans commit, no-op si local_stats n'est pas partitionnée)
+    Retourne le nombre de partitions vérifiées
+    """
+    if not await is_partitioned(db):
+        return 0
+
+    today = datetime.now(timezone.utc).date()
+    partitions = month_partitions(today, _add_months(today, months_ahead))
+    for partition in partitions:
+        await db.execute(text(_create_partition_sql(partition)))
+    return len(partitions)
+
+
+async def prepare_partitions(months_ahead: int = 3):
+    """
+    Crée les partitions à venir au démarrage de l'API
+    Une partition ne peut plus être créée si la partition DEFAULT contient déjà
+    des parties de ce mois: redémarrer l'API au moins tous les `months_ahead` mois
+    """
+    try:
+        async with get_session_local()() as session:
+            count = await ensure_partitions(session, months_ahead)
+            await session.commit()
+        if count:
+            logger.info(f"Partitions mensuelles de local_stats vérifiées ({count} mois)")
+    except Exception as e:
+        logger.error(f"Erreur lors de la création des partitions de local_stats: {e}")
+
+
+async def convert_to_partitioned(db: AsyncSession, months_ahead: int = 3) -> int:
+    """
+    Convertit local_stats en table partitionnée par mois (sans commit, à
+    exécuter dans une transaction: la table est verrouillée pendant la copie)
+    Retourne le nombre de partitions mensuelles créées
+    """
+    if await is_partitioned(db):
+        raise ValueError("local_stats est déjà partitionnée")
+
+    missing_dates = (await db.execute(
+        text("SELECT count(*) FROM local_stats WHERE played_at IS NULL")
+    )).scalar()
+    if missing_dates:
+        raise ValueError(
+            f"{missing_dates} partie(s) sans played_at: impossible de partitionner par date"
+        )
+
+    await db.execute(text("LOCK TABLE local_stats IN ACCESS EXCLUSIVE MODE"))
+    bounds = (await db.execute(text(
+        "SELECT (min(played_at) AT TIME ZONE 'UTC')::date, (max(played_at) AT TIME ZONE 'UTC')::date "
+        "FROM local_stats"
+    ))).one()
+
+    today = datetime.now(timezone.utc).date()
+    first = min(bounds[0] or today, today)
+    last = max(bounds[1] or today, _add_months(today, months_ahead))
+    partitions = month_partitions(first, last)
+
+    await db.execute(text(f"ALTER TABLE local_stats RENAME TO {LEGACY_TABLE}"))
+    await db.execute(text(
+        f"CREATE TABLE local_stats (LIKE {LEGACY_TABLE} INCLUDING DEFAULTS) "
+        "PARTITION BY RANGE (played_at)"
+    ))
+    for partition in partitions:
+        await db.execute(text(_create_partition_sql(partition)))
+    await db.execute(text(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF local_stats DEFAULT"))
+
+    await db.execute(text(f"INSERT INTO local_stats SELECT * FROM {LEGACY_TABLE}"))
+    # La séquence de id suit la nouvelle table avant suppression de l'ancienne
+    await db.execute(text("ALTER SEQUENCE local_stats_id_seq OWNED BY local_stats.id"))
+    await db.execute(text(f"DROP TABLE {LEGACY_TABLE}"))
+
+    for statement in PARTITIONED_INDEXES:
+        await db.execute(text(statement))
+    await db.execute(text("ANALYZE local_stats"))
+
+    logger.info(f"local_stats partitionnée: {len(partitions)} partition(s) mensuelle(s) + DEFAULT")
+    return len(partitions)
@@ -0,0 +1,545 @@
+"""
+Stats Queries - Couche de requêtes SQL pour les statistiques locales
+Chaque fonction calcule ses agrégats en un seul aller-retour (CTE + json_agg)
+et retourne des tuples légers plutôt que des entités ORM.
+Les agrégats de fenêtre sont lus dans le rollup scenario_daily_stats (coût
+proportionnel au nombre de scénarios x jours), ceux de tout l'historique dans
+scenario_summary (une ligne par scénario), seules les parties récentes
+viennent de local_stats
+"""
+from typing import Any, List, NamedTuple, Optional, Tuple
+from datetime import date, datetime
+import base64
+import json
+
+from sqlalchemy import func, select, text, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.stats import LocalStats
+from app.services.stats_rollup import utc_day
+
+
+class StatRow(NamedTuple):
+    """Une partie (ligne de local_stats) sans surcoût ORM"""
+    id: int
+    scenario_name: str
+    score: Optional[float]
+    accuracy: Optional[float]
+    kills: Optional[int]
+    played_at: Optional[datetime]
+
+
+class ScenarioAggregate(NamedTuple):
+    """Agrégats d'un scénario sur une fenêtre"""
+    scenario_name: str
+    best_score: float
+    avg_score: float
+    plays: int
+
+
+class WindowSummary(NamedTuple):
+    """Résumé des stats: totaux globaux + agrégats de la fenêtre"""
+    total_entries: int
+    unique_scenarios: int
+    window_plays: int
+    average_score: float
+    average_accuracy: float
+    top_scenarios: List[ScenarioAggregate]
+    recent: List[StatRow]
+
+
+class HistoryPage(NamedTuple):
+    """Page d'historique (keyset): parties + curseur de la page suivante"""
+    rows: List[StatRow]
+    next_cursor: Optional[str]
+
+
+class HistorySummary(NamedTuple):
+    """Agrégats d'une période d'historique filtrée (bornes et scénario de la page)"""
+    total_plays: int
+    average_score: Optional[float]
+    average_accuracy: Optional[float]
+
+
+class ProgressionPoint(NamedTuple):
+    """Un point de la série de progression (un jour ou une semaine)"""
+    period: date
+    plays: int
+    best_score: Optional[float]
+    avg_score: Optional[float]
+    avg_accuracy: Optional[float]
+    rolling_avg: Optional[float]
+    personal_best: Optional[float]
+
+
+class ScenarioProgression(NamedTuple):
+    """Série de progression d'un scénario + pente de la moyenne (points par jour)"""
+    scenario_name: str
+    plays: int
+    slope_per_day: Optional[float]
+    r2: Optional[float]
+    points: List[ProgressionPoint]
+
+
+class BestScore(NamedTuple):
+    """Record personnel d'un scénario"""
+    scenario_name: str
+    best_score: float
+    best_played_at: Optional[datetime]
+    avg_score: float
+    plays: int
+    last_played_at: Optional[datetime]
+
+
+class ScenarioSummary(NamedTuple):
+    """Agrégats d'un scénario sur tout l'historique"""
+    scenario_name: str
+    total_plays: int
+    best_score: float
+    best_played_at: Optional[datetime]
+    average_score: float
+    score_stddev: float
+    average_accuracy: float
+    last_played_at: Optional[datetime]
+    recent: List[StatRow]
+
+
+WINDOW_SUMMARY_SQL = text("""
+WITH window_days AS (
+    SELECT scenario_name, plays, best_score, score_sum, scored_plays,
+           accuracy_sum, accuracy_plays
+    FROM scenario_daily_stats
+    WHERE day >= :start_day
+),
+totals AS (
+    SELECT coalesce(sum(plays), 0) AS total_entries,
+           count(*) AS unique_scenarios
+    FROM scenario_summary
+),
+window_agg AS (
+    SELECT coalesce(sum(plays), 0) AS plays,
+           sum(score_sum) / nullif(sum(scored_plays), 0) AS avg_score,
+           sum(accuracy_sum) / nullif(sum(accuracy_plays), 0) AS avg_accuracy
+    FROM window_days
+),
+top AS (
+    SELECT scenario_name,
+           max(best_score) AS best_score,
+           sum(score_sum) / nullif(sum(scored_plays), 0) AS avg_score,
+           sum(plays) AS plays
+    FROM window_days
+    GROUP BY scenario_name
+    ORDER BY max(best_score) DESC NULLS LAST
+    LIMIT :top_limit
+),
+recent AS (
+    SELECT id, scenario_name, score, accuracy, kills, played_at
+    FROM local_stats
+    WHERE played_at >= :start_date
+    ORDER BY played_at DESC, id DESC
+    LIMIT :recent_limit
+)
+SELECT
+    t.total_entries,
+    t.unique_scenarios,
+    w.plays AS window_plays,
+    w.avg_score,
+    w.avg_accuracy,
+    (SELECT json_agg(json_build_array(scenario_name, best_score, avg_score, plays)
+                     ORDER BY best_score DESC NULLS LAST)
+     FROM top) AS top_scenarios,
+    (SELECT json_agg(json_build_array(id, scenario_name, score, accuracy, kills, played_at)
+                     ORDER BY played_at DESC, id DESC)
+     FROM recent) AS recent
+FROM totals t CROSS JOIN window_agg w
+""")
+
+
+SCENARIO_SUMMARY_SQL = text("""
+WITH recent AS (
+    SELECT id, scenario_name, score, accuracy, kills, played_at
+    FROM local_stats
+    WHERE scenario_name = :scenario_name AND played_at IS NOT NULL
+    ORDER BY played_at DESC, id DESC
+    LIMIT :recent_limit
+)
+SELECT
+    s.plays,
+    s.best_score,
+    s.best_played_at,
+    s.mean_score,
+    CASE WHEN s.scored_plays > 0 THEN sqrt(s.score_m2 / s.scored_plays) ELSE 0 END AS score_stddev,
+    s.mean_accuracy,
+    s.last_played_at,
+    (SELECT json_agg(json_build_array(id, scenario_name, score, accuracy, kills, played_at)
+                     ORDER BY played_at DESC, id DESC)
+     FROM recent) AS recent
+FROM scenario_summary s
+WHERE s.scenario_name = :scenario_name
+""")
+
+
+BEST_SCORES_SQL = text("""
+SELECT scenario_name, best_score, best_played_at, mean_score, plays, last_played_at
+FROM scenario_summary
+WHERE best_score IS NOT NULL
+ORDER BY best_score DESC NULLS LAST
+LIMIT :limit
+""")
+
+
+# Les fenêtres glissantes et le record personnel sont calculés sur tout
+# l'historique, la série n'est filtrée qu'ensuite: le premier point de la
+# fenêtre tient compte des parties antérieures
+PROGRESSION_SQL = text("""
+WITH periods AS (
+    SELECT scenario_name,
+           date_trunc(:bucket, day::timestamp)::date AS period,
+           sum(plays) AS plays,
+           max(best_score) AS best_score,
+           sum(score_sum) / nullif(sum(scored_plays), 0) AS avg_score,
+           sum(accuracy_sum) / nullif(sum(accuracy_plays), 0) AS avg_accuracy
+    FROM scenario_daily_stats
+    WHERE CAST(:scenario_name AS varchar) IS NULL OR scenario_name = :scenario_name
+    GROUP BY scenario_name, date_trunc(:bucket, day::timestamp)
+),
+series AS (
+    SELECT p.*,
+           avg(avg_score) OVER (
+               PARTITION BY scenario_name ORDER BY period
+               ROWS BETWEEN CAST(:rolling_preceding AS integer) PRECEDING AND CURRENT ROW
+           ) AS rolling_avg,
+           max(best_score) OVER (
+               PARTITION BY scenario_name ORDER BY period
+               ROWS UNBOUNDED PRECEDING
+           ) AS personal_best
+    FROM periods p
+),
+window_series AS (
+    SELECT *
+    FROM series
+    WHERE period >= date_trunc(:bucket, CAST(:start_day AS date)::timestamp)::date
+),
+trends AS (
+    SELECT scenario_name,
+           sum(plays) AS plays,
+           regr_slope(avg_score, extract(epoch FROM period::timestamp) / 86400.0) AS slope_per_day,
+           regr_r2(avg_score, extract(epoch FROM period::timestamp) / 86400.0) AS r2
+    FROM window_series
+    GROUP BY scenario_name
+    ORDER BY sum(plays) DESC, scenario_name
+    LIMIT :scenario_limit
+)
+SELECT
+    t.scenario_name,
+    t.plays,
+    t.slope_per_day,
+    t.r2,
+    json_agg(json_build_array(s.period, s.plays, s.best_score, s.avg_score,
+                              s.avg_accuracy, s.rolling_avg, s.personal_best)
+             ORDER BY s.period) AS points
+FROM trends t
+JOIN window_series s USING (scenario_name)
+GROUP BY t.scenario_name, t.plays, t.slope_per_day, t.r2
+ORDER BY t.plays DESC, t.scenario_name
+""")
+
+PROGRESSION_BUCKETS = ("day", "week")
+
+
+DAILY_SCORES_SQL = text("""
+SELECT scenario_name, day, score_sum / scored_plays AS avg_score, scored_plays
+FROM scenario_daily_stats
+WHERE day >= :start_day AND scored_plays > 0
+ORDER BY scenario_name, day
+""")
+
+
+SCENARIO_PLAY_COUNTS_SQL = text("""
+SELECT scenario_name, plays AS play_count
+FROM scenario_summary
+ORDER BY plays DESC, scenario_name
+LIMIT :limit
+""")
+
+
+TOTALS_SQL = text("""
+SELECT coalesce(sum(plays), 0) AS total_plays,
+       count(*) AS total_scenarios
+FROM scenario_summary
+""")
+
+
+def encode_cursor(played_at: datetime, stat_id: int) -> str:
+    """Curseur opaque (played_at, id) de la dernière ligne d'une page"""
+    raw = f"{played_at.isoformat()}|{stat_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Décode un curseur de page, ValueError si invalide"""
+    try:
+        played_at, stat_id = base64.urlsafe_b64decode(cursor.encode()).decode().rsplit("|", 1)
+        return datetime.fromisoformat(played_at), int(stat_id)
+    except Exception:
+        raise ValueError("Curseur de pagination invalide")
+
+
+def _json_list(value: Any) -> List[Any]:
+    """json_agg -> liste Python (NULL quand l'agrégat est vide)"""
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return json.loads(value)
+    return value
+
+
+def _parse_datetime(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+
+def _stat_rows(value: Any) -> List[StatRow]:
+    return [
+        StatRow(row[0], row[1], row[2], row[3], row[4], _parse_datetime(row[5]))
+        for row in _json_list(value)
+    ]
+
+
+async def fetch_window_summary(
+    db: AsyncSession,
+    start_date: datetime,
+    top_limit: int = 10,
+    recent_limit: Optional[int] = 100
+) -> WindowSummary:
+    """
+    Totaux globaux, moyennes de la fenêtre, top scénarios et parties récentes
+    en une seule requête (recent_limit=None: toutes les parties de la fenêtre)
+    La fenêtre des agrégats est arrondie au jour UTC de start_date
+    """
+    result = await db.execute(
+        WINDOW_SUMMARY_SQL,
+        {
+            "start_date": start_date,
+            "start_day": utc_day(start_date),
+            "top_limit": top_limit,
+            "recent_limit": recent_limit
+        }
+    )
+    row = result.one()
+
+    return WindowSummary(
+        total_entries=row.total_entries,
+        unique_scenarios=row.unique_scenarios,
+        window_plays=row.window_plays,
+        average_score=float(row.avg_score or 0),
+        average_accuracy=float(row.avg_accuracy or 0),
+        top_scenarios=[
+            ScenarioAggregate(name, float(best or 0), float(avg or 0), plays)
+            for name, best, avg, plays in _json_list(row.top_scenarios)
+        ],
+        recent=_stat_rows(row.recent)
+    )
+
+
+async def fetch_history_page(
+    db: AsyncSession,
+    start_date: datetime,
+    end_date: Optional[datetime] = None,
+    scenario_name: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = 50
+) -> HistoryPage:
+    """
+    Page d'historique triée par (played_at, id) décroissants, paginée par
+    keyset: la page suivante part strictement après la dernière ligne, le coût
+    d'une page ne dépend pas de sa profondeur (index played_at DESC, id DESC)
+    """
+    table = LocalStats.__table__
+    stmt = (
+        select(
+            table.c.id, table.c.scenario_name, table.c.score,
+            table.c.accuracy, table.c.kills, table.c.played_at
+        )
+        .where(table.c.played_at >= start_date)
+        .order_by(table.c.played_at.desc(), table.c.id.desc())
+        .limit(limit + 1)
+    )
+    if end_date is not None:
+        stmt = stmt.where(table.c.played_at < end_date)
+    if scenario_name:
+        stmt = stmt.where(table.c.scenario_name == scenario_name)
+    if cursor:
+        cursor_played_at, cursor_id = decode_cursor(cursor)
+        stmt = stmt.where(
+            tuple_(table.c.played_at, table.c.id) < tuple_(cursor_played_at, cursor_id)
+        )
+
+    result = await db.execute(stmt)
+    rows = [StatRow(*row) for row in result]
+
+    # Une ligne de plus que demandé: il reste une page après celle-ci
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last.played_at, last.id)
+
+    return HistoryPage(rows=rows, next_cursor=next_cursor)
+
+
+async def fetch_history_summary(
+    db: AsyncSession,
+    start_date: datetime,
+    end_date: Optional[datetime] = None,
+    scenario_name: Optional[str] = None
+) -> HistorySummary:
+    """
+    Agrégats exacts sur les mêmes filtres que fetch_history_page
+    (bornes quelconques, non alignées sur les jours du rollup)
+    """
+    table = LocalStats.__table__
+    stmt = select(
+        func.count(), func.avg(table.c.score), func.avg(table.c.accuracy)
+    ).where(table.c.played_at >= start_date)
+    if end_date is not None:
+        stmt = stmt.where(table.c.played_at < end_date)
+    if scenario_name:
+        stmt = stmt.where(table.c.scenario_name == scenario_name)
+
+    total_plays, average_score, average_accuracy = (await db.execute(stmt)).one()
+    return HistorySummary(
+        total_plays=total_plays,
+        average_score=_optional_float(average_score),
+        average_accuracy=_optional_float(average_accuracy)
+    )
+
+
+async def fetch_scenario_summary(
+    db: AsyncSession,
+    scenario_name: str,
+    recent_limit: int = 20
+) -> Optional[ScenarioSummary]:
+    """Agrégats d'un scénario (lecture par clé) et ses dernières parties, None si jamais joué"""
+    result = await db.execute(
+        SCENARIO_SUMMARY_SQL,
+        {"scenario_name": scenario_name, "recent_limit": recent_limit}
+    )
+    row = result.one_or_none()
+
+    if row is None or not row.plays:
+        return None
+
+    return ScenarioSummary(
+        scenario_name=scenario_name,
+        total_plays=row.plays,
+        best_score=float(row.best_score or 0),
+        best_played_at=row.best_played_at,
+        average_score=float(row.mean_score or 0),
+        score_stddev=float(row.score_stddev or 0),
+        average_accuracy=float(row.mean_accuracy or 0),
+        last_played_at=row.last_played_at,
+        recent=_stat_rows(row.recent)
+    )
+
+
+async def fetch_best_scores(db: AsyncSession, limit: int = 20) -> List[BestScore]:
+    """Records personnels triés par score (parcours de l'index best_score DESC)"""
+    result = await db.execute(BEST_SCORES_SQL, {"limit": limit})
+    return [
+        BestScore(
+            scenario_name=row.scenario_name,
+            best_score=float(row.best_score),
+            best_played_at=row.best_played_at,
+            avg_score=float(row.mean_score or 0),
+            plays=row.plays,
+            last_played_at=row.last_played_at
+        )
+        for row in result
+    ]
+
+
+def _optional_float(value: Any) -> Optional[float]:
+    return float(value) if value is not None else None
+
+
+def _progression_points(value: Any) -> List[ProgressionPoint]:
+    return [
+        ProgressionPoint(
+            period=date.fromisoformat(row[0]),
+            plays=row[1],
+            best_score=_optional_float(row[2]),
+            avg_score=_optional_float(row[3]),
+            avg_accuracy=_optional_float(row[4]),
+            rolling_avg=_optional_float(row[5]),
+            personal_best=_optional_float(row[6])
+        )
+        for row in _json_list(value)
+    ]
+
+
+async def fetch_progression(
+    db: AsyncSession,
+    start_date: datetime,
+    bucket: str = "day",
+    scenario_name: Optional[str] = None,
+    rolling_window: int = 7,
+    scenario_limit: Optional[int] = 10
+) -> List[ScenarioProgression]:
+    """
+    Séries de progression par scénario, agrégées par jour ou par semaine
+    (date_trunc sur le rollup): moyenne, moyenne glissante sur rolling_window
+    périodes, record personnel cumulé et pente de la moyenne (regr_slope)
+    Les scénarios les plus joués de la fenêtre passent en premier
+    """
+    if bucket not in PROGRESSION_BUCKETS:
+        raise ValueError(f"Granularité inconnue: {bucket}")
+
+    result = await db.execute(
+        PROGRESSION_SQL,
+        {
+            "bucket": bucket,
+            "start_day": utc_day(start_date),
+            "scenario_name": scenario_name,
+            "rolling_preceding": max(rolling_window, 1) - 1,
+            "scenario_limit": scenario_limit
+        }
+    )
+
+    return [
+        ScenarioProgression(
+            scenario_name=row.scenario_name,
+            plays=row.plays,
+            slope_per_day=_optional_float(row.slope_per_day),
+            r2=_optional_float(row.r2),
+            points=_progression_points(row.points)
+        )
+        for row in result
+    ]
+
+
+async def fetch_daily_scores(
+    db: AsyncSession,
+    start_date: datetime
+) -> List[Tuple[str, date, float, int]]:
+    """(scénario, jour, score moyen, parties scorées) de la fenêtre, depuis le rollup"""
+    result = await db.execute(DAILY_SCORES_SQL, {"start_day": utc_day(start_date)})
+    return [
+        (row.scenario_name, row.day, float(row.avg_score), row.scored_plays)
+        for row in result
+    ]
+
+
+async def fetch_scenario_play_counts(
+    db: AsyncSession,
+    limit: Optional[int] = None
+) -> List[Tuple[str, int]]:
+    """Scénarios triés par nombre de parties (limit=None: tous)"""
+    result = await db.execute(SCENARIO_PLAY_COUNTS_SQL, {"limit": limit})
+    return [(row.scenario_name, row.play_count) for row in result]
+
+
+async def fetch_totals(db: AsyncSession) -> Tuple[int, int]:
+    """(nombre total de parties, nombre de scénarios distincts)"""
+    result = await db.execute(TOTALS_SQL)
+    row = result.one()
+    return row.total_plays, row.total_scenarios
@@ -0,0 +1,297 @@
+"""
+Stats Rollup - Maintenance des tables scenario_daily_stats et scenario_summary
+Agrège les parties par (scénario, jour UTC) et par scénario, puis fusionne les
+agrégats dans les tables de rollup par upsert, dans la même transaction que
+l'insertion brute
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+from datetime import date, datetime, timezone
+import logging
+import math
+
+from sqlalchemy import case, func, or_, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.stats import ScenarioDailyStats, ScenarioSummaryStats
+
+logger = logging.getLogger(__name__)
+
+
+# asyncpg limite une requête à 32767 paramètres (9 colonnes par ligne)
+UPSERT_BATCH_SIZE = 1000
+
+# (scenario_name, played_at, score, accuracy)
+Run = Tuple[str, datetime, Optional[float], Optional[float]]
+
+
+REBUILD_DAY_SQL = text("""
+INSERT INTO scenario_daily_stats (
+    scenario_name, day, plays, best_score, score_sum, score_sq_sum,
+    scored_plays, accuracy_sum, accuracy_plays
+)
+SELECT
+    scenario_name,
+    (played_at AT TIME ZONE 'UTC')::date,
+    count(*),
+    max(score),
+    coalesce(sum(score), 0),
+    coalesce(sum(score * score), 0),
+    count(score),
+    coalesce(sum(accuracy), 0),
+    count(accuracy)
+FROM local_stats
+WHERE scenario_name = :scenario_name
+  AND played_at >= :day_start
+  AND played_at < :day_start + interval '1 day'
+GROUP BY scenario_name, (played_at AT TIME ZONE 'UTC')::date
+""")
+
+
+REBUILD_SUMMARY_SQL = text("""
+INSERT INTO scenario_summary (
+    scenario_name, plays, best_score, best_played_at, scored_plays,
+    mean_score, score_m2, accuracy_plays, mean_accuracy,
+    first_played_at, last_played_at
+)
+SELECT
+    scenario_name,
+    count(*),
+    max(score),
+    (array_agg(played_at ORDER BY score DESC, played_at) FILTER (WHERE score IS NOT NULL))[1],
+    count(score),
+    coalesce(avg(score), 0),
+    coalesce(var_pop(score) * count(score), 0),
+    count(accuracy),
+    coalesce(avg(accuracy), 0),
+    min(played_at),
+    max(played_at)
+FROM local_stats
+WHERE scenario_name = :scenario_name
+GROUP BY scenario_name
+""")
+
+
+def _clean(value: Optional[float]) -> Optional[float]:
+    """NaN (pandas) -> None"""
+    if value is None:
+        return None
+    value = float(value)
+    return None if math.isnan(value) else value
+
+
+def utc_day(played_at: datetime) -> date:
+    """Jour UTC d'une partie (les dates naïves sont stockées comme UTC)"""
+    if played_at.tzinfo is not None:
+        played_at = played_at.astimezone(timezone.utc)
+    return played_at.date()
+
+
+def aggregate_daily_runs(runs: Iterable[Run]) -> List[Dict]:
+    """Agrège des parties en lignes de rollup, une par (scénario, jour)"""
+    buckets: Dict[Tuple[str, date], Dict] = {}
+
+    for scenario_name, played_at, score, accuracy in runs:
+        if played_at is None:
+            continue
+        key = (scenario_name, utc_day(played_at))
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = buckets[key] = {
+                "scenario_name": key[0],
+                "day": key[1],
+                "plays": 0,
+                "best_score": None,
+                "score_sum": 0.0,
+                "score_sq_sum": 0.0,
+                "scored_plays": 0,
+                "accuracy_sum": 0.0,
+                "accuracy_plays": 0,
+            }
+
+        bucket["plays"] += 1
+
+        score = _clean(score)
+        if score is not None:
+            bucket["score_sum"] += score
+            bucket["score_sq_sum"] += score * score
+            bucket["scored_plays"] += 1
+            if bucket["best_score"] is None or score > bucket["best_score"]:
+                bucket["best_score"] = score
+
+        accuracy = _clean(accuracy)
+        if accuracy is not None:
+            bucket["accuracy_sum"] += accuracy
+            bucket["accuracy_plays"] += 1
+
+    return list(buckets.values())
+
+
+def aggregate_scenario_runs(runs: Iterable[Run]) -> List[Dict]:
+    """
+    Agrège des parties en lignes scenario_summary, une par scénario
+    Moyenne et M2 (somme des carrés des écarts) par l'algorithme de Welford
+    """
+    summaries: Dict[str, Dict] = {}
+
+    for scenario_name, played_at, score, accuracy in runs:
+        summary = summaries.get(scenario_name)
+        if summary is None:
+            summary = summaries[scenario_name] = {
+                "scenario_name": scenario_name,
+                "plays": 0,
+                "best_score": None,
+                "best_played_at": None,
+                "scored_plays": 0,
+                "mean_score": 0.0,
+                "score_m2": 0.0,
+                "accuracy_plays": 0,
+                "mean_accuracy": 0.0,
+                "first_played_at": None,
+                "last_played_at": None,
+            }
+
+        summary["plays"] += 1
+        if played_at is not None:
+            if summary["first_played_at"] is None or played_at < summary["first_played_at"]:
+                summary["first_played_at"] = played_at
+            if summary["last_played_at"] is None or played_at > summary["last_played_at"]:
+                summary["last_played_at"] = played_at
+
+        score = _clean(score)
+        if score is not None:
+            summary["scored_plays"] += 1
+            delta = score - summary["mean_score"]
+            summary["mean_score"] += delta / summary["scored_plays"]
+            summary["score_m2"] += delta * (score - summary["mean_score"])
+            if summary["best_score"] is None or score > summary["best_score"]:
+                summary["best_score"] = score
+                summary["best_played_at"] = played_at
+
+        accuracy = _clean(accuracy)
+        if accuracy is not None:
+            summary["accuracy_plays"] += 1
+            summary["mean_accuracy"] += (accuracy - summary["mean_accuracy"]) / summary["accuracy_plays"]
+
+    return list(summaries.values())
+
+
+async def apply_daily_rollup(db: AsyncSession, runs: Iterable[Run]) -> int:
+    """
+    Fusionne de nouvelles parties dans scenario_daily_stats (sans commit)
+    Retourne le nombre de lignes (scénario, jour) touchées
+    """
+    rows = aggregate_daily_runs(runs)
+    if not rows:
+        return 0
+
+    table = ScenarioDailyStats.__table__
+    for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+        stmt = insert(table).values(rows[start:start + UPSERT_BATCH_SIZE])
+        excluded = stmt.excluded
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.scenario_name, table.c.day],
+            set_={
+                "plays": table.c.plays + excluded.plays,
+                # GREATEST ignore les NULL
+                "best_score": func.greatest(table.c.best_score, excluded.best_score),
+                "score_sum": table.c.score_sum + excluded.score_sum,
+                "score_sq_sum": table.c.score_sq_sum + excluded.score_sq_sum,
+                "scored_plays": table.c.scored_plays + excluded.scored_plays,
+                "accuracy_sum": table.c.accuracy_sum + excluded.accuracy_sum,
+                "accuracy_plays": table.c.accuracy_plays + excluded.accuracy_plays,
+            }
+        )
+        await db.execute(stmt)
+
+    logger.debug(f"Rollup journalier mis à jour: {len(rows)} ligne(s)")
+    return len(rows)
+
+
+async def rebuild_daily_rollup(db: AsyncSession, scenario_name: str, played_at: datetime):
+    """
+    Recalcule la ligne de rollup d'un (scénario, jour) depuis local_stats (sans commit)
+    Utilisé après une suppression: le meilleur score ne peut pas être décrémenté
+    """
+    day = utc_day(played_at)
+    day_start = datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+
+    await db.execute(
+        ScenarioDailyStats.__table__.delete().where(
+            ScenarioDailyStats.scenario_name == scenario_name,
+            ScenarioDailyStats.day == day
+        )
+    )
+    await db.execute(REBUILD_DAY_SQL, {"scenario_name": scenario_name, "day_start": day_start})
+
+
+async def apply_scenario_summary(db: AsyncSession, runs: Iterable[Run]) -> int:
+    """
+    Fusionne de nouvelles parties dans scenario_summary (sans commit)
+    Moyennes et M2 du lot sont combinés à l'existant par la formule de Chan:
+    delta = moy_lot - moy, n = n_a + n_b, moy += delta * n_b / n,
+    M2 = M2_a + M2_b + delta² * n_a * n_b / n
+    Retourne le nombre de scénarios touchés
+    """
+    rows = aggregate_scenario_runs(runs)
+    if not rows:
+        return 0
+
+    table = ScenarioSummaryStats.__table__
+    for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+        stmt = insert(table).values(rows[start:start + UPSERT_BATCH_SIZE])
+        excluded = stmt.excluded
+
+        # Les expressions du SET lisent toutes la ligne existante (avant mise à jour)
+        scored = table.c.scored_plays + excluded.scored_plays
+        delta = excluded.mean_score - table.c.mean_score
+        accuracy_plays = table.c.accuracy_plays + excluded.accuracy_plays
+
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.scenario_name],
+            set_={
+                "plays": table.c.plays + excluded.plays,
+                "best_played_at": case(
+                    (or_(table.c.best_score.is_(None), excluded.best_score > table.c.best_score),
+                     excluded.best_played_at),
+                    else_=table.c.best_played_at
+                ),
+                # GREATEST / LEAST ignorent les NULL
+                "best_score": func.greatest(table.c.best_score, excluded.best_score),
+                "scored_plays": scored,
+                "mean_score": case(
+                    (scored == 0, 0.0),
+                    else_=table.c.mean_score + delta * excluded.scored_plays / scored
+                ),
+                "score_m2": case(
+                    (scored == 0, 0.0),
+                    else_=table.c.score_m2 + excluded.score_m2
+                    + delta * delta * table.c.scored_plays * excluded.scored_plays / scored
+                ),
+                "accuracy_plays": accuracy_plays,
+                "mean_accuracy": case(
+                    (accuracy_plays == 0, 0.0),
+                    else_=table.c.mean_accuracy
+                    + (excluded.mean_accuracy - table.c.mean_accuracy) * excluded.accuracy_plays / accuracy_plays
+                ),
+                "first_played_at": func.least(table.c.first_played_at, excluded.first_played_at),
+                "last_played_at": func.greatest(table.c.last_played_at, excluded.last_played_at),
+            }
+        )
+        await db.execute(stmt)
+
+    logger.debug(f"Résumé par scénario mis à jour: {len(rows)} scénario(s)")
+    return len(rows)
+
+
+async def rebuild_scenario_summary(db: AsyncSession, scenario_name: str):
+    """
+    Recalcule la ligne scenario_summary d'un scénario depuis local_stats (sans commit)
+    Utilisé après une suppression (record et variance non décrémentables)
+    """
+    await db.execute(
+        ScenarioSummaryStats.__table__.delete().where(
+            ScenarioSummaryStats.scenario_name == scenario_name
+        )
+    )
+    await db.execute(REBUILD_SUMMARY_SQL, {"scenario_name": scenario_name})
@@ -0,0 +1,236 @@
+"""
+Stats Watcher - Import automatique des nouvelles parties KovaaK's
+Surveille le dossier Stats configuré (inotify via watchfiles, sinon polling),
+regroupe les rafales de nouveaux fichiers et les importe par lot, avec une
+seule invalidation du cache des stats par lot
+"""
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from datetime import datetime, timezone
+from pathlib import Path
+import asyncio
+import logging
+import os
+
+from app.config import Settings, get_settings
+from app.database import get_session_local
+from app.services.cache_service import CacheService
+from app.services.stats_folder_importer import (
+    RUN_FILE_SUFFIX,
+    StatsFolderImporter,
+    create_stats_folder_importer,
+)
+from app.services.trend_analyzer import schedule_trend_refresh
+
+try:
+    from watchfiles import Change, awatch
+except ImportError:  # dépendance optionnelle (installée avec uvicorn[standard])
+    Change = None
+    awatch = None
+
+logger = logging.getLogger(__name__)
+
+
+WATCH_MODE_NATIVE = "native"
+WATCH_MODE_POLLING = "polling"
+
+
+def is_run_file(path: str) -> bool:
+    return path.endswith(RUN_FILE_SUFFIX)
+
+
+def collect_run_paths(changes: Iterable[Tuple[Any, str]]) -> List[Path]:
+    """Fichiers de partie ajoutés ou modifiés dans un lot d'événements watchfiles"""
+    return sorted({
+        Path(path) for change, path in changes
+        if change != Change.deleted and is_run_file(path)
+    })
+
+
+def scan_run_files(folder: Path) -> Dict[str, float]:
+    """Fichiers de partie du dossier -> date de modification (mode polling)"""
+    files = {}
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if entry.is_file() and is_run_file(entry.name):
+                files[entry.path] = entry.stat().st_mtime
+    return files
+
+
+def diff_scans(previous: Dict[str, float], current: Dict[str, float]) -> List[Path]:
+    """Fichiers nouveaux ou modifiés entre deux scans"""
+    return sorted(
+        Path(path) for path, mtime in current.items()
+        if previous.get(path) != mtime
+    )
+
+
+class StatsFolderWatcher:
+    """Surveille le dossier Stats de KovaaK's et importe les nouvelles parties"""
+
+    def __init__(
+        self,
+        settings: Settings,
+        importer: Optional[StatsFolderImporter] = None,
+        session_factory: Optional[Callable] = None
+    ):
+        self.folder = Path(settings.kovaaks_stats_dir) if settings.kovaaks_stats_dir else None
+        self.debounce = settings.stats_watch_debounce_ms
+        self.poll_interval = settings.stats_watch_poll_interval
+        self.force_polling = settings.stats_watch_force_polling or awatch is None
+        self.mode = WATCH_MODE_POLLING if self.force_polling else WATCH_MODE_NATIVE
+        self._importer = importer
+        self._session_factory = session_factory
+
+        self.batches = 0
+        self.files_imported = 0
+        self.runs_imported = 0
+        self.last_batch_at: Optional[datetime] = None
+        self.last_error: Optional[str] = None
+        # Fichiers d'un lot en échec (DB ou Redis indisponible), ajoutés au lot suivant
+        self._failed: Set[Path] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._stop_event = asyncio.Event()
+
+    @property
+    def enabled(self) -> bool:
+        return self.folder is not None
+
+    @property
+    def importer(self) -> StatsFolderImporter:
+        if self._importer is None:
+            self._importer = create_stats_folder_importer()
+        return self._importer
+
+    async def start(self):
+        """Lance la surveillance en tâche de fond (no-op si aucun dossier configuré)"""
+        if not self.enabled:
+            return
+        if not self.folder.is_dir():
+            logger.warning(f"Dossier Stats introuvable, surveillance désactivée: {self.folder}")
+            return
+        if self._task is None or self._task.done():
+            self._stop_event = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Surveillance du dossier Stats démarrée ({self.mode}): {self.folder}")
+
+    async def stop(self):
+        """Arrête la surveillance"""
+        if self._task:
+            self._stop_event.set()
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        # Rattrapage au démarrage: les fichiers déjà importés sont ignorés par nom
+        initial = await asyncio.to_thread(scan_run_files, self.folder)
+        caught_up = await self.import_batch([Path(path) for path in sorted(initial)]) is not None
+
+        if self.force_polling:
+            # Rattrapage en échec: le premier scan considère tous les fichiers comme nouveaux
+            await self._poll(initial if caught_up or not initial else {})
+        else:
+            await self._watch_native()
+
+    async def _watch_native(self):
+        """
+        inotify (Linux) via watchfiles, les rafales sont regroupées par le debounce
+        Sans événement, awatch rend la main toutes les poll_interval secondes pour
+        retenter les fichiers d'un lot en échec
+        """
+        async for changes in awatch(
+            self.folder,
+            debounce=self.debounce,
+            recursive=False,
+            stop_event=self._stop_event,
+            rust_timeout=int(self.poll_interval * 1000),
+            yield_on_timeout=True
+        ):
+            paths = collect_run_paths(changes)
+            if paths or self._failed:
+                await self.import_batch(paths)
+
+    async def _poll(self, known: Dict[str, float]):
+        """Fallback polling: scan périodique, puis attente du debounce pour regrouper la rafale"""
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            current = await asyncio.to_thread(scan_run_files, self.folder)
+            if not diff_scans(known, current) and not self._failed:
+                continue
+
+            # Laisser la rafale se terminer avant d'importer
+            await asyncio.sleep(self.debounce / 1000)
+            current = await asyncio.to_thread(scan_run_files, self.folder)
+            # En cas d'échec, le lot est retenté au scan suivant (fichiers en échec + diff)
+            if await self.import_batch(diff_scans(known, current)) is not None:
+                known = current
+
+    async def import_batch(self, paths: List[Path]) -> Optional[Dict[str, Any]]:
+        """
+        Importe un lot de fichiers et invalide le cache une seule fois pour tout le lot
+        Les fichiers d'un lot précédent en échec (toujours présents) sont ajoutés au lot
+        """
+        retry = {path for path in self._failed if path.exists()}
+        paths = sorted(set(paths) | retry)
+        if not paths:
+            self._failed.clear()
+            return None
+
+        session_factory = self._session_factory or get_session_local()
+        try:
+            async with session_factory() as session:
+                result = await self.importer.import_files(session, paths)
+            self._failed.clear()
+
+            if result["total_entries"]:
+                await CacheService().invalidate_stats_cache()
+                schedule_trend_refresh(session_factory=session_factory)
+
+            self.batches += 1
+            self.files_imported += result["files_imported"]
+            self.runs_imported += result["total_entries"]
+            self.last_batch_at = datetime.now(timezone.utc)
+            self.last_error = None
+            if result["files_imported"]:
+                logger.info(
+                    f"Dossier Stats: {result['files_imported']} nouvelle(s) partie(s) importée(s) "
+                    f"sur {len(paths)} fichier(s) détecté(s)"
+                )
+            return result
+
+        except Exception as e:
+            # Lot retenté au prochain événement, tick ou scan (import idempotent)
+            self._failed = set(paths)
+            self.last_error = str(e)
+            logger.error(f"Erreur lors de l'import automatique des stats: {e}")
+            return None
+
+    def get_status(self) -> Dict[str, Any]:
+        """État de la surveillance (exposé dans /health)"""
+        return {
+            "enabled": self.enabled,
+            "running": self._task is not None and not self._task.done(),
+            "folder": str(self.folder) if self.folder else None,
+            "mode": self.mode,
+            "batches": self.batches,
+            "files_imported": self.files_imported,
+            "runs_imported": self.runs_imported,
+            "last_batch_at": self.last_batch_at.isoformat() if self.last_batch_at else None,
+            "last_error": self.last_error,
+            "pending_retry": len(self._failed)
+        }
+
+
+# Instance process-wide
+_stats_watcher: Optional[StatsFolderWatcher] = None
+
+
+def get_stats_watcher() -> StatsFolderWatcher:
+    """Récupère le watcher du dossier Stats"""
+    global _stats_watcher
+    if _stats_watcher is None:
+        _stats_watcher = StatsFolderWatcher(get_settings())
+    return _stats_watcher
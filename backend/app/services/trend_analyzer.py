@@ -0,0 +1,165 @@
+"""
+Trend Analyzer - Détection des tendances de progression par scénario
+Une régression linéaire pondérée (score moyen du jour ~ jour, poids = parties)
+est ajustée pour tous les scénarios en une passe NumPy (sommes groupées par
+np.bincount), puis la variation relative sur la fenêtre est comparée aux seuils
+TREND_*. Le résultat est calculé après chaque import et mis en cache sous la
+version des stats: les recommandations le lisent sans recalcul
+"""
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from datetime import date, datetime, timedelta
+import asyncio
+import logging
+
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.constants import (
+    TREND_DECLINING_THRESHOLD,
+    TREND_IMPROVING_THRESHOLD,
+    TREND_MIN_DAYS,
+    TREND_WINDOW_DAYS,
+)
+from app.database import get_session_local
+from app.services.cache_service import CacheService
+from app.services.stats_queries import fetch_daily_scores
+
+logger = logging.getLogger(__name__)
+
+
+TREND_IMPROVING = "improving"
+TREND_DECLINING = "declining"
+TREND_PLATEAUED = "plateaued"
+TREND_STABLE = "stable"
+
+DailyScore = Tuple[str, date, float, int]
+
+
+def _classify(relative_change: float) -> str:
+    if relative_change >= TREND_IMPROVING_THRESHOLD:
+        return TREND_IMPROVING
+    if relative_change <= TREND_DECLINING_THRESHOLD:
+        return TREND_DECLINING
+    return TREND_PLATEAUED
+
+
+def classify_trends(daily_scores: List[DailyScore]) -> Dict[str, Any]:
+    """
+    Classe chaque scénario (improving, declining, plateaued) et calcule la
+    tendance globale (moyenne des variations pondérée par les parties)
+    La variation relative est pente x durée observée / score moyen; les
+    scénarios joués moins de TREND_MIN_DAYS jours ne sont pas classés
+    """
+    if not daily_scores:
+        return {"trend": TREND_STABLE, "overall_change": 0.0, "scenarios": []}
+
+    names, inverse = np.unique([row[0] for row in daily_scores], return_inverse=True)
+    n = len(names)
+    day_zero = min(row[1] for row in daily_scores)
+    x = np.array([(row[1] - day_zero).days for row in daily_scores], dtype=np.float64)
+    y = np.array([row[2] for row in daily_scores], dtype=np.float64)
+    w = np.array([row[3] for row in daily_scores], dtype=np.float64)
+
+    days = np.bincount(inverse, minlength=n)
+    sw = np.bincount(inverse, weights=w, minlength=n)
+    sx = np.bincount(inverse, weights=w * x, minlength=n)
+    sy = np.bincount(inverse, weights=w * y, minlength=n)
+    sxx = np.bincount(inverse, weights=w * x * x, minlength=n)
+    sxy = np.bincount(inverse, weights=w * x * y, minlength=n)
+
+    first_day = np.full(n, np.inf)
+    last_day = np.full(n, -np.inf)
+    np.minimum.at(first_day, inverse, x)
+    np.maximum.at(last_day, inverse, x)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        denominator = sw * sxx - sx * sx
+        slope = np.where(denominator > 0, (sw * sxy - sx * sy) / denominator, 0.0)
+        mean = sy / sw
+        relative_change = np.where(
+            np.abs(mean) > 0, slope * (last_day - first_day) / np.abs(mean), 0.0
+        )
+
+    fitted = days >= TREND_MIN_DAYS
+    scenarios = [
+        {
+            "scenario_name": str(names[i]),
+            "trend": _classify(relative_change[i]),
+            "relative_change": round(float(relative_change[i]), 4),
+            "slope_per_day": round(float(slope[i]), 4),
+            "avg_score": round(float(mean[i]), 2),
+            "plays": int(sw[i]),
+            "days_played": int(days[i])
+        }
+        for i in np.flatnonzero(fitted)
+    ]
+    scenarios.sort(key=lambda s: s["relative_change"], reverse=True)
+
+    if fitted.any():
+        overall_change = float(np.average(relative_change[fitted], weights=sw[fitted]))
+    else:
+        overall_change = 0.0
+    overall = _classify(overall_change)
+
+    return {
+        "trend": TREND_STABLE if overall == TREND_PLATEAUED else overall,
+        "overall_change": round(overall_change, 4),
+        "scenarios": scenarios
+    }
+
+
+class TrendAnalyzer:
+    """Analyse de tendance mise en cache sous la version des stats"""
+
+    def __init__(self):
+        self.cache = CacheService()
+
+    async def get_trends(self, db: AsyncSession, days: int = TREND_WINDOW_DAYS) -> Dict[str, Any]:
+        """Tendances de la fenêtre, depuis le cache si elles ont déjà été calculées"""
+        version = await self.cache.get_stats_version()
+        cached = await self.cache.get_stats_trends(days, version)
+        if cached is not None:
+            return cached
+        return await self.refresh(db, days, version)
+
+    async def refresh(
+        self,
+        db: AsyncSession,
+        days: int = TREND_WINDOW_DAYS,
+        version: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Recalcule les tendances depuis le rollup et les met en cache"""
+        # Version lue avant le rollup (comme la clé précalculée de get_context)
+        if version is None:
+            version = await self.cache.get_stats_version()
+        start_date = datetime.now() - timedelta(days=days)
+        daily_scores = await fetch_daily_scores(db, start_date)
+        trends = {"period_days": days, **classify_trends(daily_scores)}
+        await self.cache.set_stats_trends(trends, days, version)
+        return trends
+
+
+def create_trend_analyzer() -> TrendAnalyzer:
+    return TrendAnalyzer()
+
+
+# Références fortes vers les recalculs en cours (sinon collectés par le GC)
+_refresh_tasks: Set[asyncio.Task] = set()
+
+
+async def _refresh_in_background(days: int, session_factory: Callable):
+    try:
+        async with session_factory() as session:
+            await create_trend_analyzer().refresh(session, days)
+    except Exception as e:
+        logger.error(f"Erreur lors du précalcul des tendances: {e}")
+
+
+def schedule_trend_refresh(days: Optional[int] = None, session_factory: Optional[Callable] = None):
+    """Précalcule les tendances en tâche de fond (après invalidation du cache des stats)"""
+    task = asyncio.create_task(_refresh_in_background(
+        days or TREND_WINDOW_DAYS,
+        session_factory or get_session_local()
+    ))
+    _refresh_tasks.add(task)
+    task.add_done_callback(_refresh_tasks.discard)
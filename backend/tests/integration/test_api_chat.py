@@ -0,0 +1,136 @@
+"""
+Integration tests for the streaming chat endpoint (Server-Sent Events)
+"""
+import json
+import pytest
+from fastapi.testclient import TestClient
+from app.api import chat
+from app.api.chat import PreparedPrompt
+from app.database import get_db
+from app.main import app
+from app.services.health_monitor import get_health_monitor
+from app.services.llm_service import get_llm_service
+
+
+class FakeProvider:
+    """LLM provider streaming fixed tokens, optionally failing after some of them"""
+
+    def __init__(self, tokens, fail_after=None):
+        self.tokens = tokens
+        self.fail_after = fail_after
+        self.calls = []
+
+    async def stream_response(self, prompt, system_prompt=None):
+        self.calls.append((prompt, system_prompt))
+        for i, token in enumerate(self.tokens):
+            if i == self.fail_after:
+                raise RuntimeError("provider connection reset")
+            yield token
+
+
+class FakeMonitor:
+    def __init__(self, available=True):
+        self.available = available
+
+    def get_status(self):
+        return {"provider": "groq", "model": "fake-model"}
+
+    def is_available(self):
+        return self.available
+
+
+class FakeSession:
+    """Records the conversations saved once the stream is complete"""
+
+    def __init__(self, saved):
+        self.saved = saved
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def add(self, conversation):
+        self.saved.append(conversation)
+
+    async def commit(self):
+        pass
+
+
+def _parse_sse(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+@pytest.mark.integration
+@pytest.mark.api
+class TestChatStreaming:
+    """Test the SSE path of POST /api/chat/message"""
+
+    @pytest.fixture
+    def saved(self, monkeypatch):
+        saved = []
+
+        async def prepare_prompt(request):
+            return PreparedPrompt(system_prompt="coach prompt", context_used={"trend": "improving"})
+
+        monkeypatch.setattr(chat, "_prepare_prompt", prepare_prompt)
+        monkeypatch.setattr(chat, "get_session_local", lambda: lambda: FakeSession(saved))
+        return saved
+
+    @pytest.fixture
+    def client_for(self):
+        async def no_db():
+            yield None
+
+        def make(provider, monitor=None):
+            app.dependency_overrides[get_db] = no_db
+            app.dependency_overrides[get_llm_service] = lambda: provider
+            app.dependency_overrides[get_health_monitor] = lambda: monitor or FakeMonitor()
+            return TestClient(app)
+
+        yield make
+        app.dependency_overrides.clear()
+
+    def test_stream_emits_meta_tokens_done_and_saves(self, client_for, saved):
+        """Test meta, one event per token, then done once the conversation is saved"""
+        provider = FakeProvider(["Aim ", "small, ", "miss small"])
+
+        response = client_for(provider).post("/api/chat/message", json={"message": "How to track?", "stream": True})
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = _parse_sse(response.text)
+        assert [name for name, _ in events] == ["meta", "token", "token", "token", "done"]
+        assert events[0][1]["model_used"] == "fake-model"
+        assert "".join(data["token"] for name, data in events if name == "token") == "Aim small, miss small"
+        assert events[-1][1]["time_to_first_token"] is not None
+        assert provider.calls == [("How to track?", "coach prompt")]
+
+        assert len(saved) == 1
+        assert saved[0].messages[1]["content"] == "Aim small, miss small"
+        assert saved[0].context_used == {"trend": "improving"}
+
+    def test_provider_failure_mid_stream_emits_error(self, client_for, saved):
+        """Test a provider error after the first token ends the stream with an error event"""
+        provider = FakeProvider(["Aim ", "small"], fail_after=1)
+
+        response = client_for(provider).post("/api/chat/message", json={"message": "How to track?", "stream": True})
+
+        events = _parse_sse(response.text)
+        assert [name for name, _ in events] == ["meta", "token", "error"]
+        assert events[-1][1] == {"detail": "Erreur lors de la génération de la réponse"}
+        assert saved == []
+
+    def test_unavailable_provider_fails_before_streaming(self, client_for, saved):
+        """Test an open circuit returns a 503 instead of opening the stream"""
+        client = client_for(FakeProvider(["unused"]), FakeMonitor(available=False))
+
+        response = client.post("/api/chat/message", json={"message": "How to track?", "stream": True})
+
+        assert response.status_code == 503
+        assert saved == []
@@ -107,6 +107,32 @@ class TestRAGAPI:
         response = client.post("/api/rag/query", json=payload)
         assert response.status_code == 200
 
+    def test_rag_retrieve_valid(self, client):
+        """Test retrieval-only endpoint returns sources without an answer"""
+        payload = {
+            "query": "How to improve aim?",
+            "max_results": 5,
+            "safety_level": "general"
+        }
+
+        response = client.post("/api/rag/retrieve", json=payload)
+        assert response.status_code == 200
+
+        data = response.json()
+        assert "sources" in data
+        assert "confidence" in data
+        assert "answer" not in data
+
+        assert isinstance(data["sources"], list)
+        assert isinstance(data["confidence"], float)
+
+    def test_rag_retrieve_empty_string(self, client):
+        """Test retrieval-only endpoint validates the query"""
+        payload = {"query": "", "max_results": 5}
+
+        response = client.post("/api/rag/retrieve", json=payload)
+        assert response.status_code == 422
+
     def test_list_documents_empty(self, client):
         """Test listing documents when none exist"""
         response = client.get("/api/rag/documents")
@@ -0,0 +1,63 @@
+"""
+Unit tests for the shared CPU executor
+"""
+import pytest
+from app.config import Settings
+from app.services.cpu_executor import CPUExecutor
+
+
+def square(value):
+    return value * value
+
+
+def fail():
+    raise RuntimeError("boom")
+
+
+def make_executor(kind="thread", workers=2):
+    return CPUExecutor(Settings(cpu_executor_kind=kind, cpu_executor_workers=workers))
+
+
+@pytest.mark.unit
+class TestCPUExecutor:
+    """Test dispatch and metrics of the CPU executor"""
+
+    def test_invalid_kind(self):
+        """Test an unknown executor kind is rejected"""
+        with pytest.raises(ValueError):
+            make_executor(kind="gpu")
+
+    @pytest.mark.asyncio
+    async def test_run_returns_result_and_records_metrics(self):
+        """Test results are returned and run-time metrics updated"""
+        executor = make_executor()
+        try:
+            assert await executor.run(square, 7) == 49
+
+            metrics = executor.get_metrics()
+            assert metrics["kind"] == "thread"
+            assert metrics["max_workers"] == 2
+            assert metrics["completed"] == 1
+            assert metrics["failed"] == 0
+            assert metrics["in_flight"] == 0
+            assert metrics["queue_depth"] == 0
+        finally:
+            executor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_failures_are_counted_and_raised(self):
+        """Test exceptions propagate and are counted"""
+        executor = make_executor()
+        try:
+            with pytest.raises(RuntimeError):
+                await executor.run(fail)
+            assert executor.get_metrics()["failed"] == 1
+            assert executor.in_flight == 0
+        finally:
+            executor.shutdown()
+
+    def test_queue_depth(self):
+        """Test queue depth counts tasks beyond the worker count"""
+        executor = make_executor(workers=2)
+        executor.in_flight = 5
+        assert executor.queue_depth == 3
@@ -0,0 +1,70 @@
+"""
+Unit tests for cross-request embedding micro-batching
+"""
+import asyncio
+import pytest
+from app.services.embedding_batcher import EmbeddingBatcher
+
+
+class FakeModel:
+    """Records each batch and embeds a text as [len(text)]"""
+
+    def __init__(self, fail: bool = False):
+        self.batches = []
+        self.fail = fail
+
+    async def embed(self, texts):
+        self.batches.append(list(texts))
+        if self.fail:
+            raise RuntimeError("model unavailable")
+        return [[float(len(text))] for text in texts]
+
+
+@pytest.mark.unit
+class TestEmbeddingBatcher:
+    """Test gathering of concurrent embed requests"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_share_batches(self):
+        """Test concurrent callers are embedded together and each gets its own vector"""
+        model = FakeModel()
+        batcher = EmbeddingBatcher(model.embed, max_batch_size=4, max_wait_ms=50)
+        texts = ["a" * n for n in range(1, 11)]
+
+        results = await asyncio.gather(*(batcher.embed(text) for text in texts))
+        await batcher.close()
+
+        assert results == [[float(n)] for n in range(1, 11)]
+        assert [len(batch) for batch in model.batches] == [4, 4, 2]
+        metrics = batcher.get_metrics()
+        assert metrics["batches"] == 3
+        assert metrics["items"] == 10
+        assert metrics["largest_batch"] == 4
+        assert metrics["fill_ratio"] == pytest.approx(10 / 12, abs=1e-3)
+
+    @pytest.mark.asyncio
+    async def test_lone_request_flushed_after_wait(self):
+        """Test a single request is not held longer than the wait budget"""
+        model = FakeModel()
+        batcher = EmbeddingBatcher(model.embed, max_batch_size=32, max_wait_ms=10)
+
+        result = await asyncio.wait_for(batcher.embed("solo"), timeout=1)
+        await batcher.close()
+
+        assert result == [4.0]
+        assert model.batches == [["solo"]]
+        assert batcher.get_metrics()["fill_ratio"] == pytest.approx(1 / 32, abs=1e-3)
+
+    @pytest.mark.asyncio
+    async def test_failure_propagates_to_every_caller(self):
+        """Test a failed model call rejects all callers of the batch and the worker keeps running"""
+        model = FakeModel(fail=True)
+        batcher = EmbeddingBatcher(model.embed, max_batch_size=8, max_wait_ms=5)
+
+        results = await asyncio.gather(batcher.embed("a"), batcher.embed("b"), return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results)
+
+        model.fail = False
+        assert await batcher.embed("ok") == [2.0]
+        await batcher.close()
+        assert batcher.get_metrics()["failed_batches"] == 1
@@ -2,7 +2,7 @@
 Unit tests for embedding service
 """
 import pytest
-from app.services.embedding_service import EmbeddingService
+from app.services.embedding_service import EmbeddingService, get_embedding_service
 from app.constants import VECTOR_DIMENSION
 
 
@@ -20,6 +20,18 @@ class TestEmbeddingService:
         assert embedding_service is not None
         assert hasattr(embedding_service, 'model')
 
+    def test_shared_instance(self):
+        """Test the model is shared process-wide instead of reloaded per request"""
+        assert get_embedding_service() is get_embedding_service()
+
+    def test_status_before_warm_up(self, embedding_service):
+        """Test readiness is reported without loading the model"""
+        status = embedding_service.get_status()
+
+        assert status["loaded"] is False
+        assert status["ready"] is False
+        assert status["dimension"] == VECTOR_DIMENSION
+
     @pytest.mark.asyncio
     async def test_embed_text_returns_correct_dimension(self, embedding_service):
         """Test embedding returns correct vector dimension"""
@@ -0,0 +1,95 @@
+"""
+Unit tests for the provider health monitor
+"""
+import pytest
+from app.config import Settings
+from app.services.health_monitor import (
+    ProviderHealthMonitor,
+    CIRCUIT_CLOSED,
+    CIRCUIT_OPEN,
+    CIRCUIT_HALF_OPEN,
+)
+
+
+def make_monitor(results, reset_timeout=60):
+    """Create a monitor whose probe returns the given results in order"""
+    settings = Settings(
+        llm_provider="ollama",
+        llm_circuit_failure_threshold=2,
+        llm_circuit_reset_timeout=reset_timeout,
+    )
+    results = list(results)
+
+    async def probe():
+        result = results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    return ProviderHealthMonitor(settings, probe=probe)
+
+
+@pytest.mark.unit
+class TestProviderHealthMonitor:
+    """Test cached status and circuit breaker transitions"""
+
+    def test_unknown_status_is_available(self):
+        """Test requests are allowed before the first probe"""
+        monitor = make_monitor([])
+        status = monitor.get_status()
+
+        assert status["status"] == "unknown"
+        assert status["circuit"] == CIRCUIT_CLOSED
+        assert monitor.is_available()
+
+    @pytest.mark.asyncio
+    async def test_healthy_probe(self):
+        """Test a successful probe marks the provider healthy"""
+        monitor = make_monitor([True])
+        status = await monitor.check_now()
+
+        assert status["status"] == "healthy"
+        assert status["last_check"] is not None
+        assert monitor.is_available()
+
+    @pytest.mark.asyncio
+    async def test_circuit_opens_after_threshold(self):
+        """Test the circuit opens after consecutive failures"""
+        monitor = make_monitor([False, RuntimeError("connection refused")])
+
+        await monitor.check_now()
+        assert monitor.circuit_state == CIRCUIT_CLOSED
+        assert monitor.is_available()
+
+        status = await monitor.check_now()
+        assert status["circuit"] == CIRCUIT_OPEN
+        assert status["last_error"] == "connection refused"
+        assert not monitor.is_available()
+
+    @pytest.mark.asyncio
+    async def test_half_open_then_recovers(self):
+        """Test the circuit half-opens after the reset timeout and closes on success"""
+        monitor = make_monitor([False, False, True], reset_timeout=0)
+
+        await monitor.check_now()
+        await monitor.check_now()
+        assert monitor.circuit_state == CIRCUIT_HALF_OPEN
+        assert monitor.is_available()
+
+        await monitor.check_now()
+        assert monitor.circuit_state == CIRCUIT_CLOSED
+        assert monitor.consecutive_failures == 0
+
+    @pytest.mark.asyncio
+    async def test_half_open_failure_reopens(self):
+        """Test a failure while half-open reopens the circuit"""
+        monitor = make_monitor([False, False, False], reset_timeout=60)
+
+        await monitor.check_now()
+        await monitor.check_now()
+        monitor.reset_timeout = 0
+        assert monitor.circuit_state == CIRCUIT_HALF_OPEN
+
+        monitor.reset_timeout = 60
+        await monitor.check_now()
+        assert monitor.circuit_state == CIRCUIT_OPEN
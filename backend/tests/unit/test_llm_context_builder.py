@@ -0,0 +1,157 @@
+"""
+Unit tests for the LLM context cache and build coordination
+"""
+import asyncio
+import time
+import pytest
+from types import SimpleNamespace
+from app.services import llm_context_builder
+from app.services.llm_context_builder import LLMContextBuilder
+
+
+class FakeCache:
+    """In-memory context cache and Redis lock"""
+
+    def __init__(self, lock_held=False):
+        self.contexts = {}
+        self.lock_held = lock_held
+        self.lookups = 0
+
+    async def get_context_key(self, username, days):
+        return f"v1:{username or 'anonymous'}:days{days}"
+
+    async def get_user_context(self, key):
+        self.lookups += 1
+        return self.contexts.get(key)
+
+    async def set_user_context(self, key, context):
+        self.contexts[key] = context
+
+    async def acquire_lock(self, name, ttl=10):
+        return not self.lock_held
+
+    async def release_lock(self, name):
+        pass
+
+
+def _context(local_stats=None, kovaaks_api_data=None, missing_sources=None):
+    return {
+        "local_stats": local_stats or {"total_entries": 10},
+        "kovaaks_api_data": kovaaks_api_data or {"profile": {}},
+        "analysis": {},
+        "missing_sources": missing_sources or []
+    }
+
+
+def _builder(cache, context=None, username="player", build_delay=0.0):
+    builder = LLMContextBuilder()
+    builder.settings = SimpleNamespace(kovaaks_username=username, chat_context_timeout=8.0, context_source_timeout=3.0)
+    builder.cache = cache
+    builder.builds = 0
+
+    async def build_and_format(db, days):
+        builder.builds += 1
+        await asyncio.sleep(build_delay)
+        return {"context": context or _context(), "system_prompt": "prompt"}
+
+    builder._build_and_format = build_and_format
+    return builder
+
+
+@pytest.mark.unit
+class TestContextCache:
+    """Test which contexts are served from and stored in the cache"""
+
+    def test_cached_context_skips_build(self):
+        """Test a cached context is returned without building"""
+        cache = FakeCache()
+        cache.contexts["v1:player:days30"] = {"context": _context(), "system_prompt": "cached"}
+        builder = _builder(cache)
+
+        result = asyncio.run(builder.get_context(None))
+
+        assert result["system_prompt"] == "cached"
+        assert builder.builds == 0
+
+    def test_complete_context_is_cached(self):
+        """Test a context built from every source is stored"""
+        cache = FakeCache()
+
+        asyncio.run(_builder(cache).get_context(None))
+
+        assert "v1:player:days30" in cache.contexts
+
+    @pytest.mark.parametrize("context", [
+        _context(missing_sources=["kovaaks_profile"]),
+        _context(local_stats={"error": "db down"}),
+        _context(kovaaks_api_data={"error": "HTTP 503"}),
+    ])
+    def test_partial_context_is_not_cached(self, context):
+        """Test slow sources and local or KovaaK's errors keep the context out of the cache"""
+        cache = FakeCache()
+
+        asyncio.run(_builder(cache, context).get_context(None))
+
+        assert cache.contexts == {}
+
+    def test_unconfigured_kovaaks_user_is_cached(self):
+        """Test the permanent 'no username' KovaaK's error does not disable caching"""
+        cache = FakeCache()
+        context = _context(kovaaks_api_data={"error": "Nom d'utilisateur KovaaK's non configuré"})
+
+        asyncio.run(_builder(cache, context, username="").get_context(None))
+
+        assert "v1:anonymous:days30" in cache.contexts
+
+
+@pytest.mark.unit
+class TestContextBuildCoordination:
+    """Test concurrent requests share a single context build"""
+
+    def test_concurrent_requests_share_one_build(self):
+        """Test requests arriving during a build await it instead of rebuilding"""
+        cache = FakeCache()
+        builder = _builder(cache, build_delay=0.05)
+
+        async def run():
+            return await asyncio.gather(*(builder.get_context(None) for _ in range(5)))
+
+        results = asyncio.run(run())
+
+        assert builder.builds == 1
+        assert all(result is results[0] for result in results)
+        assert LLMContextBuilder._inflight == {}
+
+    def test_cancelled_owner_hands_build_to_waiter(self):
+        """Test a waiter rebuilds when the request that started the build is cancelled"""
+        cache = FakeCache()
+        builder = _builder(cache, build_delay=0.05)
+
+        async def run():
+            owner = asyncio.create_task(builder.get_context(None))
+            await asyncio.sleep(0.01)
+            waiter = asyncio.create_task(builder.get_context(None))
+            await asyncio.sleep(0.01)
+            owner.cancel()
+            return await waiter
+
+        result = asyncio.run(run())
+
+        assert result["system_prompt"] == "prompt"
+        assert builder.builds == 2
+
+    def test_redis_wait_is_capped_below_chat_timeout(self, monkeypatch):
+        """Test a worker blocked by another worker's lock builds itself within the chat deadline"""
+        monkeypatch.setattr(llm_context_builder, "CONTEXT_LOCK_POLL_INTERVAL", 0.01)
+        cache = FakeCache(lock_held=True)
+        builder = _builder(cache)
+        builder.settings.chat_context_timeout = 0.3
+        builder.settings.context_source_timeout = 0.2
+
+        started = time.perf_counter()
+        result = asyncio.run(builder.get_context(None))
+        elapsed = time.perf_counter() - started
+
+        assert result["system_prompt"] == "prompt"
+        assert builder.builds == 1
+        assert elapsed < builder.settings.chat_context_timeout
@@ -0,0 +1,87 @@
+"""
+Unit tests for the RAG query embedding cache
+"""
+import pytest
+import numpy as np
+from app.services import query_embedding_cache as cache_module
+from app.services.query_embedding_cache import (
+    QueryEmbeddingCache, normalize_query, encode_embedding, decode_embedding
+)
+
+
+class CountingEmbedder:
+    """Fake embedding model counting inferences"""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def __call__(self, text):
+        self.calls += 1
+        return [0.1, float(len(text)), 0.3]
+
+
+@pytest.mark.unit
+class TestNormalizeQuery:
+    """Test query normalisation"""
+
+    def test_case_and_whitespace(self):
+        """Test variants of the same question share a key"""
+        assert normalize_query("  Routine   pour\tTRACKING ") == "routine pour tracking"
+
+    def test_unicode_forms(self):
+        """Test composed and decomposed accents are equivalent"""
+        assert normalize_query("entra\u00eenement") == normalize_query("entrai\u0302nement")
+
+
+@pytest.mark.unit
+class TestQueryEmbeddingCache:
+    """Test LRU, TTL and hit-rate metrics"""
+
+    @pytest.mark.asyncio
+    async def test_hit_skips_inference(self):
+        """Test a repeated (normalized) query is embedded once"""
+        cache = QueryEmbeddingCache("test-model", max_entries=8)
+        embed = CountingEmbedder()
+
+        first = await cache.get_or_embed("sharecode voltaic", embed)
+        second = await cache.get_or_embed("  Sharecode  VOLTAIC", embed)
+
+        assert embed.calls == 1
+        assert second == pytest.approx(first)
+        metrics = cache.get_metrics()
+        assert metrics["hits"] == 1
+        assert metrics["misses"] == 1
+        assert metrics["hit_rate"] == 0.5
+
+    @pytest.mark.asyncio
+    async def test_least_recently_used_evicted(self):
+        """Test the bound evicts the least recently used query"""
+        cache = QueryEmbeddingCache("test-model", max_entries=2)
+        embed = CountingEmbedder()
+
+        await cache.get_or_embed("a", embed)
+        await cache.get_or_embed("b", embed)
+        await cache.get_or_embed("a", embed)  # "b" becomes least recently used
+        await cache.get_or_embed("c", embed)
+
+        assert await cache.get("a") is not None
+        assert await cache.get("b") is None
+        assert cache.get_metrics()["evictions"] == 1
+
+    @pytest.mark.asyncio
+    async def test_expired_entry_is_a_miss(self, monkeypatch):
+        """Test entries are dropped after their TTL"""
+        now = [1000.0]
+        monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+        cache = QueryEmbeddingCache("test-model", ttl_seconds=60)
+        await cache.set("aim training", [1.0, 2.0])
+
+        now[0] += 61
+        assert await cache.get("aim training") is None
+        assert cache.get_metrics()["size"] == 0
+
+    def test_float32_round_trip(self):
+        """Test the Redis encoding preserves float32 vectors"""
+        vector = np.array([0.25, -1.5, 3.0], dtype=np.float32)
+
+        assert np.array_equal(decode_embedding(encode_embedding(vector)), vector)
@@ -0,0 +1,99 @@
+"""
+Unit tests for the RAG chunk bulk writer
+"""
+import json
+import pytest
+import numpy as np
+from app.services import rag_chunk_writer
+from app.services.rag_chunk_writer import chunk_records, copy_chunks, ivfflat_lists
+
+
+class FakeSavepoint:
+    """Counts savepoints and their rollbacks"""
+
+    def __init__(self, session):
+        self.session = session
+
+    async def __aenter__(self):
+        self.session.savepoints += 1
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.session.rollbacks += 1
+        return False
+
+
+class FakeSession:
+    def __init__(self):
+        self.savepoints = 0
+        self.rollbacks = 0
+
+    def begin_nested(self):
+        return FakeSavepoint(self)
+
+
+@pytest.mark.unit
+class TestChunkRecords:
+    """Test COPY row construction"""
+
+    def test_rows_follow_copy_columns(self):
+        """Test rows carry indexes, JSON metadata and float32 vectors"""
+        batch = [{"content": "a", "metadata": {"page": 1}}, {"content": "b"}]
+        records = chunk_records(7, 10, batch, [[0.5, 1.0], [2.0, 3.0]])
+
+        assert [r[:3] for r in records] == [(7, 10, "a"), (7, 11, "b")]
+        assert json.loads(records[0][3]) == {"page": 1}
+        assert json.loads(records[1][3]) == {}
+        assert records[0][4].dtype == np.float32
+        assert records[1][4].tolist() == [2.0, 3.0]
+
+
+@pytest.mark.unit
+class TestIvfflatLists:
+    """Test ivfflat lists sizing on rebuild"""
+
+    def test_small_tables_keep_migration_default(self):
+        assert ivfflat_lists(5_000) == 100
+
+    def test_scales_with_rows(self):
+        assert ivfflat_lists(500_000) == 500
+        assert ivfflat_lists(4_000_000) == 2000
+
+
+@pytest.mark.unit
+class TestCopyRetries:
+    """Test failed COPY batches are retried in a fresh savepoint"""
+
+    @pytest.mark.asyncio
+    async def test_retry_after_failure(self, monkeypatch):
+        """Test a transient failure rolls back the savepoint and the batch is written again"""
+        calls = []
+
+        async def flaky_copy(db, records):
+            calls.append(len(records))
+            if len(calls) == 1:
+                raise ConnectionError("transient")
+
+        monkeypatch.setattr(rag_chunk_writer, "_copy_records", flaky_copy)
+        monkeypatch.setattr(rag_chunk_writer, "RETRY_DELAY", 0)
+        session = FakeSession()
+
+        written = await copy_chunks(session, [object(), object()], attempts=3)
+
+        assert written == 2
+        assert calls == [2, 2]
+        assert (session.savepoints, session.rollbacks) == (2, 1)
+
+    @pytest.mark.asyncio
+    async def test_gives_up_after_attempts(self, monkeypatch):
+        """Test the error is raised once every attempt failed"""
+        async def failing_copy(db, records):
+            raise ValueError("bad vector")
+
+        monkeypatch.setattr(rag_chunk_writer, "_copy_records", failing_copy)
+        monkeypatch.setattr(rag_chunk_writer, "RETRY_DELAY", 0)
+        session = FakeSession()
+
+        with pytest.raises(ValueError):
+            await copy_chunks(session, [object()], attempts=2)
+        assert session.rollbacks == 2
@@ -0,0 +1,85 @@
+"""
+Unit tests for batched RAG document ingestion
+"""
+import asyncio
+from types import SimpleNamespace
+import pytest
+from app.services.rag_service import RAGService
+
+
+class FakeSession:
+    """Records flushed chunks and when each DB write completes"""
+
+    def __init__(self, events):
+        self.events = events
+        self.added = []
+        self.committed = False
+
+    def add(self, obj):
+        obj.id = 1
+
+    async def connection(self):
+        # Not asyncpg: chunks go through the ORM fallback
+        return SimpleNamespace(dialect=SimpleNamespace(driver="psycopg"))
+
+    def add_all(self, objects):
+        self.added.extend(objects)
+
+    async def flush(self):
+        await asyncio.sleep(0)
+        self.events.append("written")
+
+    async def commit(self):
+        self.committed = True
+
+
+class FakeEmbeddingService:
+    """Embeds each text as [len(text)], recording batch sizes"""
+
+    def __init__(self, events):
+        self.events = events
+        self.batch_sizes = []
+
+    async def embed_texts(self, texts):
+        self.events.append("embed")
+        self.batch_sizes.append(len(texts))
+        await asyncio.sleep(0)
+        return [[float(len(text))] for text in texts]
+
+
+@pytest.mark.unit
+class TestBatchedIngestion:
+    """Test chunk embedding batches and chunk ordering"""
+
+    @pytest.mark.asyncio
+    async def test_chunks_embedded_in_batches(self):
+        """Test chunks are embedded per batch and keep their document order"""
+        events = []
+        db = FakeSession(events)
+        rag_service = RAGService(db, llm_service=object())
+        rag_service.embedding_service = FakeEmbeddingService(events)
+        rag_service.ingest_batch_size = 4
+        chunks = [{"content": "x" * n, "metadata": {"page": n}} for n in range(1, 11)]
+
+        result = await rag_service.ingest_document("Doc", "doc.pdf", "pdf", [], "general", chunks)
+
+        assert result == {"document_id": 1, "chunks_created": 10}
+        assert rag_service.embedding_service.batch_sizes == [4, 4, 2]
+        assert [chunk.chunk_index for chunk in db.added] == list(range(10))
+        assert [chunk.embedding.tolist() for chunk in db.added] == [[float(n)] for n in range(1, 11)]
+        assert db.added[2].chunk_metadata == {"page": 3}
+        assert db.committed
+
+    @pytest.mark.asyncio
+    async def test_next_batch_embedded_during_previous_write(self):
+        """Test the next batch starts embedding before the previous write completes"""
+        events = []
+        rag_service = RAGService(FakeSession(events), llm_service=object())
+        rag_service.embedding_service = FakeEmbeddingService(events)
+        rag_service.ingest_batch_size = 2
+        chunks = [{"content": str(n)} for n in range(6)]
+
+        await rag_service.ingest_document("Doc", "doc.pdf", "pdf", [], "general", chunks)
+
+        # events[0] is the flush of the document row itself
+        assert events[1:4] == ["embed", "embed", "written"]
@@ -0,0 +1,89 @@
+"""
+Unit tests for the KovaaK's per-run stats file parser
+"""
+import pytest
+from datetime import datetime, timezone
+from app.services.stats_folder_importer import parse_run_content, parse_run_file, run_key
+
+
+RUN_FILENAME = "1w4ts reload - Challenge - 2024.01.15-20.30.45 Stats.csv"
+
+RUN_CONTENT = b"""Kill #,Timestamp,Bot,Weapon,TTK,Shots,Hits,Accuracy,Damage Done,Damage Possible,Efficiency,Cheated
+1,20:29:46.512,Target,pistol,0.512s,1,1,1.000000,100.0,100.0,1.000000,false
+2,20:29:47.101,Target,pistol,0.589s,2,1,0.500000,100.0,200.0,0.500000,false
+
+Weapon,Shots,Hits,Damage Done,Damage Possible,,,Sens Scale,Horiz Sens,Vert Sens,FOV,Hide Gun,Crosshair
+pistol,80,60,6000.0,8000.0,,,cm/360,34.6,34.6,103.0,true,dot.png
+
+Kills:,60
+Deaths:,0
+Fight Time:,60.012
+Avg TTK:,0.553
+Damage Done:,6000.0
+Score:,812.5
+Scenario:,1w4ts reload
+Game Version:,3.4.6.2023-10-10-12-42-18-bd3fef74a7
+Sens Scale:,cm/360
+Horiz Sens:,34.6
+Vert Sens:,34.6
+FOV:,103.0
+"""
+
+
+@pytest.mark.unit
+class TestRunFileParser:
+    """Test extraction of summary fields from per-run stats files"""
+
+    def test_parses_summary_fields(self):
+        """Test score, accuracy, kills and settings are extracted"""
+        run = parse_run_content(RUN_FILENAME, RUN_CONTENT)
+
+        assert run["scenario_name"] == "1w4ts reload"
+        assert run["score"] == 812.5
+        assert run["accuracy"] == pytest.approx(0.75)
+        assert run["kills"] == 60
+        assert run["avg_ttk"] == pytest.approx(0.553)
+        assert run["sensitivity"] == pytest.approx(34.6)
+        assert run["cm360"] == pytest.approx(34.6)
+        assert run["fov"] == 103
+        assert run["played_at"] == datetime(2024, 1, 15, 20, 30, 45)
+
+    def test_rejects_unknown_filename(self):
+        """Test files not following the KovaaK's naming scheme are rejected"""
+        with pytest.raises(ValueError):
+            parse_run_content("export.csv", RUN_CONTENT)
+
+    def test_rejects_missing_score(self):
+        """Test files without a score line are rejected"""
+        with pytest.raises(ValueError):
+            parse_run_content(RUN_FILENAME, b"Kills:,10\n")
+
+    def test_parse_run_file_reports_errors(self, tmp_path):
+        """Test file parsing returns the hash and the error instead of raising"""
+        path = tmp_path / RUN_FILENAME
+        path.write_bytes(b"Kills:,10\n")
+
+        parsed = parse_run_file(str(path))
+
+        assert parsed.filename == RUN_FILENAME
+        assert len(parsed.file_hash) == 64
+        assert parsed.run is None
+        assert parsed.error == "score manquant"
+
+
+@pytest.mark.unit
+class TestRunKey:
+    """Test matching parsed runs with the rows actually inserted"""
+
+    def test_database_dates_match_parsed_dates(self):
+        """Test a run returned by the database (UTC-aware) matches its naive parsed date"""
+        parsed = run_key("1w4ts reload", datetime(2024, 1, 15, 20, 30, 45), 812.5)
+        returned = run_key("1w4ts reload", datetime(2024, 1, 15, 20, 30, 45, tzinfo=timezone.utc), 812.5)
+
+        assert parsed == returned
+
+    def test_different_score_is_another_run(self):
+        """Test the score is part of the natural key"""
+        played_at = datetime(2024, 1, 15, 20, 30, 45)
+
+        assert run_key("1w4ts reload", played_at, 812.5) != run_key("1w4ts reload", played_at, 800.0)
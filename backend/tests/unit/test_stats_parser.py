@@ -0,0 +1,47 @@
+"""
+Unit tests for the stats parser progression cache
+"""
+import asyncio
+import pytest
+from app.services import stats_parser
+from app.services.stats_parser import StatsParser
+
+
+class FakeCache:
+    """Versioned progression cache; the version can be bumped by a concurrent import"""
+
+    def __init__(self):
+        self.version = 1
+        self.lookups = []
+        self.stored = {}
+
+    async def get_stats_version(self):
+        return self.version
+
+    async def get_stats_progression(self, params_key, version=None):
+        self.lookups.append(version)
+        return None
+
+    async def set_stats_progression(self, params_key, progression, version, ttl=300):
+        self.stored[version] = progression
+
+
+@pytest.mark.unit
+class TestProgressionCache:
+    """Test cached progression series are keyed by the stats version they were computed from"""
+
+    def test_import_during_query_keeps_old_version(self, monkeypatch):
+        """Test series overtaken by an import are not cached under the new version"""
+        cache = FakeCache()
+
+        async def fetch_then_import(db, start_date, **kwargs):
+            cache.version = 2  # import + invalidation while the rollup is read
+            return []
+
+        monkeypatch.setattr(stats_parser, "CacheService", lambda: cache)
+        monkeypatch.setattr(stats_parser, "fetch_progression", fetch_then_import)
+
+        asyncio.run(StatsParser().get_progression(None, days=30))
+
+        assert cache.lookups == [1]
+        assert list(cache.stored) == [1]
@@ -0,0 +1,31 @@
+"""
+Unit tests for local_stats monthly partition planning
+"""
+import pytest
+from datetime import date
+from app.services.stats_partitioning import month_partitions
+
+
+@pytest.mark.unit
+class TestMonthPartitions:
+    """Test monthly partition ranges"""
+
+    def test_covers_both_bounds(self):
+        """Test partitions start on the first month and include the last one"""
+        partitions = month_partitions(date(2023, 11, 17), date(2024, 2, 3))
+
+        assert [p.name for p in partitions] == [
+            "local_stats_y2023m11",
+            "local_stats_y2023m12",
+            "local_stats_y2024m01",
+            "local_stats_y2024m02",
+        ]
+        assert partitions[0].start == date(2023, 11, 1)
+        assert partitions[-1].end == date(2024, 3, 1)
+
+    def test_ranges_are_contiguous(self):
+        """Test each partition ends where the next one starts"""
+        partitions = month_partitions(date(2024, 1, 1), date(2024, 12, 31))
+
+        assert len(partitions) == 12
+        assert all(a.end == b.start for a, b in zip(partitions, partitions[1:]))
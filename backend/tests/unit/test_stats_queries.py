@@ -0,0 +1,97 @@
+"""
+Unit tests for the stats query helpers
+"""
+import asyncio
+import pytest
+from datetime import date, datetime, timezone
+from app.services.stats_queries import (
+    _progression_points,
+    decode_cursor,
+    encode_cursor,
+    fetch_history_summary,
+    fetch_progression,
+)
+
+
+class CapturingSession:
+    """Records the executed statement and returns one aggregate row"""
+
+    def __init__(self, row):
+        self.row = row
+        self.statement = None
+
+    async def execute(self, statement):
+        self.statement = statement
+        return self
+
+    def one(self):
+        return self.row
+
+
+@pytest.mark.unit
+class TestHistoryCursor:
+    """Test keyset pagination cursors"""
+
+    def test_cursor_roundtrip(self):
+        """Test a cursor decodes back to its (played_at, id) key"""
+        played_at = datetime(2024, 3, 1, 18, 45, 12, 250000, tzinfo=timezone.utc)
+
+        assert decode_cursor(encode_cursor(played_at, 4242)) == (played_at, 4242)
+
+    def test_cursor_is_url_safe(self):
+        """Test cursors can be passed as query parameters as-is"""
+        cursor = encode_cursor(datetime(2024, 3, 1, tzinfo=timezone.utc), 1)
+
+        assert all(c.isalnum() or c in "-_=" for c in cursor)
+
+    @pytest.mark.parametrize("cursor", ["not-a-cursor", "", "MjAyNC0wMy0wMQ=="])
+    def test_invalid_cursor(self, cursor):
+        """Test malformed cursors raise ValueError"""
+        with pytest.raises(ValueError):
+            decode_cursor(cursor)
+
+
+@pytest.mark.unit
+class TestProgression:
+    """Test progression series decoding"""
+
+    def test_points_from_json(self):
+        """Test json_agg rows decode to typed points, NULL averages stay None"""
+        points = _progression_points(
+            '[["2024-03-04", 12, 950.5, 880.25, 0.71, 870.0, 990.0],'
+            ' ["2024-03-11", 3, null, null, null, 870.0, 990.0]]'
+        )
+
+        assert points[0].period == date(2024, 3, 4)
+        assert points[0].plays == 12
+        assert points[0].avg_score == pytest.approx(880.25)
+        assert points[1].avg_score is None
+        assert points[1].personal_best == pytest.approx(990.0)
+
+    def test_unknown_bucket(self):
+        """Test buckets other than day/week are rejected before querying"""
+        with pytest.raises(ValueError):
+            asyncio.run(fetch_progression(None, datetime(2024, 3, 1), bucket="month"))
+
+
+@pytest.mark.unit
+class TestHistorySummary:
+    """Test history aggregates follow the page filters"""
+
+    def test_summary_uses_page_filters(self):
+        """Test end bound and scenario are applied to the aggregates"""
+        db = CapturingSession((3, 850.5, None))
+        summary = asyncio.run(fetch_history_summary(
+            db,
+            start_date=datetime(2024, 3, 1, tzinfo=timezone.utc),
+            end_date=datetime(2024, 3, 8, tzinfo=timezone.utc),
+            scenario_name="1w4ts reload"
+        ))
+
+        where = str(db.statement.whereclause)
+        assert "played_at >=" in where
+        assert "played_at <" in where
+        assert "scenario_name =" in where
+        assert summary.total_plays == 3
+        assert summary.average_score == pytest.approx(850.5)
+        assert summary.average_accuracy is None
@@ -0,0 +1,95 @@
+"""
+Unit tests for the daily stats rollup aggregation
+"""
+import math
+import statistics
+import pytest
+from datetime import date, datetime, timedelta, timezone
+from app.services.stats_rollup import aggregate_daily_runs, aggregate_scenario_runs, utc_day
+
+
+@pytest.mark.unit
+class TestDailyRollup:
+    """Test per (scenario, day) aggregation of runs"""
+
+    def test_groups_by_scenario_and_day(self):
+        """Test runs are bucketed per scenario and UTC day"""
+        runs = [
+            ("1w4ts", datetime(2024, 1, 1, 10), 100.0, 0.5),
+            ("1w4ts", datetime(2024, 1, 1, 18), 120.0, 0.7),
+            ("1w4ts", datetime(2024, 1, 2, 9), 90.0, 0.6),
+            ("Close Long Strafes", datetime(2024, 1, 1, 12), 3000.0, 0.8),
+        ]
+        rows = {(r["scenario_name"], r["day"]): r for r in aggregate_daily_runs(runs)}
+
+        assert len(rows) == 3
+        day_one = rows[("1w4ts", date(2024, 1, 1))]
+        assert day_one["plays"] == 2
+        assert day_one["best_score"] == 120.0
+        assert day_one["score_sum"] == 220.0
+        assert day_one["score_sq_sum"] == 100.0 ** 2 + 120.0 ** 2
+        assert day_one["scored_plays"] == 2
+        assert day_one["accuracy_sum"] == pytest.approx(1.2)
+        assert day_one["accuracy_plays"] == 2
+
+    def test_missing_values_are_counted_as_plays_only(self):
+        """Test NaN/None scores and accuracies don't skew sums"""
+        runs = [
+            ("1w4ts", datetime(2024, 1, 1, 10), math.nan, None),
+            ("1w4ts", datetime(2024, 1, 1, 11), 50.0, math.nan),
+        ]
+        (row,) = aggregate_daily_runs(runs)
+
+        assert row["plays"] == 2
+        assert row["scored_plays"] == 1
+        assert row["best_score"] == 50.0
+        assert row["accuracy_plays"] == 0
+        assert row["accuracy_sum"] == 0.0
+
+    def test_runs_without_date_are_skipped(self):
+        """Test runs without a played_at date are ignored"""
+        assert aggregate_daily_runs([("1w4ts", None, 10.0, 0.5)]) == []
+
+    def test_utc_day_converts_aware_datetimes(self):
+        """Test aware datetimes are bucketed by their UTC date"""
+        paris = timezone(timedelta(hours=2))
+        assert utc_day(datetime(2024, 6, 2, 1, 0, tzinfo=paris)) == date(2024, 6, 1)
+        assert utc_day(datetime(2024, 6, 2, 1, 0)) == date(2024, 6, 2)
+
+
+@pytest.mark.unit
+class TestScenarioSummary:
+    """Test per-scenario running aggregates (Welford)"""
+
+    def test_running_mean_and_variance(self):
+        """Test mean and M2 match a two-pass computation"""
+        scores = [812.5, 790.0, 845.25, 760.0, 900.0]
+        runs = [
+            ("1w4ts", datetime(2024, 1, 1 + i, 20), score, 0.5 + i / 10)
+            for i, score in enumerate(scores)
+        ]
+        (row,) = aggregate_scenario_runs(runs)
+
+        assert row["plays"] == 5
+        assert row["scored_plays"] == 5
+        assert row["mean_score"] == pytest.approx(statistics.fmean(scores))
+        assert row["score_m2"] / row["scored_plays"] == pytest.approx(statistics.pvariance(scores))
+        assert row["mean_accuracy"] == pytest.approx(0.7)
+
+    def test_best_score_and_dates(self):
+        """Test the personal best keeps the date it was set, first/last played span all runs"""
+        runs = [
+            ("1w4ts", datetime(2024, 1, 3), 700.0, None),
+            ("1w4ts", datetime(2024, 1, 1), 900.0, None),
+            ("1w4ts", datetime(2024, 1, 5), math.nan, None),
+            ("Pasu", datetime(2024, 1, 2), 300.0, None),
+        ]
+        rows = {r["scenario_name"]: r for r in aggregate_scenario_runs(runs)}
+
+        assert rows["1w4ts"]["best_score"] == 900.0
+        assert rows["1w4ts"]["best_played_at"] == datetime(2024, 1, 1)
+        assert rows["1w4ts"]["first_played_at"] == datetime(2024, 1, 1)
+        assert rows["1w4ts"]["last_played_at"] == datetime(2024, 1, 5)
+        assert rows["1w4ts"]["plays"] == 3
+        assert rows["1w4ts"]["scored_plays"] == 2
+        assert rows["Pasu"]["plays"] == 1
@@ -0,0 +1,126 @@
+"""
+Unit tests for the KovaaK's Stats folder watcher
+"""
+import pytest
+from pathlib import Path
+from app.config import Settings
+from app.services.stats_watcher import StatsFolderWatcher, diff_scans, scan_run_files
+
+
+RUN_FILENAME = "1w4ts reload - Challenge - 2024.01.15-20.30.45 Stats.csv"
+
+
+class FakeImporter:
+    """Importer recording the batches it receives"""
+
+    def __init__(self):
+        self.batches = []
+
+    async def import_files(self, db, paths):
+        self.batches.append(list(paths))
+        return {"files_imported": len(paths), "total_entries": 0}
+
+
+class FlakyImporter(FakeImporter):
+    """Importer failing on its first batch (database briefly unavailable)"""
+
+    async def import_files(self, db, paths):
+        if not self.batches:
+            self.batches.append(None)
+            raise ConnectionError("database unavailable")
+        return await super().import_files(db, paths)
+
+
+class FakeSession:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+
+@pytest.mark.unit
+class TestStatsFolderWatcher:
+    """Test change detection and batching of the Stats folder watcher"""
+
+    def test_scan_only_lists_run_files(self, tmp_path):
+        """Test the polling scan ignores files that are not per-run stats"""
+        (tmp_path / RUN_FILENAME).write_text("Score:,1\n")
+        (tmp_path / "notes.txt").write_text("")
+
+        scan = scan_run_files(tmp_path)
+
+        assert list(scan) == [str(tmp_path / RUN_FILENAME)]
+
+    def test_diff_scans_detects_new_and_modified_files(self):
+        """Test new or modified files are reported, unchanged ones are not"""
+        previous = {"/stats/a Stats.csv": 1.0, "/stats/b Stats.csv": 1.0}
+        current = {"/stats/a Stats.csv": 1.0, "/stats/b Stats.csv": 2.0, "/stats/c Stats.csv": 1.0}
+
+        assert diff_scans(previous, current) == [Path("/stats/b Stats.csv"), Path("/stats/c Stats.csv")]
+
+    def test_disabled_without_folder(self):
+        """Test the watcher is disabled when no Stats folder is configured"""
+        watcher = StatsFolderWatcher(Settings(kovaaks_stats_dir=None))
+
+        assert not watcher.enabled
+        assert watcher.get_status()["enabled"] is False
+
+    @pytest.mark.asyncio
+    async def test_import_batch_imports_once_per_batch(self, tmp_path):
+        """Test a burst of files is imported as a single batch"""
+        importer = FakeImporter()
+        watcher = StatsFolderWatcher(
+            Settings(kovaaks_stats_dir=str(tmp_path), stats_watch_force_polling=True),
+            importer=importer,
+            session_factory=FakeSession
+        )
+        paths = [tmp_path / f"run {i} Stats.csv" for i in range(3)]
+
+        result = await watcher.import_batch(paths)
+
+        assert result["files_imported"] == 3
+        assert importer.batches == [paths]
+        assert watcher.get_status()["batches"] == 1
+        assert watcher.get_status()["mode"] == "polling"
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_retried_with_next_batch(self, tmp_path):
+        """Test files of a failed batch are merged into the next batch"""
+        importer = FlakyImporter()
+        watcher = StatsFolderWatcher(
+            Settings(kovaaks_stats_dir=str(tmp_path), stats_watch_force_polling=True),
+            importer=importer,
+            session_factory=FakeSession
+        )
+        first, second = tmp_path / "run 1 Stats.csv", tmp_path / "run 2 Stats.csv"
+        first.write_text("Score:,1\n")
+        second.write_text("Score:,2\n")
+
+        assert await watcher.import_batch([first]) is None
+        assert watcher.get_status()["pending_retry"] == 1
+
+        result = await watcher.import_batch([second])
+
+        assert result["files_imported"] == 2
+        assert importer.batches[-1] == [first, second]
+        assert watcher.get_status()["pending_retry"] == 0
+        assert watcher.get_status()["last_error"] is None
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_retried_on_empty_tick(self, tmp_path):
+        """Test a tick without new files still retries the failed batch"""
+        importer = FlakyImporter()
+        watcher = StatsFolderWatcher(
+            Settings(kovaaks_stats_dir=str(tmp_path), stats_watch_force_polling=True),
+            importer=importer,
+            session_factory=FakeSession
+        )
+        run = tmp_path / RUN_FILENAME
+        run.write_text("Score:,1\n")
+
+        await watcher.import_batch([run])
+        result = await watcher.import_batch([])
+
+        assert result["files_imported"] == 1
+        assert importer.batches[-1] == [run]
@@ -0,0 +1,90 @@
+"""
+Unit tests for the vectorized trend analyzer
+"""
+import asyncio
+import pytest
+from datetime import date, timedelta
+from app.services import trend_analyzer
+from app.services.trend_analyzer import TrendAnalyzer, classify_trends
+
+
+class FakeCache:
+    """Versioned trend cache; the version can be bumped by a concurrent import"""
+
+    def __init__(self):
+        self.version = 1
+        self.stored = {}
+
+    async def get_stats_version(self):
+        return self.version
+
+    async def set_stats_trends(self, trends, days, version, ttl=3600):
+        self.stored[version] = trends
+
+
+def _series(name, scores, plays=5, start=date(2024, 3, 1)):
+    return [(name, start + timedelta(days=i), score, plays) for i, score in enumerate(scores)]
+
+
+@pytest.mark.unit
+class TestTrendAnalyzer:
+    """Test per-scenario slope fitting and classification"""
+
+    def test_classifies_each_scenario(self):
+        """Test improving, declining and plateaued scenarios are told apart in one pass"""
+        daily_scores = (
+            _series("1w4ts", [800, 850, 900, 950, 1000])
+            + _series("Close Long Strafes", [3000, 2900, 2800, 2700, 2600])
+            + _series("Pasu", [500, 505, 498, 502, 500])
+        )
+
+        trends = {s["scenario_name"]: s for s in classify_trends(daily_scores)["scenarios"]}
+
+        assert trends["1w4ts"]["trend"] == "improving"
+        assert trends["1w4ts"]["slope_per_day"] == pytest.approx(50.0)
+        assert trends["Close Long Strafes"]["trend"] == "declining"
+        assert trends["Pasu"]["trend"] == "plateaued"
+
+    def test_overall_trend_is_weighted_by_plays(self):
+        """Test the global trend follows the most played scenarios"""
+        daily_scores = (
+            _series("1w4ts", [800, 850, 900, 950, 1000], plays=50)
+            + _series("Close Long Strafes", [3000, 2900, 2800, 2700, 2600], plays=1)
+        )
+
+        result = classify_trends(daily_scores)
+
+        assert result["trend"] == "improving"
+        assert result["overall_change"] > 0
+
+    def test_needs_minimum_days(self):
+        """Test scenarios played on too few days are not classified"""
+        result = classify_trends(_series("1w4ts", [800, 1000]))
+
+        assert result["scenarios"] == []
+        assert result["trend"] == "stable"
+
+    def test_empty_window(self):
+        """Test an empty window is reported as stable"""
+        assert classify_trends([]) == {"trend": "stable", "overall_change": 0.0, "scenarios": []}
+
+
+@pytest.mark.unit
+class TestTrendRefresh:
+    """Test cached trends are keyed by the stats version they were computed from"""
+
+    def test_import_during_refresh_keeps_old_version(self, monkeypatch):
+        """Test a refresh overtaken by an import is not cached under the new version"""
+        cache = FakeCache()
+
+        async def fetch_then_import(db, start_date):
+            cache.version = 2  # import + invalidation while the rollup is read
+            return _series("1w4ts", [800, 850, 900, 950, 1000])
+
+        monkeypatch.setattr(trend_analyzer, "fetch_daily_scores", fetch_then_import)
+        analyzer = TrendAnalyzer()
+        analyzer.cache = cache
+
+        asyncio.run(analyzer.refresh(None, days=30))
+
+        assert list(cache.stored) == [1]
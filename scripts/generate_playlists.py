@@ -9,11 +9,10 @@ from collections import defaultdict
 # Ajouter le dossier backend au path pour importer les modules
 sys.path.insert(0, str(Path(__file__).parent.parent / 'backend'))
 
-from sqlalchemy import select, func, text
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 
-from app.models.stats import LocalStats
+from app.services.stats_queries import fetch_scenario_play_counts, fetch_totals
 
 
 # ============================================================================
@@ -101,34 +100,13 @@ def write_playlist_file(filepath: Path, scenarios: List[str], description: str =
 
 async def get_most_played_scenarios(session: AsyncSession, limit: int = 50) -> List[Tuple[str, int]]:
     """Récupère les scénarios les plus joués."""
-    query = (
-        select(
-            LocalStats.scenario_name,
-            func.count(LocalStats.id).label('play_count')
-        )
-        .group_by(LocalStats.scenario_name)
-        .order_by(text('play_count DESC'))
-        .limit(limit)
-    )
-
-    result = await session.execute(query)
-    return [(row.scenario_name, row.play_count) for row in result]
+    return await fetch_scenario_play_counts(session, limit=limit)
 
 
 async def get_scenarios_by_category(session: AsyncSession) -> Dict[str, List[Tuple[str, int]]]:
     """Récupère tous les scénarios et les organise par catégorie."""
     # Récupérer tous les scénarios avec leur nombre de parties
-    query = (
-        select(
-            LocalStats.scenario_name,
-            func.count(LocalStats.id).label('play_count')
-        )
-        .group_by(LocalStats.scenario_name)
-        .order_by(text('play_count DESC'))
-    )
-
-    result = await session.execute(query)
-    all_scenarios = [(row.scenario_name, row.play_count) for row in result]
+    all_scenarios = await fetch_scenario_play_counts(session)
 
     # Catégoriser les scénarios
     categorized = defaultdict(list)
@@ -141,16 +119,11 @@ async def get_scenarios_by_category(session: AsyncSession) -> Dict[str, List[Tup
 
 async def get_database_stats(session: AsyncSession) -> Dict:
     """Récupère des statistiques générales."""
-    total_scenarios = await session.execute(
-        select(func.count(func.distinct(LocalStats.scenario_name)))
-    )
-    total_plays = await session.execute(
-        select(func.count(LocalStats.id))
-    )
+    total_plays, total_scenarios = await fetch_totals(session)
 
     return {
-        'total_scenarios': total_scenarios.scalar(),
-        'total_plays': total_plays.scalar()
+        'total_scenarios': total_scenarios,
+        'total_plays': total_plays
     }
 
 
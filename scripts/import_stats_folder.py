@@ -0,0 +1,97 @@
+"""
+Import du dossier Stats de KovaaK's (un CSV par partie) dans local_stats
+
+Les fichiers sont parsés en parallèle dans des processus et insérés par lots;
+les fichiers déjà importés (même nom ou même contenu) sont ignorés, relancer
+le script n'importe donc que les nouvelles parties.
+
+Usage:
+    backend/env/bin/python scripts/import_stats_folder.py \\
+        "C:/Program Files (x86)/Steam/steamapps/common/FPSAimTrainer/FPSAimTrainer/stats"
+    backend/env/bin/python scripts/import_stats_folder.py stats.zip --workers 8
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Ajouter le dossier backend au path pour importer les modules
+sys.path.insert(0, str(Path(__file__).parent.parent / 'backend'))
+
+from dotenv import load_dotenv
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.database import close_connections
+from app.services.cache_service import CacheService
+from app.services.stats_folder_importer import (
+    create_stats_folder_importer,
+    extract_run_files,
+    find_run_files,
+)
+
+
+async def import_stats(database_url: str, source: Path, workers: int, batch_size: int):
+    engine = create_async_engine(database_url, echo=False)
+    session_maker = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    # Hors API: pool de processus dédié à cet import
+    importer = create_stats_folder_importer(workers=workers, batch_size=batch_size, process_pool=True)
+
+    print("📂 Import du dossier Stats KovaaK's\n")
+
+    try:
+        with tempfile.TemporaryDirectory(prefix="kovaaks-stats-") as tmp_dir:
+            if source.is_dir():
+                paths = find_run_files(source)
+            else:
+                paths = extract_run_files(source, Path(tmp_dir))
+            print(f"   - Fichiers de partie trouvés: {len(paths)}")
+            print(f"   - Workers: {importer.workers}, lots de {importer.batch_size} fichiers\n")
+
+            async with session_maker() as session:
+                result = await importer.import_files(session, paths)
+    finally:
+        await engine.dispose()
+
+    print(f"✓ Fichiers importés: {result['files_imported']}")
+    print(f"✓ Parties ajoutées: {result['total_entries']}")
+    print(f"   - Déjà importés: {result['files_already_imported']}")
+    print(f"   - En erreur: {result['files_failed']}")
+    for error in result["errors"][:10]:
+        print(f"     ✗ {error['filename']}: {error['error']}")
+    print(f"\n⚡ {result['duration_seconds']:.1f}s ({result['files_per_second']:.0f} fichiers/s)")
+
+    if result["total_entries"]:
+        try:
+            await CacheService().invalidate_stats_cache()
+            await close_connections()
+            print("✓ Cache des stats invalidé")
+        except Exception as e:
+            print(f"⚠️  Cache des stats non invalidé (Redis indisponible?): {e}")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Import du dossier Stats de KovaaK's")
+    arg_parser.add_argument("source", type=Path, help="Dossier Stats de KovaaK's ou archive zip")
+    arg_parser.add_argument("--workers", type=int, default=None, help="Processus de parsing (défaut: nombre de CPU)")
+    arg_parser.add_argument("--batch-size", type=int, default=None, help="Fichiers par lot (défaut: 500)")
+    args = arg_parser.parse_args()
+
+    # Charger le .env du backend
+    load_dotenv(Path(__file__).parent.parent / 'backend' / '.env')
+    database_url = os.getenv('DATABASE_URL')
+    if not database_url:
+        print("❌ Erreur: DATABASE_URL non défini dans les variables d'environnement")
+        sys.exit(1)
+
+    if not args.source.exists():
+        print(f"❌ Erreur: {args.source} introuvable")
+        sys.exit(1)
+
+    asyncio.run(import_stats(database_url, args.source, args.workers, args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Conversion de local_stats en table partitionnée par mois (mode opt-in)
+
+À lancer une fois, API arrêtée (la table est verrouillée pendant la copie),
+puis activer STATS_PARTITIONING=true (.env à la racine avec Docker Compose,
+backend/.env hors Docker): l'API crée alors les partitions des mois à venir
+à chaque démarrage.
+
+Usage:
+    backend/env/bin/python scripts/partition_local_stats.py
+    backend/env/bin/python scripts/partition_local_stats.py --months-ahead 6
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+# Ajouter le dossier backend au path pour importer les modules
+sys.path.insert(0, str(Path(__file__).parent.parent / 'backend'))
+
+from dotenv import load_dotenv
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.services.stats_partitioning import convert_to_partitioned
+
+
+async def partition(database_url: str, months_ahead: int):
+    engine = create_async_engine(database_url, echo=False)
+    session_maker = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    print("🗂️  Partitionnement mensuel de local_stats\n")
+
+    try:
+        async with session_maker() as session:
+            started = time.perf_counter()
+            try:
+                count = await convert_to_partitioned(session, months_ahead=months_ahead)
+                await session.commit()
+            except ValueError as e:
+                await session.rollback()
+                print(f"❌ Erreur: {e}")
+                sys.exit(1)
+    finally:
+        await engine.dispose()
+
+    print(f"✓ {count} partition(s) mensuelle(s) + partition DEFAULT")
+    print(f"⚡ {time.perf_counter() - started:.1f}s")
+    print("\n👉 Activer STATS_PARTITIONING=true dans .env (Docker Compose) ou backend/.env (hors Docker)")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Partitionnement mensuel de local_stats")
+    arg_parser.add_argument(
+        "--months-ahead", type=int, default=3,
+        help="Mois futurs créés à l'avance (défaut: 3)"
+    )
+    args = arg_parser.parse_args()
+
+    # Charger le .env du backend
+    load_dotenv(Path(__file__).parent.parent / 'backend' / '.env')
+    database_url = os.getenv('DATABASE_URL')
+    if not database_url:
+        print("❌ Erreur: DATABASE_URL non défini dans les variables d'environnement")
+        sys.exit(1)
+
+    asyncio.run(partition(database_url, args.months_ahead))
+
+
+if __name__ == "__main__":
+    main()